@@ -4,6 +4,8 @@ from nodes.scrape_irda import scrape_irda_circulars
 from nodes.parse import parse_node
 from nodes.embed import embed_node
 from nodes.error_handler import error_node
+from nodes.check_updates import check_node, route_after_check
+from metrics import traced_node
 
 from typing import TypedDict, Optional
 
@@ -13,32 +15,43 @@ class AgentState(TypedDict, total=False):
     is_parse_done: Optional[bool]
     is_embed_done: Optional[bool]
     start_urls: Optional[list[str]]
-    filter_non_english: Optional[bool]
+    languages: Optional[dict]
+    document_metadata: Optional[dict]
+    incremental: Optional[bool]
+    skip_scrape: Optional[bool]
 
-async def run_langgraph_agent_async():
+DEFAULT_START_URLS = ["https://irdai.gov.in/rules"]
+
+def build_agent_graph():
     builder = StateGraph(AgentState)
 
-    builder.add_node("scrape", scrape_irda_circulars)
-    builder.add_node("parse", parse_node)
-    builder.add_node("embed", embed_node)
+    builder.add_node("check", check_node)
+    # Timed, with throughput exported to metrics (METRICS_TEXTFILE_PATH) and printed
+    builder.add_node("scrape", traced_node("scrape", scrape_irda_circulars, lambda r: {
+        "pages": r.get("pages_crawled", 0), "files": r.get("total_downloaded", 0)}))
+    builder.add_node("parse", traced_node("parse", parse_node, lambda r: {"files": r.get("parsed_files", 0)}))
+    builder.add_node("embed", traced_node("embed", embed_node, lambda r: {
+        "chunks": r.get("embed_stats", {}).get("chunks_embedded", 0)}))
     builder.add_node("error", error_node)
 
-    builder.set_entry_point("scrape")
+    builder.set_entry_point("check")
+    builder.add_conditional_edges("check", route_after_check, {"scrape": "scrape", "parse": "parse"})
     builder.add_edge("scrape", "parse")
     builder.add_edge("parse", "embed")
     builder.add_edge("embed", END)
     builder.add_edge("error", END)
 
-    graph = builder.compile()
+    return builder.compile()
+
+async def run_langgraph_agent_async(start_urls: Optional[list[str]] = None):
+    graph = build_agent_graph()
 
     final_state = await graph.ainvoke({
-        "start_urls": [
-            "https://irdai.gov.in/rules"
-        ],
-        "filter_non_english": True
+        "start_urls": start_urls or DEFAULT_START_URLS
     })
 
     print("✅ Agent finished:", final_state)
+    return final_state
 
 if __name__ == "__main__":
     asyncio.run(run_langgraph_agent_async())
@@ -0,0 +1,115 @@
+# answer_cache.py
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+from embeddings import normalize_query
+from config import ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_SIMILARITY
+
+
+class SemanticAnswerCache:
+    """Answers shared across sessions, matched by cosine similarity of the question embedding.
+
+    Each entry keeps the answer together with the sources it was generated from and
+    the number of LLM calls it cost, so hits can be reported as LLM calls saved.
+    ``scope`` separates answers retrieved under different filters (e.g. language); a question
+    only matches entries from the same scope. Entries stored without a vector (questions citing
+    exact identifiers, where a near neighbour would be a different circular) match only exactly. ``clear()`` is called whenever the vectorstore is rebuilt.
+    """
+
+    def __init__(self, maxsize: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL_SECONDS,
+                 threshold: float = ANSWER_CACHE_SIMILARITY):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries = OrderedDict()  # (scope, normalized question) -> entry dict
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._keys: List[tuple] = []
+        self._scopes = None
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.llm_calls_saved = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def _index(self):
+        # Rebuilt lazily after writes so a lookup is one matrix-vector product
+        if self._matrix is None:
+            self._keys = [k for k, e in self._entries.items() if e["vector"] is not None]
+            self._matrix = np.vstack([self._entries[k]["vector"] for k in self._keys]) if self._keys else None
+            self._scopes = np.array([scope for scope, _ in self._keys], dtype=object)
+        return self._matrix
+
+    def _expire(self, now: float):
+        expired = [k for k, e in self._entries.items() if e["created_at"] + self.ttl < now]
+        for k in expired:
+            del self._entries[k]
+        if expired:
+            self._matrix = None
+
+    def lookup(self, query: str, vector, scope: str = "") -> Optional[dict]:
+        """Return the cached payload for the closest question above the threshold, else None."""
+        with self._lock:
+            self._expire(time.time())
+            entry = self._entries.get((scope, normalize_query(query)))
+            if entry is None and vector is not None:
+                matrix = self._index()
+                if matrix is not None:
+                    scores = np.where(self._scopes == scope, matrix @ self._unit(vector), -1.0)
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.threshold:
+                        entry = self._entries[self._keys[best]]
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.llm_calls_saved += entry["llm_calls"]
+            return entry["payload"]
+
+    def put(self, query: str, vector, payload: dict, llm_calls: int, generation: int, scope: str = ""):
+        """Store an answer computed against vectorstore ``generation``; stale results are dropped."""
+        with self._lock:
+            if generation != self.generation:
+                return
+            key = (scope, normalize_query(query))
+            self._entries[key] = {
+                "vector": self._unit(vector) if vector is not None else None,
+                "payload": payload,
+                "llm_calls": llm_calls,
+                "created_at": time.time(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "llm_calls_saved": self.llm_calls_saved,
+            "invalidations": self.invalidations,
+        }
+
+
+# Shared instance used by the API
+answer_cache = SemanticAnswerCache()
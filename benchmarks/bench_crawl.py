@@ -0,0 +1,145 @@
+# benchmarks/bench_crawl.py
+"""Listing-page crawl throughput (pages/sec) against saved listing pages served locally.
+
+Compares the plain-HTTP fast path with the browser path (event-driven waits) and, with --legacy,
+the old browser loop that slept a fixed 2s after scrolling and after every click. The browser rows
+need playwright and a Chromium install and are skipped otherwise.
+
+Run from the repo root:
+    python -m benchmarks.bench_crawl --pages 40 --links 25 --latency 0.05
+    python -m benchmarks.bench_crawl --site-dir saved_listing/ --start page_1.html
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import httpx
+from contextlib import aclosing
+from benchmarks.local_http import LocalHTTPServer
+from benchmarks.corpus import TOPICS, circular_reference
+from nodes import scrape_irda
+from nodes.scrape_irda import (
+    LazyBrowser,
+    fetch_listing,
+    parse_listing,
+    iter_static_listing,
+    iter_browser_listing,
+)
+
+
+def make_listing_site(directory: str, n_pages: int, links_per_page: int,
+                      document_href=lambda i: f"/documents/circular_{i:05d}.pdf") -> str:
+    """Write page_1.html .. page_N.html shaped like the IRDAI circulars table; returns the first page name."""
+    os.makedirs(directory, exist_ok=True)
+    for page in range(1, n_pages + 1):
+        rows = []
+        for j in range(links_per_page):
+            i = (page - 1) * links_per_page + j
+            topic = TOPICS[i % len(TOPICS)]
+            rows.append(
+                f"<tr><td>{i + 1}</td><td>{circular_reference(i)}</td>"
+                f"<td>Circular on {topic}</td><td>01-04-2024</td>"
+                f'<td><a href="{document_href(i)}">Download</a></td></tr>'
+            )
+        nav = f'<a href="page_{page + 1}.html">Next</a>' if page < n_pages else ""
+        with open(os.path.join(directory, f"page_{page}.html"), "w", encoding="utf-8") as f:
+            f.write(
+                "<html><head><title>Circulars</title></head><body>"
+                "<div class='menu'>" + "".join(f"<a href='/section/{k}'>Section {k}</a>" for k in range(40)) + "</div>"
+                f"<table>{''.join(rows)}</table><div class='pager'>{nav}</div></body></html>"
+            )
+    return "page_1.html"
+
+
+async def crawl_static(url: str, page_limit: int):
+    async with httpx.AsyncClient() as client:
+        first_page = parse_listing(await fetch_listing(client, url), url, url)
+        pages = links = 0
+        async with aclosing(iter_static_listing(client, url, first_page, page_limit)) as listing:
+            async for _, page_links in listing:
+                pages += 1
+                links += len(page_links)
+        return pages, links
+
+
+async def crawl_browser(url: str, page_limit: int):
+    async with LazyBrowser() as browser:
+        pages = links = 0
+        async with aclosing(iter_browser_listing(await browser.page(), url, page_limit)) as listing:
+            async for _, page_links in listing:
+                pages += 1
+                links += len(page_links)
+        return pages, links
+
+
+async def crawl_browser_legacy(url: str, page_limit: int):
+    """The previous loop: fixed sleeps and a full page.content() diff to detect a page change."""
+    async with LazyBrowser() as browser:
+        page = await browser.page()
+        await page.goto(url)
+        pages = links = 0
+        while pages < page_limit:
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            await page.wait_for_timeout(2000)
+            links += len(parse_listing(await page.content(), page.url, url)[0])
+            pages += 1
+            old_html = await page.content()
+            next_found = False
+            for label in scrape_irda.NEXT_LABELS:
+                buttons = page.locator(f'a:has-text("{label}")')
+                for i in range(await buttons.count()):
+                    if await buttons.nth(i).is_visible():
+                        await buttons.nth(i).click()
+                        await page.wait_for_timeout(2000)
+                        if await page.content() != old_html:
+                            next_found = True
+                            break
+                if next_found:
+                    break
+            if not next_found:
+                break
+        return pages, links
+
+
+def timed(label: str, coro):
+    started = time.perf_counter()
+    pages, links = asyncio.run(coro)
+    elapsed = time.perf_counter() - started
+    print(f"{label:>16}: {pages / elapsed:8.2f} pages/sec ({pages} pages, {links} links, {elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=40, help="generated listing pages")
+    parser.add_argument("--links", type=int, default=25, help="document links per generated page")
+    parser.add_argument("--latency", type=float, default=0.05, help="server seconds per response")
+    parser.add_argument("--site-dir", help="serve saved listing pages from here instead of generating them")
+    parser.add_argument("--start", default="page_1.html", help="first listing page within --site-dir")
+    parser.add_argument("--page-limit", type=int, default=1000)
+    parser.add_argument("--legacy", action="store_true", help="also time the old fixed-sleep browser loop")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        site_dir, start = args.site_dir, args.start
+        if site_dir is None:
+            site_dir = f"{tmp}/site"
+            start = make_listing_site(site_dir, args.pages, args.links)
+
+        with LocalHTTPServer(site_dir, latency=args.latency) as base_url:
+            url = f"{base_url}/{start}"
+            timed("plain HTTP", crawl_static(url, args.page_limit))
+
+            if scrape_irda.async_playwright is None:
+                print("    browser rows skipped: playwright is not installed")
+                return
+            try:
+                timed("browser", crawl_browser(url, args.page_limit))
+                if args.legacy:
+                    timed("browser (legacy)", crawl_browser_legacy(url, args.page_limit))
+            except Exception as e:
+                print(f"    browser rows skipped: {e}")
+
+
+if __name__ == "__main__":
+    main()
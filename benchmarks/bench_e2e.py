@@ -0,0 +1,257 @@
+# benchmarks/bench_e2e.py
+"""End-to-end offline benchmark: ingest graph, then /ask and /suggest under concurrent load.
+
+Nothing leaves the machine. A synthetic PDF corpus and IRDAI-shaped listing pages are served by a
+local HTTP stand-in; the LangGraph agent (check → scrape → parse → embed) crawls and indexes them
+with a stub embedder; then the FastAPI app runs under uvicorn with the stub chat model and stub
+query embedder (both with configurable latency) and is driven over HTTP at ``--concurrency``.
+Ingest and the server each run in their own process, so peak RSS is theirs alone.
+
+The stub's reply has no per-answer "### <n>" blocks, so batched /suggest measures the fallback
+path (one batch call, then one call per answer).
+
+"one question" sends the same new question from every session at once: concurrent copies share
+one computation (see single_flight.py) and the rest are answer-cache hits.
+
+Reported: ingest wall time, pages/files/chunks per second per node and peak RSS; for each load
+phase requests/sec, p50/p95/p99 latency and errors; and the server's peak RSS.
+
+Run from the repo root:
+    python -m benchmarks.bench_e2e --files 40 --pages 5 --requests 200 --concurrency 16 --llm-latency 0.5
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import random
+import argparse
+import resource
+import tempfile
+import statistics
+import subprocess
+import httpx
+from benchmarks.corpus import TOPICS, circular_reference, make_pdf_corpus, page_text
+from benchmarks.local_http import LocalHTTPServer
+from benchmarks.stubs import StubChatModel, StubEmbeddings
+
+STUB_REPLY = ("<p>This is a <b>stub</b> answer based on the provided excerpts.</p>\n<!-- suggestions -->\n"
+              "1. What are the penalties?\n2. Who does this apply to?\n3. When does it take effect?")
+
+
+def configure(data_dir: str):
+    """Point every data path at ``data_dir``; must run before any pipeline module is imported,
+    since they bind the paths with ``from config import``."""
+    import config
+    config.DATA_DIR = data_dir
+    config.RAW_DIR = os.path.join(data_dir, "raw")
+    config.PARSED_DIR = os.path.join(data_dir, "parsed")
+    config.VECTORSTORE_DIR = os.path.join(data_dir, "vectordb")
+    config.CRAWL_STATE_PATH = os.path.join(data_dir, "crawl_state.json")
+    config.LANGUAGE_CACHE_PATH = os.path.join(config.PARSED_DIR, "languages.json")
+    config.SESSION_DB_PATH = os.path.join(data_dir, "sessions.sqlite3")
+
+
+def offline_tokenizer() -> str:
+    """tiktoken, or bench_tokens' offline stand-in when its BPE tables can't be downloaded."""
+    from benchmarks.bench_tokens import load_tokenizer
+    rng = random.Random(3)
+    return load_tokenizer(page_text(rng, i, 0, 1) for i in range(len(TOPICS)))
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# --- Child processes ---
+def ingest_child(args):
+    configure(args.data_dir)
+    tokenizer = offline_tokenizer()
+    import nodes.embed
+    nodes.embed.get_embedding_backend = lambda: StubEmbeddings(latency=args.embed_latency)
+    from agent_graph import run_langgraph_agent_async
+    from metrics import INGEST_ITEMS, INGEST_SECONDS
+
+    started = time.perf_counter()
+    asyncio.run(run_langgraph_agent_async([args.start_url]))
+    elapsed = time.perf_counter() - started
+    nodes = {}
+    for node, items in (("scrape", ("pages", "files")), ("parse", ("files",)), ("embed", ("chunks",))):
+        _, seconds, _ = INGEST_SECONDS.value(node=node) or (None, 0.0, 0)
+        nodes[node] = {"seconds": seconds, **{item: INGEST_ITEMS.value(node=node, item=item) or 0 for item in items}}
+    print(json.dumps({"seconds": elapsed, "nodes": nodes, "peak_rss_mb": peak_rss_mb(), "tokenizer": tokenizer}))
+
+
+def serve_child(args):
+    configure(args.data_dir)
+    offline_tokenizer()
+    import llm_provider
+    import embeddings
+    from metrics import llm_usage_handler
+    # Stand-ins for the chat model (never built: it is created on first use) and the query embedder
+    llm_provider.llm = StubChatModel(latency=args.llm_latency, token_latency=args.token_latency, reply=STUB_REPLY,
+                                     callbacks=[llm_usage_handler])
+    embeddings.get_embedding_backend = lambda backend=None: StubEmbeddings(query_latency=args.embed_latency)
+    import uvicorn
+    import main
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+# --- Load generation ---
+async def drive(base_url: str, path: str, payloads, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(client, payload):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post(path, json=payload)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(client, payload) for payload in payloads))
+        elapsed = time.perf_counter() - started
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {"requests": len(payloads), "seconds": elapsed, "rps": len(payloads) / elapsed, "errors": errors,
+            "p50": cuts[49] * 1000, "p95": cuts[94] * 1000, "p99": cuts[98] * 1000}
+
+
+def questions(n: int, n_docs: int):
+    """Distinct questions: a topic, an exact circular number, or both."""
+    out = []
+    for j in range(n):
+        i = j % n_docs
+        topic, ref = TOPICS[i % len(TOPICS)], circular_reference(i)
+        out.append([f"What are the rules on {topic}? (#{j})", f"What does circular {ref} require? (#{j})",
+                    f"Summarise the {topic} guidelines in {ref} (#{j})"][j % 3])
+    return out
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def proc_peak_rss_mb(pid: int):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            return next(int(line.split()[1]) / 1024 for line in f if line.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        return None
+
+
+def wait_until_ready(base_url: str, server: subprocess.Popen, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("API server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("API server did not become ready")
+
+
+def report(label: str, r: dict):
+    print(f"{label:>22}: {r['requests']} requests in {r['seconds']:.2f}s = {r['rps']:7.1f} req/s, "
+          f"p50 {r['p50']:7.1f}ms  p95 {r['p95']:7.1f}ms  p99 {r['p99']:7.1f}ms, {r['errors']} errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=40, help="PDFs in the synthetic corpus")
+    parser.add_argument("--pages", type=int, default=5, help="pages per PDF")
+    parser.add_argument("--links", type=int, default=10, help="document links per listing page")
+    parser.add_argument("--site-latency", type=float, default=0.02, help="local server seconds per response")
+    parser.add_argument("--embed-latency", type=float, default=0.2, help="stub seconds per embedding request")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="stub seconds per LLM call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="stub seconds per streamed token")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--verbose", action="store_true", help="show the ingest and server output")
+    parser.add_argument("--role", choices=["ingest", "serve"], help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--start-url", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.role == "ingest":
+        return ingest_child(args)
+    if args.role == "serve":
+        return serve_child(args)
+
+    from benchmarks.bench_crawl import make_listing_site  # imports the scraper, so not in the children
+    child = [sys.executable, "-m", "benchmarks.bench_e2e", "--embed-latency", str(args.embed_latency)]
+    output = None if args.verbose else subprocess.DEVNULL
+    with tempfile.TemporaryDirectory() as tmp:
+        site_dir, data_dir = f"{tmp}/site", f"{tmp}/data"
+        make_pdf_corpus(f"{site_dir}/documents", args.files, args.pages)
+        # Listing pages are full, so the last one links the first PDFs again (as new circulars)
+        start = make_listing_site(f"{site_dir}/listing", -(-args.files // args.links), args.links,
+                                  document_href=lambda i: f"/documents/circular_{i % args.files:04d}.pdf")
+
+        with LocalHTTPServer(site_dir, latency=args.site_latency) as site_url:
+            run = subprocess.run(child + ["--role", "ingest", "--data-dir", data_dir,
+                                          "--start-url", f"{site_url}/listing/{start}"],
+                                 stdout=subprocess.PIPE, stderr=output, text=True, check=True)
+        if args.verbose:
+            print(run.stdout)
+        ingest = json.loads(run.stdout.strip().splitlines()[-1])
+        rates = "  ".join(f"{node} " + ", ".join(f"{n:g} {item} ({n / r['seconds']:.1f}/s)"
+                                                 for item, n in r.items() if item != "seconds" and r["seconds"])
+                          for node, r in ingest["nodes"].items())
+        print(f"{'tokenizer':>22}: {ingest['tokenizer']}")
+        print(f"{'ingest':>22}: {ingest['seconds']:.2f}s  {rates}  |  peak RSS {ingest['peak_rss_mb']:.0f} MB")
+        if not ingest["nodes"]["embed"]["chunks"]:
+            raise RuntimeError("Ingest indexed nothing; rerun with --verbose")
+
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(child + ["--role", "serve", "--data-dir", data_dir, "--port", str(port),
+                                           "--llm-latency", str(args.llm_latency),
+                                           "--token-latency", str(args.token_latency)],
+                                  stdout=output, stderr=output)
+        try:
+            wait_until_ready(base_url, server)
+            asked = questions(args.requests, args.files)
+            ask = [{"question": q, "session_id": f"bench-{i}"} for i, q in enumerate(asked)]
+            report("/ask", asyncio.run(drive(base_url, "/ask", ask, args.concurrency)))
+            repeat = [{"question": q, "session_id": f"bench-repeat-{i}"} for i, q in enumerate(asked)]
+            report("/ask (answer cache)", asyncio.run(drive(base_url, "/ask", repeat, args.concurrency)))
+            before = httpx.get(f"{base_url}/health", timeout=10).json()["coalescing"]
+            burst = [{"question": f"What changed in the {TOPICS[0]} rules this week?", "session_id": f"bench-b-{i}"}
+                     for i in range(args.requests)]
+            report("/ask (one question)", asyncio.run(drive(base_url, "/ask", burst, args.concurrency)))
+            after = httpx.get(f"{base_url}/health", timeout=10).json()["coalescing"]
+            print(f"{'coalescing':>22}: {after['coalesced'] - before['coalesced']} requests joined "
+                  f"{after['started'] - before['started']} computation(s)")
+            fused = [{"question": f"{q} (suggest)", "session_id": f"bench-s-{i}", "suggest": True}
+                     for i, q in enumerate(asked)]
+            report("/ask suggest=true", asyncio.run(drive(base_url, "/ask", fused, args.concurrency)))
+            answers = [f"<p>Answer {i} about {TOPICS[i % len(TOPICS)]}.</p>" for i in range(args.requests)]
+            report("/suggest", asyncio.run(drive(base_url, "/suggest", [{"answer": a} for a in answers],
+                                                 args.concurrency)))
+            fresh = [f"<p>Another answer {i}.</p>" for i in range(args.requests)]
+            batches = [{"answers": fresh[i:i + 5]} for i in range(0, len(fresh), 5)]
+            report("/suggest (batch of 5)", asyncio.run(drive(base_url, "/suggest", batches, args.concurrency)))
+            rss = proc_peak_rss_mb(server.pid)
+            print(f"{'server':>22}: peak RSS {rss:.0f} MB" if rss else f"{'server':>22}: peak RSS n/a")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
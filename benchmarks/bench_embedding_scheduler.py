@@ -0,0 +1,105 @@
+# benchmarks/bench_embedding_scheduler.py
+"""Embedding throughput of the index pipeline against a rate-limited stub embedding API.
+
+Parsing is taken out of the picture (files map to pre-generated chunks) so the rows compare only
+how batches are sent and written:
+
+    sequential   one request at a time, one store write per batch (the previous behaviour)
+    no limiter   several requests in flight with no client-side budget; the stub answers 429s
+                 and the scheduler backs off
+    scheduled    several requests in flight within the budget, writes grouped
+
+The stub's budgets apply to a short window (``--window`` seconds) so a run stays brief; the
+scheduler's limiter uses the same window scaled down by ``--headroom``.
+
+Run from the repo root:
+    python -m benchmarks.bench_embedding_scheduler --files 60 --chunks 40 --latency 0.3 --rpm 20 --window 5
+"""
+import os
+import time
+import argparse
+import tempfile
+from langchain_core.documents import Document
+from langchain_chroma import Chroma
+from benchmarks.corpus import TOPICS
+from benchmarks.stubs import StubEmbeddings
+from embedding_scheduler import EmbeddingScheduler, RateLimiter
+from indexer import stream_index
+from config import EMBED_WRITE_GROUP_CHUNKS
+
+CHUNK_WORDS = 180
+
+
+def make_sources(directory: str, n_files: int) -> dict:
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for i in range(n_files):
+        files[f"doc_{i:04d}.txt"] = path = os.path.join(directory, f"doc_{i:04d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"document {i}")
+    return files
+
+
+def iter_documents(chunks_per_file: int):
+    def generate(changed):
+        for source in changed:
+            topic = TOPICS[hash(source) % len(TOPICS)]
+            yield source, [
+                Document(page_content=f"{source} part {j}: " + f"the insurer shall settle the {topic} claim " *
+                         (CHUNK_WORDS // 8), metadata={"source": source, "page": j})
+                for j in range(chunks_per_file)
+            ]
+    return generate
+
+
+def count_tokens(texts):
+    return [len(text) // 4 for text in texts]  # same estimate the stub uses for its token budget
+
+
+def run(label: str, args, files: dict, in_flight: int, limited: bool, write_group_chunks: int):
+    embeddings = StubEmbeddings(latency=args.latency, rpm=args.rpm, tpm=args.tpm, window=args.window)
+    limiter = (RateLimiter(int(args.tpm * args.headroom), int(args.rpm * args.headroom), period=args.window)
+               if limited else RateLimiter(0, 0))
+    scheduler = EmbeddingScheduler(embeddings, max_in_flight=in_flight, limiter=limiter,
+                                   backoff=args.window / 10)
+    with tempfile.TemporaryDirectory() as work_dir:
+        store = Chroma(embedding_function=embeddings, persist_directory=f"{work_dir}/vectordb")
+        started = time.perf_counter()
+        try:
+            result = stream_index(files, {"files": {}}, f"{work_dir}/vectordb", open_store=lambda: store,
+                                  iter_documents=iter_documents(args.chunks), count_tokens=count_tokens,
+                                  max_batch_chunks=args.batch_chunks, scheduler=scheduler,
+                                  write_group_chunks=write_group_chunks)
+        finally:
+            scheduler.close()
+        elapsed = time.perf_counter() - started
+    print(f"{label:>12}: {result.chunks_embedded / elapsed:8.1f} chunks/s ({elapsed:.2f}s, "
+          f"{result.batches} batches, {embeddings.requests} requests, {embeddings.rejected} rejected (429), "
+          f"{result.writes} writes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=60)
+    parser.add_argument("--chunks", type=int, default=40, help="chunks per file")
+    parser.add_argument("--batch-chunks", type=int, default=50, help="chunks per embedding request")
+    parser.add_argument("--latency", type=float, default=0.3, help="stub seconds per request")
+    parser.add_argument("--rpm", type=int, default=20, help="stub requests allowed per window (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="stub tokens allowed per window (0 = unlimited)")
+    parser.add_argument("--window", type=float, default=5.0, help="stub rate-limit window in seconds")
+    parser.add_argument("--headroom", type=float, default=0.9, help="fraction of the stub budget the limiter uses")
+    parser.add_argument("--in-flight", type=int, default=4)
+    parser.add_argument("--write-group", type=int, default=EMBED_WRITE_GROUP_CHUNKS, help="chunks per grouped store write")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = make_sources(f"{tmp}/sources", args.files)
+        print(f"{args.files * args.chunks} chunks, stub: {args.latency}s/request, "
+              f"{args.rpm or '∞'} requests and {args.tpm or '∞'} tokens per {args.window:g}s")
+        run("sequential", args, files, in_flight=1, limited=False, write_group_chunks=1)
+        run("no limiter", args, files, in_flight=args.in_flight, limited=False, write_group_chunks=args.write_group)
+        run("scheduled", args, files, in_flight=args.in_flight, limited=True, write_group_chunks=args.write_group)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# benchmarks/bench_extraction.py
+"""PDF extraction throughput (pages/sec) at different process-pool sizes, on a synthetic corpus.
+
+Run from the repo root:
+    python -m benchmarks.bench_extraction --files 80 --pages 10 --workers 1 2 4 8
+"""
+import time
+import argparse
+import tempfile
+from extraction import extract_files
+from benchmarks.corpus import make_pdf_corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=80)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = make_pdf_corpus(f"{tmp}/raw", args.files, args.pages)
+        total_pages = args.files * args.pages
+
+        for workers in args.workers:
+            cache_dir = f"{tmp}/parsed_{workers}"  # cold cache for every run
+            started = time.perf_counter()
+            results = extract_files(files, cache_dir=cache_dir, workers=workers)
+            elapsed = time.perf_counter() - started
+            assert len(results) == args.files
+            print(f"workers={workers:>2}: {total_pages / elapsed:8.1f} pages/sec ({elapsed:.2f}s)")
+
+        started = time.perf_counter()
+        extract_files(files, cache_dir=f"{tmp}/parsed_{args.workers[-1]}")
+        print(f"warm cache: {total_pages / (time.perf_counter() - started):8.1f} pages/sec")
+
+
+if __name__ == "__main__":
+    main()
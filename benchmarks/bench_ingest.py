@@ -0,0 +1,133 @@
+# benchmarks/bench_ingest.py
+"""Ingest peak memory and throughput: load-everything-then-embed vs the streaming index pipeline.
+
+Each (mode, corpus size) runs in fresh subprocesses: one timed run that also reports peak RSS, and
+one under tracemalloc for the peak Python heap held by the pipeline itself (pages, chunks, batches),
+which is the part that grows with the corpus. Embedding goes to a stub that sleeps like a remote API;
+parsing uses the real process pool on a synthetic PDF corpus, with a cold page cache every run.
+
+Run from the repo root:
+    python -m benchmarks.bench_ingest --files 40 160 --pages 10 --embed-latency 0.5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import tracemalloc
+import subprocess
+from langchain_chroma import Chroma
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from benchmarks.corpus import make_pdf_corpus
+from benchmarks.stubs import StubEmbeddings
+from extraction import extract_files, iter_document_chunks, pages_to_documents
+from indexer import stream_index, assign_chunk_ids
+from embedding_scheduler import EmbeddingScheduler, RateLimiter
+from language import detect_languages, _get_identifier
+from config import EMBED_BATCH_TOKENS, EMBED_BATCH_MAX_CHUNKS
+
+
+def count_tokens(texts):
+    # tiktoken needs its BPE files from the network; ~4 characters per token is close enough for batching
+    return [len(text) // 4 for text in texts]
+
+
+def load_all(files, splitter, store, work_dir):
+    """The previous flow: parse and language-tag every file, split everything, then batch and embed."""
+    parsed = extract_files(files, cache_dir=f"{work_dir}/parsed")
+    languages = detect_languages(files, parsed, cache_path=f"{work_dir}/languages.json", workers=1)
+    all_docs = [doc for source, pages in parsed.items()
+                for doc in pages_to_documents(source, pages, languages[source]["pages"])]
+    chunks = splitter.split_documents(all_docs)
+    for source in files:
+        assign_chunk_ids(source, [c for c in chunks if c.metadata["source"] == source])
+
+    batches, current, tokens = [], [], 0
+    for chunk, n in zip(chunks, count_tokens(c.page_content for c in chunks)):
+        if current and (tokens + n > EMBED_BATCH_TOKENS or len(current) >= EMBED_BATCH_MAX_CHUNKS):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(chunk)
+        tokens += n
+    if current:
+        batches.append(current)
+
+    for batch in batches:
+        store.add_documents(batch, ids=[c.metadata["chunk_id"] for c in batch])
+    return len(chunks)
+
+
+def streaming(files, splitter, store, work_dir):
+    run = stream_index(
+        files,
+        {"files": {}},
+        f"{work_dir}/vectordb",
+        open_store=lambda: store,
+        iter_documents=lambda changed: iter_document_chunks(
+            changed, splitter, cache_dir=f"{work_dir}/parsed", language_cache_path=f"{work_dir}/languages.json"
+        ),
+        count_tokens=count_tokens,
+        # No provider budget: the stub has none, and load_all isn't paced either
+        scheduler=EmbeddingScheduler(store.embeddings, limiter=RateLimiter(0, 0)),
+    )
+    return run.chunks_embedded
+
+
+def child(args):
+    files = {name: os.path.join(args.corpus_dir, name) for name in sorted(os.listdir(args.corpus_dir))}
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    embeddings = StubEmbeddings(latency=args.embed_latency)
+    _get_identifier()  # the language model takes seconds to load; keep it out of both timings
+    with tempfile.TemporaryDirectory() as work_dir:
+        store = Chroma(embedding_function=embeddings, persist_directory=f"{work_dir}/vectordb")
+        if args.trace:
+            tracemalloc.start()
+        started = time.perf_counter()
+        chunks = (streaming if args.mode == "stream" else load_all)(files, splitter, store, work_dir)
+        elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "chunks": chunks,
+        "seconds": elapsed,
+        "first_embed": (embeddings.first_request_at or started) - started,
+        "requests": embeddings.requests,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_heap_mb": tracemalloc.get_traced_memory()[1] / 2**20 if args.trace else None,
+    }))
+
+
+def run_child(mode: str, corpus_dir: str, embed_latency: float, trace: bool = False) -> dict:
+    command = [sys.executable, "-m", "benchmarks.bench_ingest", "--mode", mode, "--corpus-dir", corpus_dir,
+               "--embed-latency", str(embed_latency)] + (["--trace"] if trace else [])
+    out = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, nargs="+", default=[40, 160])
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--embed-latency", type=float, default=0.5, help="stub seconds per embedding request")
+    parser.add_argument("--mode", choices=["load_all", "stream"], help=argparse.SUPPRESS)
+    parser.add_argument("--corpus-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--trace", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        return child(args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_files in args.files:
+            corpus_dir = f"{tmp}/raw_{n_files}"
+            make_pdf_corpus(corpus_dir, n_files, args.pages)
+            for mode in ("load_all", "stream"):
+                r = run_child(mode, corpus_dir, args.embed_latency)
+                heap = run_child(mode, corpus_dir, args.embed_latency, trace=True)["peak_heap_mb"]
+                print(f"files={n_files:>4} {mode:>8}: {r['chunks'] / r['seconds']:7.1f} chunks/s "
+                      f"({r['seconds']:.2f}s, {r['requests']} requests, first embed after {r['first_embed']:.2f}s), "
+                      f"peak RSS {r['peak_rss_mb']:.0f} MB, peak pipeline heap {heap:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
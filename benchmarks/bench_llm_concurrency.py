@@ -0,0 +1,113 @@
+# benchmarks/bench_llm_concurrency.py
+"""Throughput of the QA path against a stubbed local LLM: old executor path vs native async.
+
+Run from the repo root:
+    python -m benchmarks.bench_llm_concurrency --requests 200 --concurrency 50 --latency 0.3
+"""
+import time
+import asyncio
+import argparse
+import statistics
+
+from langchain_core.documents import Document
+from langchain.chains.question_answering import load_qa_chain
+import llm_provider
+import qa_chain_async as qa
+from benchmarks.stubs import StubChatModel
+from benchmarks.bench_tokens import load_tokenizer
+from tokens import tag_token_counts
+
+QUERY = "What are the claim settlement timelines for health insurance?"
+EXCERPT = "Excerpt {i}: insurers shall settle health claims within 30 days. "
+
+
+def make_docs(n: int):
+    """Retrieved chunks as ingest stores them, with ``token_count`` already in their metadata."""
+    docs = [
+        Document(page_content=EXCERPT.format(i=i) * 10, metadata={"source": f"circular_{i}.pdf", "page": i})
+        for i in range(n)
+    ]
+    tag_token_counts(docs)
+    return docs
+
+
+async def legacy_request(llm, docs):
+    """The pre-async implementation: chain.run in the default executor, blocking summarize on the loop."""
+    chain_type = "stuff" if len(docs) <= 3 else "map_reduce"
+    chain = load_qa_chain(llm, chain_type=chain_type)
+    loop = asyncio.get_event_loop()
+    tasks = [
+        loop.run_in_executor(None, lambda b=batch: chain.run({"input_documents": b, "question": QUERY}))
+        for batch in qa.split_chunks_by_tokens(docs)
+    ]
+    answers = await asyncio.gather(*tasks)
+    llm.invoke(f"Summarize: {answers}")
+
+
+async def async_request(llm, docs):
+    await qa.answer_question(QUERY, docs, [])
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.05):
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def run(label, request_fn, llm, docs, requests: int, concurrency: int):
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with gate:
+            started = time.perf_counter()
+            await request_fn(llm, docs)
+            latencies.append(time.perf_counter() - started)
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worst_lag = await lag_task
+
+    latencies.sort()
+    print(f"{label:>8}: {requests / elapsed:7.2f} req/s  p50={statistics.median(latencies):6.2f}s "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1]:6.2f}s  max loop stall={worst_lag * 1000:7.1f}ms "
+          f"llm calls={llm.calls}")
+
+
+async def compare(args):
+    print(f"tokenizer: {load_tokenizer([EXCERPT.format(i=i) for i in range(args.docs)] + [QUERY])}")
+    docs = make_docs(args.docs)
+
+    legacy_llm = StubChatModel(latency=args.latency)
+    await run("before", legacy_request, legacy_llm, docs, args.requests, args.concurrency)
+
+    # The async path with no single-pass budget: always map_reduce + summarize, like the legacy path
+    budget, qa.SINGLE_PASS_TOKEN_BUDGET = qa.SINGLE_PASS_TOKEN_BUDGET, 0
+    llm_provider.llm = StubChatModel(latency=args.latency)
+    await run("after", async_request, llm_provider.llm, docs, args.requests, args.concurrency)
+    qa.SINGLE_PASS_TOKEN_BUDGET = budget
+
+    # Same async path, but letting the planner pick single-pass when the context fits
+    llm_provider.llm = StubChatModel(latency=args.latency)
+    await run("planned", async_request, llm_provider.llm, docs, args.requests, args.concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.3, help="stub LLM seconds per call")
+    parser.add_argument("--docs", type=int, default=10)
+    # One event loop for all runs: the shared LLM semaphore binds to the loop that first waits on it
+    asyncio.run(compare(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/bench_query_embedding.py
+"""Retrieval latency and query-embedding cache hit rate, fully offline.
+
+Run from the repo root:
+    python -m benchmarks.bench_query_embedding --queries 500 --embed-latency-ms 150
+"""
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from langchain_chroma import Chroma
+from embeddings import LocalHashEmbeddings, CachedQueryEmbeddings
+
+TOPICS = [
+    "solvency margin", "grievance redressal", "health insurance portability", "motor third party premium",
+    "saral jeevan bima", "reinsurance cession", "corporate agent registration", "policyholder protection",
+    "free look period", "claim settlement timelines", "unit linked products", "micro insurance",
+]
+TEMPLATES = [
+    "What is the {t}?", "what is the {t}", "Explain {t} rules", "  What is the   {t}?? ",
+    "Latest circular on {t}", "Who regulates {t}?",
+]
+
+
+class SlowEmbeddings(LocalHashEmbeddings):
+    """Local embedder with an artificial round-trip, standing in for a remote API."""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+
+def build_store(persist_directory: str, n_chunks: int) -> None:
+    rng = random.Random(7)
+    texts = [
+        f"Circular {i}: guidance on {rng.choice(TOPICS)} and {rng.choice(TOPICS)} for insurers. " * 5
+        for i in range(n_chunks)
+    ]
+    store = Chroma(persist_directory=persist_directory, embedding_function=LocalHashEmbeddings())
+    store.add_texts(texts, metadatas=[{"source": f"doc{i // 10}.pdf", "page": i % 10} for i in range(n_chunks)])
+
+
+def workload(n: int, seed: int = 11):
+    # Skewed towards a few popular questions, like the sales-portal traffic
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(TOPICS))]
+    return [rng.choice(TEMPLATES).format(t=rng.choices(TOPICS, weights)[0]) for _ in range(n)]
+
+
+def run(label: str, persist_directory: str, embedding, queries) -> None:
+    store = Chroma(persist_directory=persist_directory, embedding_function=embedding)
+    timings = []
+    for q in queries:
+        started = time.perf_counter()
+        store.max_marginal_relevance_search(q, k=10, fetch_k=30)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:>10}: p50={statistics.median(timings):7.2f}ms p95={p95:7.2f}ms "
+          f"mean={statistics.fmean(timings):7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--embed-latency-ms", type=float, default=150.0)
+    parser.add_argument("--disk-cache", default="", help="optional sqlite path for the on-disk tier")
+    args = parser.parse_args()
+
+    queries = workload(args.queries)
+    with tempfile.TemporaryDirectory() as tmp:
+        build_store(tmp, args.chunks)
+
+        uncached = SlowEmbeddings(args.embed_latency_ms / 1000)
+        run("uncached", tmp, uncached, queries)
+
+        backend = SlowEmbeddings(args.embed_latency_ms / 1000)
+        cached = CachedQueryEmbeddings(backend, disk_path=args.disk_cache)
+        run("cached", tmp, cached, queries)
+
+    print(f"backend calls: uncached={uncached.calls} cached={backend.calls}")
+    print(f"cache stats: {cached.cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# benchmarks/bench_retrieval.py
+"""Retrieval quality and latency: vector MMR vs BM25 vs hybrid (RRF), on a fixed local question set.
+
+Builds a synthetic circular corpus through the real indexer (Chroma + the BM25 keyword index) with
+the offline hashing embedder, then runs the same questions through ``retrieve_documents`` in each
+mode. Questions cite exact circular numbers, ask about a topic, or both; a question is answered
+when a chunk of its target circular comes back. Query embeddings sleep like a remote API call.
+
+Run from the repo root:
+    python -m benchmarks.bench_retrieval --docs 120 --embed-latency-ms 150
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+from langchain_core.documents import Document
+from langchain_chroma import Chroma
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+import qa_chain_async as qa
+from benchmarks.corpus import TOPICS, circular_reference, page_text
+from embeddings import LocalHashEmbeddings
+from indexer import stream_index
+from vectorstore_manager import VectorStoreManager
+
+MODES = {
+    # label: (hybrid, lexical-only for identifiers, vector weight, lexical weight)
+    "vector MMR": (False, False, 1.0, 0.0),
+    "RRF, BM25 weight only": (True, False, 0.0, 1.0),
+    "hybrid RRF": (True, False, 1.0, 1.0),
+    "hybrid + exact ids": (True, True, 1.0, 1.0),
+}
+
+
+class CountingEmbeddings(LocalHashEmbeddings):
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+
+def build_index(persist_directory: str, n_docs: int, pages: int):
+    rng = random.Random(5)
+    texts = {}
+    for i in range(n_docs):
+        # Circulars cite each other, so a reference also appears in documents that are not about it
+        texts[f"circular_{i:04d}.pdf"] = [
+            page_text(rng, i, p, pages) + "\nRead with circulars "
+            + " and ".join(circular_reference(rng.randrange(n_docs)) for _ in range(3)) + "."
+            for p in range(pages)
+        ]
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    sources = {}
+    for name in texts:
+        sources[name] = os.path.join(persist_directory, "..", name)
+        with open(sources[name], "w", encoding="utf-8") as f:
+            f.write(name)
+
+    def iter_documents(changed):
+        for name in changed:
+            docs = [Document(page_content=t, metadata={"source": name, "page": p}) for p, t in enumerate(texts[name])]
+            yield name, splitter.split_documents(docs)
+
+    stream_index(sources, {"files": {}}, persist_directory,
+                 open_store=lambda: Chroma(embedding_function=LocalHashEmbeddings(), persist_directory=persist_directory),
+                 iter_documents=iter_documents, count_tokens=lambda ts: [len(t) // 4 for t in ts])
+
+
+def question_set(n_docs: int, n: int, seed: int = 13):
+    """(question, target source) triples of three kinds, fixed by the seed."""
+    rng = random.Random(seed)
+    questions = []
+    for j in range(n):
+        i = rng.randrange(n_docs)
+        topic, ref = TOPICS[i % len(TOPICS)], circular_reference(i)
+        kind = j % 3
+        if kind == 0:
+            questions.append(("exact id", f"What does circular {ref} require?", f"circular_{i:04d}.pdf"))
+        elif kind == 1:
+            questions.append(("topic + id", f"Summarise the {topic} guidelines in {ref}", f"circular_{i:04d}.pdf"))
+        else:
+            questions.append(("topic", f"What are the guidelines on {topic}?", topic))
+    return questions
+
+
+def answered(docs, target: str) -> int:
+    """1-based rank of the first relevant document, 0 if none."""
+    for rank, doc in enumerate(docs, start=1):
+        source = doc.metadata.get("source", "")
+        if source == target or (not target.endswith(".pdf") and target in doc.page_content):
+            return rank
+    return 0
+
+
+async def run_mode(label: str, manager: VectorStoreManager, embeddings: CountingEmbeddings, questions):
+    qa.HYBRID_RETRIEVAL, qa.LEXICAL_ONLY_FOR_IDENTIFIERS, qa.HYBRID_VECTOR_WEIGHT, qa.HYBRID_LEXICAL_WEIGHT = MODES[label]
+    qa.vectorstore_manager = manager
+    calls_before = embeddings.calls
+    by_kind, timings = {}, []
+    for kind, question, target in questions:
+        started = time.perf_counter()
+        docs = await qa.retrieve_documents(question)
+        timings.append((time.perf_counter() - started) * 1000)
+        by_kind.setdefault(kind, []).append(answered(docs, target))
+    quality = "  ".join(
+        f"{kind}: hit@10 {sum(1 for r in ranks if r) / len(ranks):.2f} MRR {statistics.fmean(1 / r if r else 0 for r in ranks):.2f}"
+        for kind, ranks in by_kind.items())
+    timings.sort()
+    print(f"{label:>21}: {quality}  |  p50 {statistics.median(timings):6.1f}ms "
+          f"p95 {timings[int(len(timings) * 0.95) - 1]:6.1f}ms, {embeddings.calls - calls_before} embedding calls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=120)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--questions", type=int, default=90)
+    parser.add_argument("--embed-latency-ms", type=float, default=150.0)
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger("qa_chain_async").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        persist_directory = f"{tmp}/vectordb"
+        os.makedirs(persist_directory)
+        build_index(persist_directory, args.docs, args.pages)
+        embeddings = CountingEmbeddings(args.embed_latency_ms / 1000)
+        manager = VectorStoreManager(persist_directory, embedding_factory=lambda: embeddings)
+        manager.open()
+        print(f"{manager.index_size} chunks from {args.docs} circulars, {args.questions} questions")
+        questions = question_set(args.docs, args.questions)
+        for label in MODES:
+            asyncio.run(run_mode(label, manager, embeddings, questions))
+        manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# benchmarks/bench_startup.py
+"""API worker cold start: import time of ``main``, then time until the worker is live and ready.
+
+Each run is a fresh interpreter. "import" rows time ``import main`` alone (median of ``--runs``),
+with the slowest top-level packages from ``python -X importtime``. "serve" rows start uvicorn
+for each WARMUP_MODE and report when /health (liveness) and /ready (readiness) first answer 200,
+plus the import and warmup times the worker itself reports on /ready.
+
+The index is an empty directory and no request reaches OpenAI (constructing the clients needs
+no network). Offline, tiktoken cannot fetch its tables, so warmup logs that and skips it.
+
+Run from the repo root:
+    python -m benchmarks.bench_startup --runs 5
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+import httpx
+
+
+def configure(data_dir: str):
+    import config
+    config.DATA_DIR = data_dir
+    config.VECTORSTORE_DIR = os.path.join(data_dir, "vectordb")
+    config.SESSION_DB_PATH = os.path.join(data_dir, "sessions.sqlite3")
+    os.makedirs(config.VECTORSTORE_DIR, exist_ok=True)
+
+
+# --- Child processes ---
+def import_child(args):
+    configure(args.data_dir)
+    started = time.perf_counter()
+    import main  # noqa: F401
+    print(time.perf_counter() - started)
+
+
+def serve_child(args):
+    configure(args.data_dir)
+    import uvicorn
+    import main
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+# --- Measurements ---
+def slowest_imports(child, top: int):
+    """(cumulative seconds, package) of the slowest top-level imports under ``import main``."""
+    err = subprocess.run([sys.executable, "-X", "importtime"] + child, capture_output=True, text=True).stderr
+    totals = {}
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        package = name.strip().split(".")[0]
+        if package != name.strip() or not cumulative.strip().isdigit():
+            continue  # top-level packages only; their cumulative time covers their submodules
+        totals[package] = max(totals.get(package, 0), int(cumulative) / 1e6)
+    return sorted(((s, p) for p, s in totals.items()), reverse=True)[:top]
+
+
+def time_until(url: str, server: subprocess.Popen, started: float, timeout: float = 120):
+    while time.perf_counter() - started < timeout:
+        if server.poll() is not None:
+            raise RuntimeError("API server exited during startup")
+        try:
+            response = httpx.get(url, timeout=2)
+            if response.status_code == 200:
+                return time.perf_counter() - started, response.json()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)
+    raise RuntimeError(f"{url} did not answer 200 within {timeout}s")
+
+
+def free_port() -> int:
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", default=["background", "blocking", "off"],
+                        choices=["background", "blocking", "off"])
+    parser.add_argument("--role", choices=["import", "serve"], help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.role == "import":
+        return import_child(args)
+    if args.role == "serve":
+        return serve_child(args)
+
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-benchmark")}
+    with tempfile.TemporaryDirectory() as data_dir:
+        child = ["-m", "benchmarks.bench_startup", "--data-dir", data_dir]
+        seconds = [float(subprocess.run([sys.executable] + child + ["--role", "import"], env=env, check=True,
+                                        capture_output=True, text=True).stdout.strip().splitlines()[-1])
+                   for _ in range(args.runs)]
+        print(f"{'import main':>18}: median {statistics.median(seconds):.2f}s "
+              f"(min {min(seconds):.2f}s, max {max(seconds):.2f}s over {args.runs} runs)")
+        print(f"{'slowest packages':>18}: " + ", ".join(
+            f"{package} {s:.2f}s" for s, package in slowest_imports(child + ["--role", "import"], 6)))
+
+        for mode in args.modes:
+            port = free_port()
+            started = time.perf_counter()
+            server = subprocess.Popen([sys.executable] + child + ["--role", "serve", "--port", str(port)],
+                                      env={**env, "WARMUP_MODE": mode},
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                live, _ = time_until(f"http://127.0.0.1:{port}/health", server, started)
+                ready, body = time_until(f"http://127.0.0.1:{port}/ready", server, started)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+            warmup = f"{body['warmup_seconds']:.2f}s" if body["warmup_seconds"] is not None else "on first use"
+            print(f"{'serve ' + mode:>18}: live after {live:.2f}s, ready after {ready:.2f}s "
+                  f"(worker: imports {body['import_seconds']:.2f}s, warmup {warmup})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_tokens.py
+"""Token counting cost on the ingest path (sizing chunks for embedding batches) and the query path
+(budgeting retrieved documents for the answer prompt).
+
+Ingest rows count every chunk of a synthetic corpus: the previous per-call
+``encoding_for_model(...).encode`` against the cached encoder, one text at a time and batched.
+Query rows size ``--k`` retrieved documents the way /ask does (plan + batch split): re-encoding
+them against reading the count stored in their metadata at ingest.
+
+tiktoken downloads its BPE tables on first use. Without network access the benchmark registers a
+byte-level stand-in under the same encoding names, which keeps the relative costs but not the
+absolute ones; the first line of output says which tokenizer was used.
+
+Run from the repo root:
+    python -m benchmarks.bench_tokens --chunks 5000 --queries 200
+"""
+import time
+import random
+import argparse
+import tiktoken
+import tiktoken.registry
+from langchain_core.documents import Document
+from benchmarks.corpus import page_text
+from tokens import EMBEDDING_MODEL, count_tokens, count_tokens_batch, document_tokens, get_encoding, tag_token_counts
+
+CL100K_PATTERN = (r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+"""
+                  r"""|\s++$|\s*[\r\n]|\s+(?!\S)|\s""")
+
+
+def load_tokenizer(texts) -> str:
+    try:
+        get_encoding(EMBEDDING_MODEL)
+        return f"tiktoken {get_encoding(EMBEDDING_MODEL).name}"
+    except Exception:
+        pass
+    # Byte tokens plus every prefix of the corpus words, so BPE still merges whole words
+    ranks = {bytes([b]): b for b in range(256)}
+    for word in sorted({w for text in texts for w in text.split()}):
+        for piece in (word, " " + word):
+            encoded = piece.encode("utf-8")
+            for end in range(2, len(encoded) + 1):
+                ranks.setdefault(encoded[:end], len(ranks))
+    for name in ("cl100k_base", "o200k_base"):
+        tiktoken.registry.ENCODINGS[name] = tiktoken.Encoding(
+            name=name, pat_str=CL100K_PATTERN, mergeable_ranks=ranks, special_tokens={})
+    get_encoding.cache_clear()
+    return f"offline byte-level stand-in ({len(ranks)} tokens)"
+
+
+def legacy_count(text: str) -> int:
+    return len(tiktoken.encoding_for_model(EMBEDDING_MODEL).encode(text))
+
+
+def timed(label: str, unit: str, n: int, fn):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:>28}: {elapsed / n * 1e6:9.1f} µs/{unit} ({elapsed:.3f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--chunk-chars", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10, help="documents retrieved per query")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    texts = []
+    while len(texts) < args.chunks:
+        page = page_text(rng, len(texts), 0, 1)
+        texts.extend(page[i:i + args.chunk_chars] for i in range(0, len(page), args.chunk_chars))
+    texts = texts[:args.chunks]
+    print(f"tokenizer: {load_tokenizer(texts)}")
+    assert [legacy_count(t) for t in texts[:50]] == count_tokens_batch(texts[:50])
+
+    print("ingest (count every chunk):")
+    timed("encoding_for_model per text", "chunk", len(texts), lambda: [legacy_count(t) for t in texts])
+    timed("cached encoder per text", "chunk", len(texts), lambda: [count_tokens(t) for t in texts])
+    timed("cached encoder, batched", "chunk", len(texts), lambda: count_tokens_batch(texts))
+
+    docs = [Document(page_content=t, metadata={"source": "bench.pdf", "page": i}) for i, t in enumerate(texts)]
+    tag_token_counts(docs)
+    retrieved = [rng.sample(docs, args.k) for _ in range(args.queries)]
+
+    def legacy_query():
+        for batch in retrieved:
+            sum(legacy_count(d.page_content) for d in batch)  # plan_answer
+            [legacy_count(d.page_content) for d in batch]  # split_chunks_by_tokens
+
+    def stored_query():
+        for batch in retrieved:
+            sum(document_tokens(batch))
+            document_tokens(batch)
+
+    print(f"query (size {args.k} retrieved documents twice per /ask):")
+    timed("re-encode documents", "query", args.queries, legacy_query)
+    timed("stored token_count", "query", args.queries, stored_query)
+
+
+if __name__ == "__main__":
+    main()
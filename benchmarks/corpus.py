@@ -0,0 +1,49 @@
+# benchmarks/corpus.py
+"""Synthetic IRDAI-like PDF corpus for offline benchmarks."""
+import os
+import random
+import fitz  # PyMuPDF
+
+TOPICS = [
+    "solvency margin", "grievance redressal", "health insurance portability", "motor third party premium",
+    "Saral Jeevan Bima", "reinsurance cession", "corporate agent registration", "policyholder protection",
+    "free look period", "claim settlement timelines", "unit linked products", "micro insurance",
+]
+
+
+def circular_reference(i: int) -> str:
+    return f"IRDAI/HLT/CIR/MISC/{100 + i}/{2020 + i % 5}"
+
+
+def page_text(rng: random.Random, doc_index: int, page: int, pages: int, words: int = 350) -> str:
+    topic = TOPICS[doc_index % len(TOPICS)]
+    lines = [
+        "Insurance Regulatory and Development Authority of India",
+        f"Ref: {circular_reference(doc_index)}",
+        f"Subject: Guidelines on {topic}",
+        "",
+    ]
+    body = []
+    for _ in range(words):
+        body.append(rng.choice(["insurer", "shall", "policyholder", "claim", "within", "days", "premium",
+                                "section", "regulation", "authority", "ensure", "the", "of", "and", topic]))
+    lines.append(" ".join(body))
+    lines.append(f"Page {page + 1} of {pages}")
+    return "\n".join(lines)
+
+
+def make_pdf_corpus(directory: str, n_files: int = 40, pages_per_file: int = 10, seed: int = 3) -> dict:
+    """Write ``n_files`` PDFs into ``directory``; returns {file name: path}."""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    files = {}
+    for i in range(n_files):
+        name = f"circular_{i:04d}.pdf"
+        path = os.path.join(directory, name)
+        with fitz.open() as pdf:
+            for p in range(pages_per_file):
+                page = pdf.new_page()
+                page.insert_textbox(fitz.Rect(40, 40, 560, 800), page_text(rng, i, p, pages_per_file), fontsize=8)
+            pdf.save(path)
+        files[name] = path
+    return files
@@ -0,0 +1,98 @@
+# benchmarks/eval_reranker.py
+"""Offline reranker evaluation: answer quality vs LLM context size for each scorer, top-N and token budget.
+
+Builds the synthetic circular index from bench_retrieval (hashing embedder, no network), retrieves
+``--candidates`` chunks per question once with the production hybrid retrieval, then reranks the same
+candidates under every setting. A question is answered when a chunk of its target circular is kept;
+"context tokens" is what would be sent to the LLM. The first row is today's behaviour (the top
+RETRIEVAL_K results, no reranking). The cross-encoder row is skipped when sentence-transformers or
+its model is not available locally.
+
+Run from the repo root:
+    python -m benchmarks.eval_reranker --docs 120 --top-n 4 6 8 --budget 1500 3000 --retrieval-weight 0 1
+"""
+import os
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+import qa_chain_async as qa
+from benchmarks.bench_retrieval import CountingEmbeddings, answered, build_index, question_set
+from reranker import LexicalOverlapScorer, get_scorer, rerank
+from tokens import document_tokens
+from vectorstore_manager import VectorStoreManager
+from config import RETRIEVAL_K, RERANK_RETRIEVAL_WEIGHT
+
+
+def available_scorers():
+    scorers = {"none (budget only)": None, "lexical": LexicalOverlapScorer()}
+    try:
+        scorers["cross-encoder"] = get_scorer("cross-encoder")
+    except Exception as e:  # not installed, or the model can't be fetched offline
+        print(f"(cross-encoder skipped: {type(e).__name__}: {e})")
+    return scorers
+
+
+def report(label: str, questions, kept_lists, timings=None):
+    by_kind = {}
+    for (kind, _, target), docs in zip(questions, kept_lists):
+        by_kind.setdefault(kind, []).append(answered(docs, target))
+    quality = "  ".join(
+        f"{kind}: hit {sum(1 for r in ranks if r) / len(ranks):.2f} MRR {statistics.fmean(1 / r if r else 0 for r in ranks):.2f}"
+        for kind, ranks in by_kind.items())
+    chunks = statistics.fmean(len(docs) for docs in kept_lists)
+    tokens = statistics.fmean(sum(document_tokens(docs)) for docs in kept_lists)
+    latency = ""
+    if timings:
+        timings = sorted(timings)
+        latency = f", rerank p50 {statistics.median(timings):5.1f}ms p95 {timings[int(len(timings) * 0.95) - 1]:5.1f}ms"
+    print(f"{label:>50}: {quality}  |  {chunks:4.1f} chunks, {tokens:6.0f} context tokens{latency}")
+
+
+async def retrieve_all(questions, k: int):
+    return [await qa.retrieve_documents(question, None, k) for _, question, _ in questions]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=120)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--questions", type=int, default=90)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--top-n", type=int, nargs="+", default=[4, 6, 8])
+    parser.add_argument("--budget", type=int, nargs="+", default=[1500, 3000])
+    parser.add_argument("--retrieval-weight", type=float, nargs="+", default=[RERANK_RETRIEVAL_WEIGHT],
+                        help="RRF weight of the retrieval order blended with the scorer's")
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger("qa_chain_async").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        persist_directory = f"{tmp}/vectordb"
+        os.makedirs(persist_directory)
+        build_index(persist_directory, args.docs, args.pages)
+        embeddings = CountingEmbeddings()
+        manager = VectorStoreManager(persist_directory, embedding_factory=lambda: embeddings)
+        manager.open()
+        qa.vectorstore_manager = manager
+        questions = question_set(args.docs, args.questions)
+        print(f"{manager.index_size} chunks from {args.docs} circulars, {args.questions} questions, "
+              f"{args.candidates} candidates each")
+
+        report(f"top {RETRIEVAL_K}, no reranking", questions, asyncio.run(retrieve_all(questions, RETRIEVAL_K)))
+        candidates = asyncio.run(retrieve_all(questions, args.candidates))
+        report(f"all {args.candidates} candidates", questions, candidates)
+        for name, scorer in available_scorers().items():
+            for weight in args.retrieval_weight if scorer else [0.0]:
+                for top_n in args.top_n:
+                    for budget in args.budget:
+                        results = [rerank(question, docs, scorer, top_n, budget, weight)
+                                   for (_, question, _), docs in zip(questions, candidates)]
+                        label = f"{name}{f', retrieval x{weight:g}' if scorer else ''}, top {top_n}, {budget} tokens"
+                        report(label, questions, [r.docs for r in results], [r.seconds * 1000 for r in results])
+        manager.close()
+
+
+if __name__ == "__main__":
+    main()
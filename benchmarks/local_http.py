@@ -0,0 +1,88 @@
+# benchmarks/local_http.py
+"""Threaded local HTTP stand-in for irdai.gov.in: serves a directory with Range support,
+optional per-response latency and injected failures (5xx, dropped connections)."""
+import os
+import time
+import random
+import threading
+from functools import partial
+from email.utils import formatdate
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FaultInjectingHandler(SimpleHTTPRequestHandler):
+    latency = 0.0
+    error_rate = 0.0        # share of requests answered with 503
+    drop_rate = 0.0         # share of responses cut off half-way through the body
+    rng = random.Random(5)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if self.rng.random() < self.error_rate:
+            self.send_error(503)
+            return
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) or not os.path.exists(path):
+            return super().do_GET()
+
+        with open(path, "rb") as f:
+            data = f.read()
+        stat = os.stat(path)
+        etag = f'"{int(stat.st_mtime)}-{stat.st_size}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        if self.headers.get("If-None-Match") == etag or self.headers.get("If-Modified-Since") == last_modified:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and range_header.startswith("bytes="):
+            start = int(range_header[len("bytes="):].split("-")[0] or 0)
+            if start >= len(data):
+                self.send_response(416)
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        body = data[start:]
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+
+        if self.rng.random() < self.drop_rate:
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+class LocalHTTPServer:
+    """``with LocalHTTPServer(directory) as base_url: ...``"""
+
+    def __init__(self, directory: str, latency: float = 0.0, error_rate: float = 0.0, drop_rate: float = 0.0):
+        handler = type("Handler", (FaultInjectingHandler,), {
+            "latency": latency, "error_rate": error_rate, "drop_rate": drop_rate,
+        })
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=directory))
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> str:
+        self.thread.start()
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,139 @@
+# benchmarks/stubs.py
+"""Deterministic local stand-ins for the OpenAI clients, with configurable latency."""
+import time
+import asyncio
+import hashlib
+import threading
+from typing import Any, List, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class StubChatModel(BaseChatModel):
+    """Sleeps like a remote model (blocking in sync calls, non-blocking in async ones)
+    and answers with a short fixed HTML reply."""
+
+    latency: float = 0.5
+    token_latency: float = 0.0
+    reply: str = "<p>This is a <b>stub</b> answer based on the provided excerpts.</p>"
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat-model"
+
+    def get_num_tokens(self, text: str) -> int:
+        # map_reduce asks the model to size its inputs; a word count keeps this offline
+        return len(text.split())
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        self.calls += 1
+        # Usage reported like the OpenAI client does, in words rather than tokens
+        usage = {"prompt_tokens": sum(len(str(m.content).split()) for m in messages),
+                 "completion_tokens": len(self.reply.split())}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))],
+                          llm_output={"token_usage": usage})
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+    def _tokens(self):
+        return [word + " " for word in self.reply.split(" ")]
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        for token in self._tokens():
+            time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        for token in self._tokens():
+            await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class StubRateLimitError(Exception):
+    """Shaped like the OpenAI client's 429 error: a ``status_code`` and a ``response`` with headers."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__("rate limit exceeded")
+        self.response = type("Response", (), {"headers": {"retry-after": str(retry_after)} if retry_after else {}})()
+
+
+class StubEmbeddings(Embeddings):
+    """Sleeps ``latency`` seconds per request (plus ``text_latency`` per text) like a remote
+    embedding API, and returns cheap deterministic vectors derived from a hash of the text.
+    Query embeddings sleep ``query_latency`` (without blocking in the async call).
+
+    With ``rpm``/``tpm`` set, the stub enforces those budgets per ``window`` seconds the way the
+    OpenAI API does, as buckets that refill continuously (4 characters count as a token); a request
+    the buckets can't cover fails with a StubRateLimitError. Safe to call from several threads.
+    """
+
+    def __init__(self, dim: int = 64, latency: float = 0.2, text_latency: float = 0.0,
+                 rpm: int = 0, tpm: int = 0, window: float = 60.0, retry_after: Optional[float] = None,
+                 query_latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.query_latency = query_latency
+        self.text_latency = text_latency
+        self.limits = {"requests": rpm, "tokens": tpm}
+        self.window = window
+        self.retry_after = retry_after
+        self.requests = 0
+        self.texts = 0
+        self.rejected = 0
+        self.first_request_at: Optional[float] = None
+        self._levels = dict(self.limits)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _vector(self, text: str) -> List[float]:
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=self.dim).digest()
+        return [(b - 127.5) / 127.5 for b in digest]
+
+    def _admit(self, texts: List[str]):
+        cost = {"requests": 1, "tokens": sum(len(t) for t in texts) // 4}
+        with self._lock:
+            now = time.monotonic()
+            for k, limit in self.limits.items():
+                if limit:
+                    self._levels[k] = min(limit, self._levels[k] + limit * (now - self._updated) / self.window)
+            self._updated = now
+            if any(limit and self._levels[k] < cost[k] for k, limit in self.limits.items()):
+                self.rejected += 1
+                raise StubRateLimitError(self.retry_after)
+            for k, limit in self.limits.items():
+                if limit:
+                    self._levels[k] -= cost[k]
+            if self.first_request_at is None:
+                self.first_request_at = time.perf_counter()
+            self.requests += 1
+            self.texts += len(texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._admit(texts)
+        time.sleep(self.latency + self.text_latency * len(texts))
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.query_latency)
+        return self._vector(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self.query_latency)
+        return self._vector(text)
@@ -4,7 +4,130 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data")
 RAW_DIR = os.path.join(DATA_DIR, "raw")
 PARSED_DIR = os.path.join(DATA_DIR, "parsed")
-VECTOR_DB_DIR = os.path.join(BASE_DIR, "vectorstore")
-VECTORSTORE_DIR = "data/vectordb"
+# The one vectorstore directory: the ingest pipeline writes it, API workers read it
+VECTORSTORE_DIR = os.getenv("VECTORSTORE_DIR", os.path.join(DATA_DIR, "vectordb"))
 
 IRDA_URL = "https://irdai.gov.in/document-category/circulars/"
+
+# Vectorstore lifecycle (API workers)
+VECTORSTORE_PUBLISH_MARKER = ".published"
+VECTORSTORE_RELOAD_CHECK_SECONDS = float(os.getenv("VECTORSTORE_RELOAD_CHECK_SECONDS", "5"))
+
+# Embeddings: "openai" for production, "local" for the deterministic offline embedder
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+LOCAL_EMBEDDING_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", "384"))
+
+# Query-embedding cache (in-memory LRU + optional on-disk tier; empty path disables the disk tier)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", str(24 * 3600)))
+QUERY_EMBEDDING_CACHE_PATH = os.getenv("QUERY_EMBEDDING_CACHE_PATH", "")
+
+# Cross-session semantic answer cache
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(6 * 3600)))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+# Follow-up suggestions: cached per answer (hashed), and at most this many answers per /suggest batch
+SUGGESTION_CACHE_SIZE = int(os.getenv("SUGGESTION_CACHE_SIZE", "4096"))
+SUGGESTION_CACHE_TTL_SECONDS = float(os.getenv("SUGGESTION_CACHE_TTL_SECONDS", str(24 * 3600)))
+SUGGEST_BATCH_MAX = int(os.getenv("SUGGEST_BATCH_MAX", "20"))
+
+# Session history store ("memory" per worker, or "sqlite" shared by workers on one host)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(DATA_DIR, "sessions.sqlite3"))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "20"))
+SESSION_IDLE_TTL_SECONDS = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "3600"))
+SESSION_MEMORY_BUDGET_BYTES = int(os.getenv("SESSION_MEMORY_BUDGET_BYTES", str(64 * 1024 * 1024)))
+SESSION_HISTORY_TOKEN_BUDGET = int(os.getenv("SESSION_HISTORY_TOKEN_BUDGET", "3000"))
+
+# Per-request deadlines for the API (seconds)
+ASK_DEADLINE_SECONDS = float(os.getenv("ASK_DEADLINE_SECONDS", "120"))
+SUGGEST_DEADLINE_SECONDS = float(os.getenv("SUGGEST_DEADLINE_SECONDS", "30"))
+DISCONNECT_POLL_SECONDS = 0.5
+
+# API worker warmup (vectorstore, LLM client, reranker, tokenizer): "background" accepts connections
+# at once and reports readiness on /ready when done, "blocking" finishes it before serving, "off"
+# loads everything on first use
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background")
+
+# Retrieved context up to this many tokens is answered in one "stuff + HTML" LLM call;
+# larger contexts fall back to map_reduce + summarize
+SINGLE_PASS_TOKEN_BUDGET = int(os.getenv("SINGLE_PASS_TOKEN_BUDGET", "12000"))
+
+# PDF text extraction (process pool shared by the LangGraph parse node and embed_documents.py)
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+EXTRACT_TIMEOUT_SECONDS = float(os.getenv("EXTRACT_TIMEOUT_SECONDS", "120"))
+
+# Scraper downloads (pooled async client)
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "8"))
+DOWNLOAD_PER_HOST_CONCURRENCY = int(os.getenv("DOWNLOAD_PER_HOST_CONCURRENCY", "4"))
+DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", "4"))
+DOWNLOAD_BACKOFF_SECONDS = float(os.getenv("DOWNLOAD_BACKOFF_SECONDS", "1.0"))
+DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv("DOWNLOAD_TIMEOUT_SECONDS", "30"))
+
+# Incremental crawl state (document validators + listing page fingerprints)
+CRAWL_STATE_PATH = os.getenv("CRAWL_STATE_PATH", os.path.join(DATA_DIR, "crawl_state.json"))
+
+# Listing-page crawl: try plain HTTP before launching a browser; cap waits on DOM/network signals
+SCRAPE_STATIC_FAST_PATH = os.getenv("SCRAPE_STATIC_FAST_PATH", "1") == "1"
+SCRAPE_NAV_TIMEOUT_SECONDS = float(os.getenv("SCRAPE_NAV_TIMEOUT_SECONDS", "15"))
+
+# Language detection on extracted text (cached per document hash): a document verdict from its first
+# pages, and one per page for the chunks (pages with less text than LANGUAGE_MIN_PAGE_CHARS are
+# "unknown"). QUERY_LANGUAGE restricts retrieval to that language plus "unknown"; empty = no filter
+LANGUAGE_CACHE_PATH = os.getenv("LANGUAGE_CACHE_PATH", os.path.join(PARSED_DIR, "languages.json"))
+LANGUAGE_SAMPLE_PAGES = int(os.getenv("LANGUAGE_SAMPLE_PAGES", "3"))
+LANGUAGE_SAMPLE_CHARS = int(os.getenv("LANGUAGE_SAMPLE_CHARS", "2000"))
+LANGUAGE_MIN_PAGE_CHARS = int(os.getenv("LANGUAGE_MIN_PAGE_CHARS", "200"))
+QUERY_LANGUAGE = os.getenv("QUERY_LANGUAGE", "")
+
+# Streaming ingest: embedding batch limits, and how many finished batches may wait for the embedder
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "250000"))  # under OpenAI's 300K per request
+EMBED_BATCH_MAX_CHUNKS = int(os.getenv("EMBED_BATCH_MAX_CHUNKS", "1000"))
+EMBED_QUEUE_BATCHES = int(os.getenv("EMBED_QUEUE_BATCHES", "2"))
+
+# Embedding scheduler: requests in flight, provider rate budgets (0 = unlimited), 429 retries, write grouping,
+# and the chunks held between submission and their write (in flight or grouped; bounds the vectors in memory)
+EMBED_MAX_IN_FLIGHT = int(os.getenv("EMBED_MAX_IN_FLIGHT", "4"))
+EMBED_TOKENS_PER_MINUTE = int(os.getenv("EMBED_TOKENS_PER_MINUTE", "1000000"))
+EMBED_REQUESTS_PER_MINUTE = int(os.getenv("EMBED_REQUESTS_PER_MINUTE", "3000"))
+EMBED_RETRIES = int(os.getenv("EMBED_RETRIES", "6"))
+EMBED_BACKOFF_SECONDS = float(os.getenv("EMBED_BACKOFF_SECONDS", "1.0"))
+EMBED_WRITE_GROUP_CHUNKS = int(os.getenv("EMBED_WRITE_GROUP_CHUNKS", "1000"))  # below Chroma's max batch size
+EMBED_MAX_HELD_CHUNKS = int(os.getenv("EMBED_MAX_HELD_CHUNKS", "5000"))  # EMBED_MAX_IN_FLIGHT full batches + a group
+
+# Token accounting: tokenizer threads for batch counting
+TOKENIZER_THREADS = int(os.getenv("TOKENIZER_THREADS", str(min(4, os.cpu_count() or 1))))
+
+# Ingest-time text cleanup (applied before chunking, so cleaned text is embedded and stored)
+CLEANUP_PAGE_MARKERS = os.getenv("CLEANUP_PAGE_MARKERS", "1") == "1"  # "Page 3 of 10", "- 3 -", ...
+CLEANUP_REPEATED_LINE_RATIO = float(os.getenv("CLEANUP_REPEATED_LINE_RATIO", "0.6"))  # header/footer lines; 0 = off
+# Extra whole-line regexes to drop, separated by "||"
+CLEANUP_BOILERPLATE_PATTERNS = [p for p in os.getenv("CLEANUP_BOILERPLATE_PATTERNS", "").split("||") if p]
+
+# Retrieval: hybrid BM25 (local SQLite FTS5 index next to the vectorstore) + vector search, fused with RRF
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "10"))
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "30"))
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1") == "1"
+HYBRID_VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "1.0"))
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+# Questions citing a circular number or a numbered section/regulation/clause skip vector search
+LEXICAL_ONLY_FOR_IDENTIFIERS = os.getenv("LEXICAL_ONLY_FOR_IDENTIFIERS", "1") == "1"
+
+# Reranking between retrieval and the answer: "lexical" (query-term overlap, no model), "cross-encoder"
+# (local sentence-transformers model on CPU) or "none"; keeps the best RERANK_TOP_N that fit the token budget
+RERANKER = os.getenv("RERANKER", "lexical")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "6"))
+RERANK_TOKEN_BUDGET = int(os.getenv("RERANK_TOKEN_BUDGET", "3000"))
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_RETRIEVAL_WEIGHT = float(os.getenv("RERANK_RETRIEVAL_WEIGHT", "0.5"))  # RRF weight of the retrieval order
+
+# Observability: Server-Timing header with per-stage timings on API responses, LLM prices (USD per 1K
+# tokens) for the cost counters, and a Prometheus textfile the ingest agent writes (empty = off)
+TIMING_HEADER = os.getenv("TIMING_HEADER", "0") == "1"
+LLM_PROMPT_PRICE_PER_1K = float(os.getenv("LLM_PROMPT_PRICE_PER_1K", "0.0025"))
+LLM_COMPLETION_PRICE_PER_1K = float(os.getenv("LLM_COMPLETION_PRICE_PER_1K", "0.01"))
+METRICS_TEXTFILE_PATH = os.getenv("METRICS_TEXTFILE_PATH", "")
@@ -1,17 +1,21 @@
 import os
 import mimetypes
 from dotenv import load_dotenv
-from langchain.document_loaders import PyMuPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
-from config import RAW_DIR, VECTORSTORE_DIR
-import tiktoken
+from embeddings import get_embedding_backend
+from config import RAW_DIR, VECTORSTORE_DIR, EMBED_BATCH_TOKENS
+from vectorstore_manager import publish_vectorstore
+from indexer import load_manifest, stream_index
+from extraction import iter_document_chunks
+from text_cleanup import normalizer
+from nodes.crawl_state import load_document_metadata
+from tokens import count_tokens, count_tokens_batch
 from typing import List
 
 load_dotenv()  # Ensure OPENAI_API_KEY is loaded
 
-MAX_TOKENS_PER_BATCH = 250_000  # Safe batch size (under 300K OpenAI limit)
+MAX_TOKENS_PER_BATCH = EMBED_BATCH_TOKENS  # Safe batch size (under 300K OpenAI limit)
 
 def is_pdf_file(filepath):
     mime_type, _ = mimetypes.guess_type(filepath)
@@ -19,19 +23,15 @@ def is_pdf_file(filepath):
 
 
 def get_token_count(text: str, model_name="text-embedding-ada-002") -> int:
-    enc = tiktoken.encoding_for_model(model_name)
-    return len(enc.encode(text))
+    return count_tokens(text, model_name)
 
 
 def batch_chunks_by_token_limit(chunks, max_tokens=MAX_TOKENS_PER_BATCH) -> List[List]:
-    enc = tiktoken.encoding_for_model("text-embedding-ada-002")
     batches = []
     current_batch = []
     current_tokens = 0
 
-    for chunk in chunks:
-        tokens = len(enc.encode(chunk.page_content))
-
+    for chunk, tokens in zip(chunks, count_tokens_batch(chunk.page_content for chunk in chunks)):
         if current_tokens + tokens > max_tokens:
             batches.append(current_batch)
             current_batch = [chunk]
@@ -47,9 +47,8 @@ def batch_chunks_by_token_limit(chunks, max_tokens=MAX_TOKENS_PER_BATCH) -> List
 
 
 def load_and_embed_pdfs():
-    all_docs = []
-
-    # --- Load all PDF files ---
+    # --- Find all PDF files ---
+    files = {}
     for fname in os.listdir(RAW_DIR):
         if not fname.lower().endswith(".pdf"):
             continue
@@ -58,20 +57,7 @@ def load_and_embed_pdfs():
         if not is_pdf_file(path):
             print(f"❌ Skipping non-PDF file: {fname}")
             continue
-
-        try:
-            loader = PyMuPDFLoader(path)
-            docs = loader.load()
-            for doc in docs:
-                doc.metadata["source"] = fname  # Add source metadata
-            
-            all_docs.extend(docs)
-            
-            print(f"📄 Loaded {len(docs)} pages from {fname}")
-        except Exception as e:
-            print(f"❌ Failed to load {fname}: {e}")
-
-    print(f"\n📚 Total pages loaded: {len(all_docs)}")
+        files[fname] = path
 
     # --- Chunk documents safely ---
     splitter = RecursiveCharacterTextSplitter(
@@ -79,24 +65,28 @@ def load_and_embed_pdfs():
         chunk_overlap=200,
         separators=["\n\n", "\n", " ", ""]
     )
-    chunks = splitter.split_documents(all_docs)
-    print(f"🔹 Split into {len(chunks)} chunks")
 
-    # --- Group chunks into safe token batches ---
-    token_batches = batch_chunks_by_token_limit(chunks)
-    print(f"🔄 Chunked into {len(token_batches)} safe token batches")
-
-    # --- Embed each batch separately ---
-    embeddings = OpenAIEmbeddings()
-    vectordb = Chroma(embedding_function=embeddings, persist_directory=VECTORSTORE_DIR)
-
-    for i, batch in enumerate(token_batches):
-        print(f"🚀 Embedding batch {i+1}/{len(token_batches)} with {len(batch)} chunks")
-        vectordb.add_documents(batch)
-        vectordb._client.persist()  # Save to disk after each batch
+    # --- Stream new/changed PDFs: parse → clean → split → count tokens → embed, one bounded batch at a time ---
+    # Parsing shares the page and language caches with the LangGraph parse node; embedding starts
+    # as soon as the first batch is full instead of after the whole corpus is loaded.
+    manifest = load_manifest(VECTORSTORE_DIR)
+    run = stream_index(
+        files,
+        manifest,
+        VECTORSTORE_DIR,
+        open_store=lambda: Chroma(embedding_function=get_embedding_backend(), persist_directory=VECTORSTORE_DIR),
+        iter_documents=lambda changed: iter_document_chunks(changed, splitter),
+        max_batch_tokens=MAX_TOKENS_PER_BATCH,
+        text_version=normalizer.signature,
+        document_metadata=load_document_metadata(),
+    )
+    print(f"📚 Index run: {run.summary()}")
+    if not (run.files_updated or run.files_removed):
+        print("✅ Vectorstore already up to date")
+        return
 
+    publish_vectorstore(VECTORSTORE_DIR)  # running API workers pick up the new index
     print(f"✅ All batches embedded and saved to: {VECTORSTORE_DIR}")
 
-
 if __name__ == "__main__":
     load_and_embed_pdfs()
@@ -0,0 +1,119 @@
+# embedding_scheduler.py
+import time
+import random
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+from config import (
+    EMBED_MAX_IN_FLIGHT,
+    EMBED_TOKENS_PER_MINUTE,
+    EMBED_REQUESTS_PER_MINUTE,
+    EMBED_RETRIES,
+    EMBED_BACKOFF_SECONDS,
+)
+
+
+class RateLimiter:
+    """Token buckets for a tokens-per-``period`` and a requests-per-``period`` budget.
+
+    ``acquire(tokens)`` blocks until both buckets can pay for a request; ``pause(seconds)``
+    holds every caller back, e.g. after the provider answered 429. A budget of 0 is unlimited.
+    """
+
+    def __init__(self, tokens_per_period: int = EMBED_TOKENS_PER_MINUTE,
+                 requests_per_period: int = EMBED_REQUESTS_PER_MINUTE, period: float = 60.0):
+        self.capacity = {"tokens": tokens_per_period, "requests": requests_per_period}
+        self.level = dict(self.capacity)
+        self.rate = {k: v / period for k, v in self.capacity.items()}
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        for k, capacity in self.capacity.items():
+            if capacity > 0:
+                self.level[k] = min(capacity, self.level[k] + self.rate[k] * elapsed)
+
+    def acquire(self, tokens: int):
+        # A request larger than the whole budget can never fit; let it through on a full bucket
+        need = {"tokens": min(tokens, self.capacity["tokens"]), "requests": 1}
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    wait = max(((need[k] - self.level[k]) / self.rate[k]
+                                for k, capacity in self.capacity.items() if capacity > 0), default=0.0)
+                    if wait <= 0:
+                        for k, capacity in self.capacity.items():
+                            if capacity > 0:
+                                self.level[k] -= need[k]
+                        self.waited += now - started
+                        return
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class EmbeddingScheduler:
+    """Runs up to ``max_in_flight`` embedding requests at once within the rate budgets.
+
+    ``submit(texts, tokens)`` returns a Future of the vectors. A 429 pauses every request for
+    the provider's Retry-After (or a jittered exponential backoff) before the batch is retried.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_in_flight: int = EMBED_MAX_IN_FLIGHT,
+                 limiter: Optional[RateLimiter] = None, retries: int = EMBED_RETRIES,
+                 backoff: float = EMBED_BACKOFF_SECONDS):
+        self.embeddings = embeddings
+        self.max_in_flight = max_in_flight
+        self.limiter = limiter or RateLimiter()
+        self.retries = retries
+        self.backoff = backoff
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="embed")
+        self.stats = {"requests": 0, "rate_limited": 0}
+        self._stats_lock = threading.Lock()
+
+    def submit(self, texts: List[str], tokens: int) -> Future:
+        return self._executor.submit(self._embed, texts, tokens)
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _embed(self, texts: List[str], tokens: int) -> List[List[float]]:
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire(tokens)
+            self._count("requests")
+            try:
+                return self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.retries:
+                    raise
+                self._count("rate_limited")
+                delay = retry_after(e) or self.backoff * (2 ** attempt) * (0.5 + random.random())
+                print(f"🔁 Embedding rate limited; retrying {len(texts)} chunks in {delay:.1f}s")
+                self.limiter.pause(delay)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
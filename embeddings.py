@@ -0,0 +1,219 @@
+# embeddings.py
+import re
+import math
+import time
+import array
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+from config import (
+    EMBEDDING_BACKEND,
+    LOCAL_EMBEDDING_DIM,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+    QUERY_EMBEDDING_CACHE_PATH,
+)
+
+_WORD_RE = re.compile(r"\w+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a question: case, surrounding punctuation and whitespace runs don't matter."""
+    return _SPACE_RE.sub(" ", text.strip().lower()).strip(" ?.!")
+
+
+# --- Deterministic local embedder (no network) ---
+class LocalHashEmbeddings(Embeddings):
+    """Signed feature hashing of word unigrams and bigrams into a fixed-size unit vector.
+
+    Identical text always maps to the identical vector and texts sharing words land
+    close together, which is enough to benchmark retrieval and caching offline.
+    """
+
+    def __init__(self, dim: int = LOCAL_EMBEDDING_DIM):
+        self.dim = dim
+        self.model = f"local-hash-{dim}"
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        words = _WORD_RE.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def get_embedding_backend(backend: str = EMBEDDING_BACKEND) -> Embeddings:
+    """The raw embedding function used for both ingest and queries."""
+    if backend == "local":
+        return LocalHashEmbeddings()
+    if backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings()
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend!r}")
+
+
+# --- Query-embedding cache tiers ---
+class LRUTTLCache:
+    """Thread-safe bounded LRU whose entries also expire ``ttl`` seconds after insertion."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.evictions += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteVectorCache:
+    """On-disk tier so warm query embeddings survive a restart; vectors are float32 blobs."""
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key) -> Optional[List[float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector, created_at FROM query_embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] + self.ttl < time.time():
+            return None
+        return array.array("f", row[0]).tolist()
+
+    def put(self, key, vector: List[float]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                (key, array.array("f", vector).tobytes(), time.time()),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """Wraps an embedding backend and caches ``embed_query`` on the normalized question.
+
+    Document embedding (ingest) is passed straight through.
+    """
+
+    def __init__(self, base: Embeddings, maxsize: int = QUERY_EMBEDDING_CACHE_SIZE,
+                 ttl: float = QUERY_EMBEDDING_CACHE_TTL_SECONDS, disk_path: str = QUERY_EMBEDDING_CACHE_PATH):
+        self.base = base
+        self.memory = LRUTTLCache(maxsize, ttl)
+        self.disk = SQLiteVectorCache(disk_path, ttl) if disk_path else None
+        # Vectors from different models are not interchangeable
+        self.namespace = f"{type(base).__name__}:{getattr(base, 'model', '')}"
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        return f"{self.namespace}:{normalize_query(text)}"
+
+    def _lookup(self, key):
+        vector = self.memory.get(key)
+        if vector is not None:
+            self.hits += 1
+            return vector
+        if self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self.disk_hits += 1
+                self.memory.put(key, vector)
+                return vector
+        self.misses += 1
+        return None
+
+    def _store(self, key, vector):
+        self.memory.put(key, vector)
+        if self.disk is not None:
+            self.disk.put(key, vector)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self.base.embed_query(text)
+            self._store(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = await self.base.aembed_query(text)
+            self._store(key, vector)
+        return vector
+
+    def cache_stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self.memory),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.memory.evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+
+def get_query_embeddings() -> CachedQueryEmbeddings:
+    """Embedding function for the query path, with the question cache in front."""
+    return CachedQueryEmbeddings(get_embedding_backend())
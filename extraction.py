@@ -0,0 +1,146 @@
+# extraction.py
+import os
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import fitz  # PyMuPDF
+from langchain_core.documents import Document
+from config import PARSED_DIR, EXTRACT_WORKERS, EXTRACT_TIMEOUT_SECONDS, LANGUAGE_CACHE_PATH
+from indexer import file_sha256
+from language import document_language, load_language_cache, save_language_cache
+from text_cleanup import normalizer
+
+
+def extract_pdf_pages(path: str) -> List[str]:
+    """Text of every page; runs inside the worker processes."""
+    with fitz.open(path) as pdf:
+        return [page.get_text() for page in pdf]
+
+
+def _cache_path(cache_dir: str, source: str) -> str:
+    return os.path.join(cache_dir, f"{source}.pages.json")
+
+
+def read_cached_pages(source: str, sha256: str, cache_dir: str = PARSED_DIR) -> Optional[List[str]]:
+    try:
+        with open(_cache_path(cache_dir, source), encoding="utf-8") as f:
+            cached = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return cached["pages"] if cached.get("sha256") == sha256 else None
+
+
+def write_cached_pages(source: str, sha256: str, pages: List[str], cache_dir: str = PARSED_DIR) -> None:
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(cache_dir, source)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"source": source, "sha256": sha256, "pages": pages}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def pages_to_documents(source: str, pages: List[str], languages: Optional[List[str]] = None) -> List[Document]:
+    """One document per page; ``languages`` holds each page's language (see language.classify_pages)."""
+    documents = []
+    for i, text in enumerate(pages):
+        metadata = {"source": source, "page": i}
+        if languages:
+            metadata["language"] = languages[i]
+        documents.append(Document(page_content=text, metadata=metadata))
+    return documents
+
+
+def _kill_workers(executor: ProcessPoolExecutor):
+    # A timed-out PDF keeps its worker busy forever; the executor has no public way to stop it
+    for process in list(getattr(executor, "_processes", {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_files(files: Dict[str, str], cache_dir: str = PARSED_DIR, workers: int = EXTRACT_WORKERS,
+                  timeout: float = EXTRACT_TIMEOUT_SECONDS) -> Dict[str, List[str]]:
+    """Page texts for ``files`` (source name -> PDF path), parsed over a process pool.
+
+    Results are cached per file content hash in ``cache_dir``; files that fail or exceed
+    ``timeout`` seconds are left out of the result.
+    """
+    return dict(iter_extract_files(files, cache_dir, workers, timeout))
+
+
+def iter_extract_files(files: Dict[str, str], cache_dir: str = PARSED_DIR, workers: int = EXTRACT_WORKERS,
+                       timeout: float = EXTRACT_TIMEOUT_SECONDS) -> Iterator[Tuple[str, List[str]]]:
+    """Like ``extract_files`` but yields (source, pages) as each file is ready, cached files first.
+
+    A new file is only handed to the pool when a worker is free and the consumer has taken
+    the previous results, so a slow consumer holds back parsing instead of piling up pages.
+    """
+    pending = deque()
+    cached_count = 0
+    for source, path in files.items():
+        sha = file_sha256(path)
+        cached = read_cached_pages(source, sha, cache_dir)
+        if cached is not None:
+            cached_count += 1
+            yield source, cached
+        else:
+            pending.append((source, path, sha))
+
+    if not pending:
+        return
+    print(f"📄 Extracting {len(pending)} PDFs with {workers} workers ({cached_count} cached)")
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    running = {}  # future -> (source, sha, started)
+    hung = 0      # workers still stuck on a timed-out file
+    try:
+        while pending or running:
+            # Only submit when a worker is free, so a file's clock starts when it really starts
+            while pending and len(running) + hung < workers:
+                source, path, sha = pending.popleft()
+                running[executor.submit(extract_pdf_pages, path)] = (source, sha, time.monotonic())
+
+            done, _ = wait(running, timeout=min(1.0, timeout), return_when=FIRST_COMPLETED)
+            for future in done:
+                source, sha, _ = running.pop(future)
+                try:
+                    pages = future.result()
+                except Exception as e:
+                    print(f"❌ Failed to parse {source}: {e}")
+                    continue
+                write_cached_pages(source, sha, pages, cache_dir)
+                yield source, pages
+
+            now = time.monotonic()
+            for future, (source, sha, started) in list(running.items()):
+                if now - started > timeout:
+                    print(f"⏱️ Timed out parsing {source} after {timeout:.0f}s")
+                    del running[future]
+                    hung += 1
+
+            if hung and hung >= workers:
+                # Every worker is stuck: replace the pool
+                _kill_workers(executor)
+                executor = ProcessPoolExecutor(max_workers=workers)
+                hung = 0
+    finally:
+        if hung:
+            _kill_workers(executor)
+        else:
+            executor.shutdown(cancel_futures=True)
+
+
+def iter_document_chunks(files: Dict[str, str], splitter, cache_dir: str = PARSED_DIR,
+                         language_cache_path: str = LANGUAGE_CACHE_PATH,
+                         normalize: Callable[[List[str]], List[str]] = normalizer.normalize_pages,
+                         ) -> Iterator[Tuple[str, List[Document]]]:
+    """(source, chunks) for each file as its pages come out of extraction, cleaned by ``normalize``
+    and tagged with their page's language. Only one file's pages are held at a time."""
+    languages = load_language_cache(language_cache_path)
+    try:
+        for source, pages in iter_extract_files(files, cache_dir):
+            page_languages = document_language(files[source], pages, languages)["pages"]
+            yield source, splitter.split_documents(pages_to_documents(source, normalize(pages), page_languages))
+    finally:
+        save_language_cache(languages, language_cache_path)
@@ -0,0 +1,411 @@
+# indexer.py
+import os
+import json
+import time
+import queue
+import hashlib
+import threading
+from collections import Counter, deque
+from contextlib import ExitStack, closing
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from langchain_core.documents import Document
+from embedding_scheduler import EmbeddingScheduler
+from lexical_index import LexicalIndex
+from tokens import TOKEN_COUNT_KEY, count_tokens_batch
+from search_filters import metadata_digest
+from config import (
+    EMBED_BATCH_TOKENS,
+    EMBED_BATCH_MAX_CHUNKS,
+    EMBED_QUEUE_BATCHES,
+    EMBED_WRITE_GROUP_CHUNKS,
+    EMBED_MAX_HELD_CHUNKS,
+)
+
+MANIFEST_NAME = "manifest.json"
+# Bump when chunks gain metadata fields; the next run rewrites the metadata of existing vectors
+# in place (no re-embedding) so filters on the new fields see the whole corpus. Tracked per file.
+# 1: language, 2: token_count, 3: language per page
+METADATA_VERSION = 3
+RETAG_BATCH_SIZE = 5000  # below Chroma's max batch size
+MANIFEST_SAVE_SECONDS = 30  # checkpoint finished files this often during a long run
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def assign_chunk_ids(source: str, chunks: List[Document]) -> List[str]:
+    """Deterministic IDs from the chunk's source, page and text, so unchanged chunks keep their ID
+    when other parts of the file change. Repeated identical chunks get an occurrence suffix."""
+    seen = Counter()
+    ids = []
+    for chunk in chunks:
+        key = hashlib.sha256(
+            f"{source}\0{chunk.metadata.get('page', '')}\0{chunk.page_content}".encode("utf-8")
+        ).hexdigest()[:32]
+        ids.append(f"{key}-{seen[key]}")
+        seen[key] += 1
+        chunk.metadata["chunk_id"] = ids[-1]
+    return ids
+
+
+def load_manifest(persist_directory: str) -> dict:
+    path = os.path.join(persist_directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"files": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(persist_directory: str, manifest: dict) -> None:
+    os.makedirs(persist_directory, exist_ok=True)
+    path = os.path.join(persist_directory, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class IndexRun:
+    """Counters for one index run."""
+    files_unchanged: int = 0
+    files_updated: int = 0
+    files_removed: int = 0
+    files_failed: int = 0
+    chunks_embedded: int = 0
+    chunks_retagged: int = 0
+    chunks_deleted: int = 0
+    batches: int = 0
+    writes: int = 0
+    rate_limited: int = 0
+    lexical_backfilled: int = 0
+
+    def summary(self) -> dict:
+        return asdict(self)
+
+
+def entry_metadata_version(manifest: dict, entry: dict) -> int:
+    # Entries written before versions were tracked per file fall back to the manifest-wide value
+    return entry.get("metadata_version", manifest.get("metadata_version", 0))
+
+
+def diff_files(files: Dict[str, str], manifest: dict, text_version: str = "",
+               document_metadata: Optional[Dict[str, dict]] = None):
+    """(changed source -> (path, sha256), unchanged count, removed sources) against the manifest.
+
+    A file whose entry has an older METADATA_VERSION or other document metadata counts as changed
+    so its chunks get retagged; one whose text was cleaned under another ``text_version`` counts
+    as changed so it is re-chunked (chunks whose text came out the same keep their vectors).
+    """
+    known = manifest.get("files", {})
+    document_metadata = document_metadata or {}
+    changed, unchanged = {}, 0
+    for source, path in sorted(files.items()):
+        sha = file_sha256(path)
+        entry = known.get(source)
+        if entry and entry["sha256"] == sha and entry_metadata_version(manifest, entry) == METADATA_VERSION \
+                and entry.get("text_version", "") == text_version \
+                and entry.get("metadata_digest", "") == metadata_digest(document_metadata.get(source, {})):
+            unchanged += 1
+        else:
+            changed[source] = (path, sha)
+    return changed, unchanged, sorted(set(known) - set(files))
+
+
+class _Stopped(Exception):
+    pass
+
+
+class _BatchPacker:
+    """Groups the producer's output into queue items of (new chunks to embed, their token count,
+    kept chunks to retag, files completed). New chunks are capped by a token and chunk budget. A file rides in
+    the item holding its last chunks, so it is only recorded once all of it has been written.
+    """
+
+    def __init__(self, put: Callable, max_tokens: int, max_chunks: int):
+        self.put = put
+        self.max_tokens = max_tokens
+        self.max_chunks = max_chunks
+        self._reset()
+
+    def _reset(self):
+        self.chunks: List[Document] = []
+        self.tokens = 0
+        self.retagged: List[Document] = []
+        self.files = []
+        self.batches = 0
+
+    def add(self, chunk: Document, tokens: int):
+        if self.chunks and (self.tokens + tokens > self.max_tokens or len(self.chunks) >= self.max_chunks):
+            self.flush()
+        self.chunks.append(chunk)
+        self.tokens += tokens
+
+    def retag(self, chunk: Document):
+        if len(self.retagged) >= RETAG_BATCH_SIZE:
+            self.flush()
+        self.retagged.append(chunk)
+
+    def file_done(self, source: str, entry: dict, stale_ids: List[str]):
+        self.files.append((source, entry, stale_ids))
+
+    def flush(self):
+        if self.chunks or self.retagged or self.files:
+            self.put((self.chunks, self.tokens, self.retagged, self.files))
+        self._reset()
+
+
+def _produce(changed: Dict[str, Tuple[str, str]], known: dict,
+             iter_documents: Callable[[Dict[str, str]], Iterator[Tuple[str, List[Document]]]],
+             count_tokens: Callable[[List[str]], List[int]], packer: _BatchPacker, text_version: str = "",
+             document_metadata: Optional[Dict[str, dict]] = None):
+    """Producer thread: extract → split → count tokens → diff against the manifest → batch.
+
+    Every chunk's token count is stored in its metadata, so the query path never re-tokenizes it.
+    """
+    with closing(iter_documents({source: path for source, (path, _) in changed.items()})) as documents:
+        for source, chunks in documents:
+            path, sha = changed[source]
+            ids = assign_chunk_ids(source, chunks)
+            extra = (document_metadata or {}).get(source, {})
+            for chunk, n in zip(chunks, count_tokens([chunk.page_content for chunk in chunks])):
+                chunk.metadata.update(extra)
+                chunk.metadata[TOKEN_COUNT_KEY] = n
+            entry = known.get(source)
+            old_ids = set(entry["chunk_ids"]) if entry else set()
+            retag = entry is not None and (entry.get("metadata_version", 0) != METADATA_VERSION
+                                           or entry.get("metadata_digest", "") != metadata_digest(extra))
+            for chunk, chunk_id in zip(chunks, ids):
+                if chunk_id not in old_ids:
+                    packer.add(chunk, chunk.metadata[TOKEN_COUNT_KEY])
+                elif retag:
+                    packer.retag(chunk)
+            new_entry = {"sha256": sha, "chunk_ids": ids, "metadata_version": METADATA_VERSION}
+            if text_version:
+                new_entry["text_version"] = text_version
+            if extra:
+                new_entry["metadata_digest"] = metadata_digest(extra)
+            packer.file_done(source, new_entry, sorted(old_ids - set(ids)))
+    packer.flush()
+
+
+class _WriteGroup:
+    """Embedded batches waiting to be written to the store in one upsert, plus the retags and
+    finished files that ride along with them. Applied strictly in batch order."""
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.ids, self.vectors, self.texts, self.metadatas = [], [], [], []
+        self.retagged: List[Document] = []
+        self.files = []
+
+    def add(self, chunks: List[Document], vectors: List[List[float]], retagged: List[Document], files: list):
+        self.ids.extend(c.metadata["chunk_id"] for c in chunks)
+        self.vectors.extend(vectors)
+        self.texts.extend(c.page_content for c in chunks)
+        self.metadatas.extend(c.metadata for c in chunks)
+        self.retagged.extend(retagged)
+        self.files.extend(files)
+
+    def write(self, vectordb, lexical: LexicalIndex, run: IndexRun):
+        if self.ids:
+            vectordb._collection.upsert(ids=self.ids, embeddings=self.vectors,
+                                        documents=self.texts, metadatas=self.metadatas)
+            lexical.upsert(self.ids, self.texts, self.metadatas)
+            run.writes += 1
+            run.chunks_embedded += len(self.ids)
+        for i in range(0, len(self.retagged), RETAG_BATCH_SIZE):
+            retagged = self.retagged[i:i + RETAG_BATCH_SIZE]
+            ids, metadatas = [c.metadata["chunk_id"] for c in retagged], [c.metadata for c in retagged]
+            vectordb._collection.update(ids=ids, metadatas=metadatas)
+            lexical.update_metadata(ids, metadatas)
+            run.chunks_retagged += len(retagged)
+        self._reset()
+
+
+def backfill_lexical_index(vectordb, lexical: LexicalIndex, page_size: int = RETAG_BATCH_SIZE) -> int:
+    """Copy every chunk already in the vectorstore into an empty lexical index."""
+    copied = 0
+    while True:
+        page = vectordb._collection.get(include=["documents", "metadatas"], limit=page_size, offset=copied)
+        if not page["ids"]:
+            return copied
+        lexical.upsert(page["ids"], page["documents"], page["metadatas"])
+        copied += len(page["ids"])
+
+
+def stream_index(files: Dict[str, str], manifest: dict, persist_directory: str, open_store: Callable,
+                 iter_documents: Callable[[Dict[str, str]], Iterator[Tuple[str, List[Document]]]],
+                 count_tokens: Callable[[List[str]], List[int]] = count_tokens_batch,
+                 max_batch_tokens: int = EMBED_BATCH_TOKENS,
+                 max_batch_chunks: int = EMBED_BATCH_MAX_CHUNKS, queue_batches: int = EMBED_QUEUE_BATCHES,
+                 scheduler: Optional[EmbeddingScheduler] = None,
+                 write_group_chunks: int = EMBED_WRITE_GROUP_CHUNKS, text_version: str = "",
+                 lexical_index: Optional[LexicalIndex] = None,
+                 document_metadata: Optional[Dict[str, dict]] = None,
+                 max_held_chunks: int = EMBED_MAX_HELD_CHUNKS) -> IndexRun:
+    """Bring the vectorstore in line with ``files`` (source name -> path), streaming.
+
+    Only new/changed files are passed to ``iter_documents``, which yields (source, chunks) per file;
+    ``count_tokens`` sizes a file's chunks in one call (list of texts -> list of counts);
+    a producer thread turns those into token-bounded batches while this thread hands them to the
+    embedding ``scheduler`` (default: one over the store's embeddings), which keeps several requests
+    in flight within the rate budgets. The queue between them holds at most ``queue_batches`` batches,
+    and at most ``max_held_chunks`` chunks are held between submission and their write (in flight or
+    grouped; a single larger batch is let through alone), which keeps memory flat regardless of corpus
+    size. Embedded batches are written in order, grouped into one upsert per ``write_group_chunks``
+    chunks; a group is written early only to stay within ``max_held_chunks``. Unchanged chunks keep their vectors; stale
+    ones are deleted once their file's new chunks are in. ``text_version`` identifies how
+    ``iter_documents`` cleans text; files indexed under another one are re-chunked. Finished files
+    are checkpointed to the manifest as the run goes, so an interrupted run resumes where it
+    stopped; files that fail to load keep their old entry and are retried next run.
+
+    ``document_metadata`` (source -> fields) is added to every chunk of that source, e.g. the
+    listing title and date; files whose fields changed are retagged in place.
+
+    Every write to Chroma is mirrored into the BM25 ``lexical_index`` (default: the one in
+    ``persist_directory``), which is backfilled from Chroma if it is missing.
+    """
+    with ExitStack() as cleanup:
+        if lexical_index is None:
+            lexical_index = cleanup.enter_context(closing(LexicalIndex.for_store(persist_directory)))
+        return _stream_index(files, manifest, persist_directory, open_store, iter_documents, count_tokens,
+                             max_batch_tokens, max_batch_chunks, queue_batches, scheduler, write_group_chunks,
+                             text_version, lexical_index, document_metadata, max_held_chunks)
+
+
+def _stream_index(files, manifest, persist_directory, open_store, iter_documents, count_tokens, max_batch_tokens,
+                  max_batch_chunks, queue_batches, scheduler, write_group_chunks, text_version, lexical,
+                  document_metadata, max_held_chunks) -> IndexRun:
+    run = IndexRun()
+    changed, run.files_unchanged, removed = diff_files(files, manifest, text_version, document_metadata)
+    backfill = bool(manifest.get("files")) and not lexical.count()
+    if not changed and not removed and not backfill:
+        return run
+
+    vectordb = open_store()
+    if not manifest.get("files"):
+        if vectordb._collection.count():
+            # Store built before the manifest existed: its vectors have random IDs and can't be diffed
+            print("♻️ Rebuilding pre-manifest vectorstore from scratch")
+            vectordb.reset_collection()
+        lexical.reset()
+    elif backfill:
+        run.lexical_backfilled = backfill_lexical_index(vectordb, lexical)
+        print(f"🔤 Keyword index built from {run.lexical_backfilled} existing chunks")
+
+    entries = manifest.setdefault("files", {})
+    batches = queue.Queue(maxsize=queue_batches)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+        raise _Stopped()
+
+    def producer():
+        try:
+            known = {source: {**entry, "metadata_version": entry_metadata_version(manifest, entry)}
+                     for source, entry in entries.items()}
+            _produce(changed, known, iter_documents, count_tokens,
+                     _BatchPacker(put, max_batch_tokens, max_batch_chunks), text_version, document_metadata)
+            put(("end",))
+        except _Stopped:
+            pass
+        except BaseException as e:
+            try:
+                put(("error", e))
+            except _Stopped:
+                pass
+
+    own_scheduler = scheduler is None
+    scheduler = scheduler or EmbeddingScheduler(vectordb.embeddings)
+    in_flight = deque()  # (future or None, chunks, retagged, files) in batch order
+    held = 0  # chunks submitted and not yet written: in flight or in the write group
+    group = _WriteGroup()
+    last_save = time.monotonic()
+
+    def settle_oldest():
+        future, chunks, retagged, done = in_flight.popleft()
+        group.add(chunks, future.result() if future else [], retagged, done)
+        if len(group.ids) < write_group_chunks and len(group.retagged) < RETAG_BATCH_SIZE:
+            return
+        write_group()
+
+    def write_group():
+        nonlocal last_save, held
+        done = group.files
+        held -= len(group.ids)
+        group.write(vectordb, lexical, run)
+        for source, entry, stale_ids in done:
+            if stale_ids:
+                vectordb.delete(ids=stale_ids)
+                lexical.delete(stale_ids)
+                run.chunks_deleted += len(stale_ids)
+            entries[source] = entry
+            run.files_updated += 1
+        if done and time.monotonic() - last_save > MANIFEST_SAVE_SECONDS:
+            save_manifest(persist_directory, manifest)
+            last_save = time.monotonic()
+
+    thread = threading.Thread(target=producer, name="index-producer", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = batches.get()
+            if item[0] == "end":
+                break
+            if item[0] == "error":
+                raise item[1]
+            chunks, tokens, retagged, done = item
+            # Make room within max_held_chunks: write what is grouped, else wait for the oldest batch
+            while held and held + len(chunks) > max_held_chunks:
+                if group.ids:
+                    write_group()
+                else:
+                    settle_oldest()
+            future = None
+            if chunks:
+                run.batches += 1
+                print(f"🚀 Embedding batch {run.batches} with {len(chunks)} chunks")
+                future = scheduler.submit([c.page_content for c in chunks], tokens)
+                held += len(chunks)
+            in_flight.append((future, chunks, retagged, done))
+            # Finished batches join the write group in order, so it fills while others are in flight
+            while in_flight and (in_flight[0][0] is None or in_flight[0][0].done()):
+                settle_oldest()
+        while in_flight:
+            settle_oldest()
+        write_group()
+    finally:
+        stop.set()
+        thread.join()
+        run.rate_limited = scheduler.stats["rate_limited"]
+        if own_scheduler:
+            scheduler.close()
+        if run.files_updated:
+            save_manifest(persist_directory, manifest)  # keep the checkpoint even if we failed
+
+    for source in removed:
+        stale_ids = entries.pop(source)["chunk_ids"]
+        if stale_ids:
+            vectordb.delete(ids=stale_ids)
+            lexical.delete(stale_ids)
+        run.chunks_deleted += len(stale_ids)
+        run.files_removed += 1
+
+    run.files_failed = len(changed) - run.files_updated
+    save_manifest(persist_directory, manifest)
+    return run
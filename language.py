@@ -0,0 +1,130 @@
+# language.py
+import os
+import json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from langid.langid import LanguageIdentifier, model
+from config import (
+    LANGUAGE_CACHE_PATH,
+    LANGUAGE_SAMPLE_PAGES,
+    LANGUAGE_SAMPLE_CHARS,
+    LANGUAGE_MIN_PAGE_CHARS,
+    EXTRACT_WORKERS,
+)
+from indexer import file_sha256
+
+UNKNOWN = {"language": "unknown", "confidence": 0.0}
+
+_identifier = None
+
+
+def _get_identifier() -> LanguageIdentifier:
+    # One per process; norm_probs makes the confidence a probability instead of a raw log score
+    global _identifier
+    if _identifier is None:
+        _identifier = LanguageIdentifier.from_modelstring(model, norm_probs=True)
+    return _identifier
+
+
+def sample_pages(pages: List[str], n_pages: int = LANGUAGE_SAMPLE_PAGES,
+                 max_chars: int = LANGUAGE_SAMPLE_CHARS) -> List[str]:
+    """Whitespace-collapsed text of the first ``n_pages`` pages that have any."""
+    samples = []
+    for text in pages:
+        text = " ".join(text.split())
+        if text:
+            samples.append(text[:max_chars])
+        if len(samples) == n_pages:
+            break
+    return samples
+
+
+def classify_samples(samples: List[str]) -> dict:
+    """Language with the most sampled text, and its best page confidence; runs inside the worker processes."""
+    if not samples:
+        return dict(UNKNOWN)
+    weight, confidence = Counter(), {}
+    for sample in samples:
+        lang, prob = _get_identifier().classify(sample)
+        weight[lang] += len(sample)
+        confidence[lang] = max(confidence.get(lang, 0.0), float(prob))
+    lang = weight.most_common(1)[0][0]
+    return {"language": lang, "confidence": round(confidence[lang], 3)}
+
+
+def classify_pages(pages: List[str], max_chars: int = LANGUAGE_SAMPLE_CHARS,
+                   min_chars: int = LANGUAGE_MIN_PAGE_CHARS) -> dict:
+    """Document verdict (see classify_samples) plus the language of every page, so a bilingual
+    circular's English pages are tagged English. Pages too short to judge are "unknown"."""
+    verdict = classify_samples(sample_pages(pages))
+    languages = []
+    for text in pages:
+        text = " ".join(text.split())
+        languages.append(_get_identifier().classify(text[:max_chars])[0] if len(text) >= min_chars
+                         else UNKNOWN["language"])
+    return {**verdict, "pages": languages}
+
+
+def load_language_cache(path: str = LANGUAGE_CACHE_PATH) -> Dict[str, dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_language_cache(cache: Dict[str, dict], path: str = LANGUAGE_CACHE_PATH) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+
+def _cached(cache: Dict[str, dict], sha: str) -> Optional[dict]:
+    verdict = cache.get(sha)
+    return verdict if verdict is not None and "pages" in verdict else None  # entries from before page tags
+
+
+def document_language(path: str, pages: List[str], cache: Dict[str, dict]) -> dict:
+    """Verdict for one document (with its page languages), classified in-process; ``cache`` is a
+    loaded language cache."""
+    sha = file_sha256(path)
+    if _cached(cache, sha) is None:
+        cache[sha] = classify_pages(pages)
+    return cache[sha]
+
+
+def detect_languages(files: Dict[str, str], pages: Dict[str, List[str]], cache_path: str = LANGUAGE_CACHE_PATH,
+                     workers: int = EXTRACT_WORKERS) -> Dict[str, dict]:
+    """Language verdict for every source in ``files`` (source name -> PDF path) that has extracted ``pages``.
+
+    Verdicts are cached per file content hash, so a document is only classified again when it changes.
+    """
+    cache = load_language_cache(cache_path)
+    results, pending = {}, []
+    for source, path in files.items():
+        if source not in pages:
+            continue
+        sha = file_sha256(path)
+        if _cached(cache, sha) is not None:
+            results[source] = cache[sha]
+        else:
+            pending.append((source, sha, pages[source]))
+
+    if not pending:
+        return results
+    print(f"🌐 Detecting language of {len(pending)} documents ({len(results)} cached)")
+
+    samples = [s for _, _, s in pending]
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            verdicts = list(executor.map(classify_pages, samples, chunksize=max(1, len(samples) // (workers * 4))))
+    else:
+        verdicts = [classify_pages(s) for s in samples]
+
+    for (source, sha, _), verdict in zip(pending, verdicts):
+        cache[sha] = results[source] = verdict
+    save_language_cache(cache, cache_path)
+    return results
@@ -0,0 +1,194 @@
+# lexical_index.py
+import os
+import re
+import json
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+from langchain_core.documents import Document
+
+LEXICAL_INDEX_NAME = "lexical.sqlite3"
+
+_WORD_RE = re.compile(r"\w+")
+# Circular numbers, section/clause references, dates: word runs joined by / . -
+_JOINED_RE = re.compile(r"\w+(?:[/.\-]\w+)+")
+# What a question must cite to be answered from the keyword index alone: a circular number
+# (segments joined by /, letters and digits) or a numbered section, regulation or clause
+_CIRCULAR_RE = re.compile(r"\w+(?:/\w+)+")
+_REFERENCE_RE = re.compile(r"\b(section|regulation|clause)\s+(\w*\d\w*(?:[/.\-]\w+)*)")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me of on or please should tell the "
+    "this to was what when where which who why will with".split()
+)
+
+
+def _has_digit(term: str) -> bool:
+    return any(ch.isdigit() for ch in term)
+
+
+def index_terms(text: str) -> List[str]:
+    """Terms stored for BM25: every word, plus joined identifiers kept whole (IRDAI/HLT/CIR/103/2023)
+    so an exact reference outranks documents that merely share its parts."""
+    text = text.lower()
+    return _WORD_RE.findall(text) + [t for t in _JOINED_RE.findall(text) if _has_digit(t)]
+
+
+def identifier_terms(query: str) -> List[str]:
+    """Exact references in a question, as FTS phrases: circular numbers ("IRDAI/HLT/CIR/MISC/103/2023")
+    and "section 45"-style references. Other words with digits ("2nd", "Q1", "COVID-19", dates) are
+    ordinary search terms, not identifiers."""
+    query = query.lower()
+    terms = [t for t in _CIRCULAR_RE.findall(query) if _has_digit(t) and any(ch.isalpha() for ch in t)]
+    terms += [f"{kind} {ref}" for kind, ref in _REFERENCE_RE.findall(query)]
+    return list(dict.fromkeys(terms))
+
+
+_OPERATORS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def where_sql(where: Dict[str, object]) -> Tuple[str, list]:
+    """SQL condition over ``c.metadata`` for a Chroma-style ``where`` filter
+    ({"field": value}, {"field": {"$gte": v}}, "$in"/"$nin", "$and"/"$or")."""
+    clauses, params = [], []
+    for key, value in where.items():
+        if key in ("$and", "$or"):
+            parts = [where_sql(w) for w in value]
+            clauses.append("(" + f" {key[1:].upper()} ".join(sql for sql, _ in parts) + ")")
+            params += [p for _, part_params in parts for p in part_params]
+            continue
+        field = "json_extract(c.metadata, ?)"
+        conditions = value if isinstance(value, dict) else {"$eq": value}
+        for op, operand in conditions.items():
+            if op in ("$in", "$nin"):
+                marks = ",".join("?" * len(operand)) or "NULL"
+                clauses.append(f"{field} {'NOT IN' if op == '$nin' else 'IN'} ({marks})")
+                params += [f'$."{key}"', *operand]
+            else:
+                clauses.append(f"{field} {_OPERATORS[op]} ?")
+                params += [f'$."{key}"', operand]
+    return " AND ".join(clauses) or "1", params
+
+
+def _phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], weights: Sequence[float], k: int = 60) -> List[str]:
+    """Merge ranked id lists: each list adds ``weight / (k + rank)`` to the ids it contains."""
+    scores = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] += weight / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def fuse_documents(rankings: Sequence[Sequence[Document]], weights: Sequence[float], k: int = 60,
+                   limit: int = 10) -> List[Document]:
+    """Reciprocal rank fusion of ranked document lists, matched on ``chunk_id`` (or the text)."""
+    by_key = {}
+    keyed = []
+    for docs in rankings:
+        keys = []
+        for doc in docs:
+            key = doc.metadata.get("chunk_id") or doc.page_content
+            by_key.setdefault(key, doc)
+            keys.append(key)
+        keyed.append(keys)
+    return [by_key[key] for key in reciprocal_rank_fusion(keyed, weights, k)[:limit]]
+
+
+class LexicalIndex:
+    """BM25 keyword index over the chunk store, kept in a SQLite FTS5 file next to the Chroma index.
+
+    The indexer adds, retags and deletes chunks here in the same steps as in Chroma, so both
+    always describe the same chunks (keyed by ``chunk_id``). Searches need no embedding call.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL UNIQUE, text TEXT NOT NULL, metadata TEXT NOT NULL);
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunk_terms USING fts5(
+                terms, content='', tokenize="unicode61 tokenchars '/.-'");
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def for_store(cls, persist_directory: str) -> "LexicalIndex":
+        return cls(os.path.join(persist_directory, LEXICAL_INDEX_NAME))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM chunks").fetchone()[0]
+
+    def _delete(self, chunk_ids: Sequence[str]):
+        # Contentless FTS rows are removed by replaying the terms they were indexed with
+        for start in range(0, len(chunk_ids), 500):
+            part = list(chunk_ids[start:start + 500])
+            marks = ",".join("?" * len(part))
+            rows = self._conn.execute(f"SELECT id, text FROM chunks WHERE chunk_id IN ({marks})", part).fetchall()
+            self._conn.executemany(
+                "INSERT INTO chunk_terms (chunk_terms, rowid, terms) VALUES ('delete', ?, ?)",
+                [(row_id, " ".join(index_terms(text))) for row_id, text in rows])
+            self._conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({marks})", part)
+
+    def upsert(self, chunk_ids: Sequence[str], texts: Sequence[str], metadatas: Sequence[dict]):
+        with self._lock, self._conn:
+            self._delete(chunk_ids)
+            for chunk_id, text, metadata in zip(chunk_ids, texts, metadatas):
+                row_id = self._conn.execute(
+                    "INSERT INTO chunks (chunk_id, text, metadata) VALUES (?, ?, ?)",
+                    (chunk_id, text, json.dumps(metadata, ensure_ascii=False)),
+                ).lastrowid
+                self._conn.execute("INSERT INTO chunk_terms (rowid, terms) VALUES (?, ?)",
+                                   (row_id, " ".join(index_terms(text))))
+
+    def update_metadata(self, chunk_ids: Sequence[str], metadatas: Sequence[dict]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE chunks SET metadata = ? WHERE chunk_id = ?",
+                [(json.dumps(metadata, ensure_ascii=False), chunk_id) for chunk_id, metadata in zip(chunk_ids, metadatas)])
+
+    def delete(self, chunk_ids: Sequence[str]):
+        with self._lock, self._conn:
+            self._delete(chunk_ids)
+
+    def reset(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("INSERT INTO chunk_terms (chunk_terms) VALUES ('delete-all')")
+
+    def search(self, query: str, k: int = 10, filter: Optional[Dict[str, object]] = None,
+               required: Sequence[str] = ()) -> List[Tuple[Document, float]]:
+        """Top ``k`` chunks by BM25 for the query's terms (stopwords dropped). Every ``required``
+        phrase must appear; ``filter`` is a Chroma-style ``where`` over the chunk metadata."""
+        terms = [t for t in dict.fromkeys(index_terms(query)) if t not in STOPWORDS] + list(required)
+        if not terms:
+            return []
+        match = " OR ".join(_phrase(t) for t in dict.fromkeys(terms))
+        if required:
+            match = " AND ".join(_phrase(t) for t in required) + f" AND ({match})"
+        sql = ("SELECT c.chunk_id, c.text, c.metadata, bm25(chunk_terms) AS score FROM chunk_terms "
+               "JOIN chunks c ON c.id = chunk_terms.rowid WHERE chunk_terms MATCH ?")
+        params: list = [match]
+        if filter:
+            condition, condition_params = where_sql(filter)
+            sql += f" AND {condition}"
+            params += condition_params
+        sql += " ORDER BY score LIMIT ?"
+        params.append(k)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        # FTS5's bm25() is lower-is-better; flip it so larger scores rank higher
+        return [(Document(page_content=text, metadata={**json.loads(metadata), "chunk_id": chunk_id}), -score)
+                for chunk_id, text, metadata, score in rows]
@@ -1,19 +1,65 @@
 from dotenv import load_dotenv
-from langchain.chat_models import ChatOpenAI
+import asyncio
+import functools
 import os
+import threading
+from metrics import llm_usage_handler
 
 load_dotenv()  # reads /home/ubuntu/irdai_apis/.env
 
 model_name = os.getenv("OPENAI_MODEL", "gpt-4o")
 temperature = float(os.getenv("OPENAI_TEMPERATURE", "0.0"))
 api_key = os.getenv("OPENAI_API_KEY")
+max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
 
-if not api_key:
-    raise RuntimeError("OPENAI_API_KEY not set in .env")
+# Shared, deterministic instance. Built on first use (or by the API warmup), not at import:
+# the OpenAI client is slow to import. Benchmarks may assign a stand-in before the first call.
+llm = None
+_llm_lock = threading.Lock()
 
-# Shared, deterministic instance
-llm = ChatOpenAI(
-    model=model_name,
-    temperature=temperature,
-    openai_api_key=api_key
-)
\ No newline at end of file
+def get_llm():
+    global llm
+    if llm is None or not getattr(llm, "_concurrency_limited", False):
+        with _llm_lock:
+            if llm is None:
+                if not api_key:
+                    raise RuntimeError("OPENAI_API_KEY not set in .env")
+                from langchain_openai import ChatOpenAI
+                llm = ChatOpenAI(
+                    model=model_name,
+                    temperature=temperature,
+                    api_key=api_key,
+                    stream_usage=True,  # token usage on streamed answers too
+                    callbacks=[llm_usage_handler],  # per-stage LLM calls and token usage (metrics.py)
+                )
+            if not getattr(llm, "_concurrency_limited", False):
+                limit_concurrency(llm)  # stand-ins too
+    return llm
+
+# Process-wide cap on in-flight LLM calls, shared by /ask and /suggest
+llm_semaphore = asyncio.Semaphore(max_concurrency)
+
+def limit_concurrency(model):
+    """Make every async call of ``model`` wait for an ``llm_semaphore`` slot.
+
+    The slot is taken per model call, not per chain: each map call of a map_reduce chain takes
+    its own, and a streamed answer holds one until the stream ends. Callers must not take a
+    slot themselves around these calls."""
+    generate, stream = model._agenerate, model._astream
+
+    @functools.wraps(generate)  # LangChain inspects the signature for run_manager
+    async def _agenerate(*args, **kwargs):
+        async with llm_semaphore:
+            return await generate(*args, **kwargs)
+
+    @functools.wraps(stream)
+    async def _astream(*args, **kwargs):
+        async with llm_semaphore:
+            async for chunk in stream(*args, **kwargs):
+                yield chunk
+
+    # Instance attributes, set past pydantic's validation; the model's class is untouched
+    object.__setattr__(model, "_agenerate", _agenerate)
+    object.__setattr__(model, "_astream", _astream)
+    object.__setattr__(model, "_concurrency_limited", True)
+    return model
@@ -1,17 +1,58 @@
-from fastapi import FastAPI, HTTPException
+import time
+_import_started = time.perf_counter()
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
 import asyncio
-from qa_chain_async import ask_irda_question_long
-from suggest_agent import generate_suggestions
+import json
+from typing import List, Optional
+from datetime import date
+from contextlib import asynccontextmanager
+from qa_chain_async import ask_irda_question_long, ask_irda_question_stream, session_store, answer_flights, warmup
+from suggest_agent import generate_suggestions, generate_suggestions_batch, stats as suggestion_stats
+from vectorstore_manager import vectorstore_manager
+from answer_cache import answer_cache
+from config import ASK_DEADLINE_SECONDS, SUGGEST_DEADLINE_SECONDS, DISCONNECT_POLL_SECONDS, SUGGEST_BATCH_MAX, TIMING_HEADER, DATA_DIR, WARMUP_MODE
+from metrics import start_trace, render_metrics, STARTUP_SECONDS
 import logging
 from fastapi.staticfiles import StaticFiles
-import os
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+
+# Startup readout for /ready: import time of this module, then the warmup (see WARMUP_MODE)
+startup = {"ready": False, "import_seconds": None, "warmup_seconds": None, "error": None}
+
+def run_warmup():
+    started = time.perf_counter()
+    try:
+        warmup()
+    except Exception as e:
+        startup["error"] = str(e)
+        logging.exception("❌ Warmup failed")
+        return
+    startup["warmup_seconds"] = time.perf_counter() - started
+    STARTUP_SECONDS.set(startup["warmup_seconds"], phase="warmup")
+    startup["ready"] = True
+    logging.info("🚀 Worker ready: imports %.2fs, warmup %.2fs", startup["import_seconds"], startup["warmup_seconds"])
+
+# Warm up once per worker and release the vectorstore on shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warming = None
+    if WARMUP_MODE == "blocking":
+        await asyncio.to_thread(run_warmup)
+    elif WARMUP_MODE == "background":
+        warming = asyncio.create_task(asyncio.to_thread(run_warmup))
+    else:
+        startup["ready"] = True
+    yield
+    if warming is not None:
+        await warming  # a thread can't be cancelled; let it finish before closing what it opened
+    await asyncio.to_thread(vectorstore_manager.close)
 
 # ✅ Set root_path to "/api" since app is deployed under /api
-app = FastAPI(root_path="/api", title="IRDA QA Agent")
+app = FastAPI(root_path="/api", title="IRDA QA Agent", lifespan=lifespan)
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 app.mount("/data", StaticFiles(directory=DATA_DIR), name="data")
 
 # Setup basic logging
@@ -30,36 +71,171 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Per-request stage tracing for the QA endpoints; stage timings go to /metrics, and to a
+# Server-Timing header when TIMING_HEADER is set or the request sends "X-Request-Timing: 1"
+TRACED_PATHS = ("/ask", "/ask/stream", "/suggest")
+
+class TraceRequests:
+    """Pure ASGI middleware: ``receive`` reaches the endpoint untouched, so
+    request.is_disconnected() (and with it run_for_client's cancellation) keeps working;
+    a BaseHTTPMiddleware would wrap it."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        endpoint = None
+        if scope["type"] == "http":
+            endpoint = next((path for path in TRACED_PATHS if scope["path"].endswith(path)), None)
+        if endpoint is None:
+            return await self.app(scope, receive, send)
+        timing = TIMING_HEADER or Headers(scope=scope).get("x-request-timing") == "1"
+        with start_trace(endpoint) as trace:
+            async def send_with_timing(message):
+                if timing and message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    # An event stream is only starting here, so its header would only cover retrieval
+                    if not headers.get("content-type", "").startswith("text/event-stream"):
+                        headers.append("Server-Timing", trace.server_timing())
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+
+app.add_middleware(TraceRequests)
+
 # Request/Response models
+class SearchFilters(BaseModel):
+    date_from: Optional[date] = None  # circular date range, inclusive (ISO dates)
+    date_to: Optional[date] = None
+    category: Optional[str] = None  # listing section, e.g. "circulars", "guidelines"
+    documents: Optional[List[str]] = None  # source file names
+
 class QueryRequest(BaseModel):
     question: str
     session_id: str
+    language: Optional[str] = None  # e.g. "en"; "" searches all languages; omitted uses QUERY_LANGUAGE
+    filters: Optional[SearchFilters] = None
+    suggest: bool = False  # /ask only: follow-up suggestions from the answer call itself (no /suggest round-trip)
+
+    def search_filters(self) -> Optional[dict]:
+        return self.filters.model_dump(mode="json", exclude_none=True) if self.filters else None
 
 class QueryResponse(BaseModel):
     answer: str
     sources: list[str]
+    suggestions: Optional[list[str]] = None
 
 class SuggestRequest(BaseModel):
-    answer: str
+    answer: Optional[str] = None
+    answers: Optional[List[str]] = None  # batch: one list of suggestions per answer, in order
+
+class ClientDisconnected(Exception):
+    pass
+
+async def run_for_client(request: Request, coro, deadline: float):
+    """Await ``coro`` within ``deadline`` seconds, cancelling it if the client goes away first."""
+    task = asyncio.ensure_future(coro)
+    try:
+        async with asyncio.timeout(deadline):
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+                if done:
+                    return task.result()
+                if await request.is_disconnected():
+                    raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
 
 # Main question answering endpoint
-@app.post("/ask", response_model=QueryResponse)
-async def ask_question(req: QueryRequest):
+@app.post("/ask", response_model=QueryResponse, response_model_exclude_none=True)
+async def ask_question(req: QueryRequest, request: Request):
     try:
-       # Directly await the async QA coroutine—no asyncio.run()
-        result = await ask_irda_question_long(req.session_id, req.question)
+        # Await the QA coroutine directly; it is cancelled on deadline or client disconnect
+        result = await run_for_client(request, ask_irda_question_long(req.session_id, req.question, req.language, req.search_filters(), req.suggest), ASK_DEADLINE_SECONDS)
         return result
+    except TimeoutError:
+        logging.warning("⏱️ /ask exceeded %ss deadline", ASK_DEADLINE_SECONDS)
+        raise HTTPException(status_code=504, detail="Request timed out")
+    except ClientDisconnected:
+        logging.info("🔌 Client disconnected, /ask cancelled")
+        raise HTTPException(status_code=499, detail="Client disconnected")
     except Exception as e:
         logging.exception("❌ Exception in /ask endpoint")
         # propagate a clean 500 with the error message
         raise HTTPException(status_code=500, detail=f"Internal Error: {e}")
 
-# Suggest follow-up questions
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Streaming variant of /ask: server-sent events "sources", "token"..., then "done" (or "error")
+@app.post("/ask/stream")
+async def ask_question_stream(req: QueryRequest):
+    async def events():
+        try:
+            # Starlette cancels this generator if the client disconnects
+            async with asyncio.timeout(ASK_DEADLINE_SECONDS):
+                async for event, data in ask_irda_question_stream(req.session_id, req.question, req.language, req.search_filters()):
+                    yield sse_event(event, data)
+        except TimeoutError:
+            logging.warning("⏱️ /ask/stream exceeded %ss deadline", ASK_DEADLINE_SECONDS)
+            yield sse_event("error", {"detail": "Request timed out"})
+        except Exception as e:
+            logging.exception("❌ Exception in /ask/stream endpoint")
+            yield sse_event("error", {"detail": f"Internal Error: {e}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Suggest follow-up questions for one answer ({"answer"}) or several ({"answers"}); cached per answer
 @app.post("/suggest")
-async def suggest_questions(request: SuggestRequest):
+async def suggest_questions(req: SuggestRequest, request: Request):
+    if (req.answer is None) == (req.answers is None):
+        raise HTTPException(status_code=422, detail='Send either "answer" or "answers"')
+    if req.answers is not None and len(req.answers) > SUGGEST_BATCH_MAX:
+        raise HTTPException(status_code=422, detail=f"At most {SUGGEST_BATCH_MAX} answers per request")
     try:
-        suggestions = generate_suggestions(request.answer)
+        if req.answers is not None:
+            batch = await run_for_client(request, generate_suggestions_batch(req.answers), SUGGEST_DEADLINE_SECONDS)
+            return {"suggestions": batch}
+        suggestions = await run_for_client(request, generate_suggestions(req.answer), SUGGEST_DEADLINE_SECONDS)
         return {"suggestions": suggestions}
+    except TimeoutError:
+        logging.warning("⏱️ /suggest exceeded %ss deadline", SUGGEST_DEADLINE_SECONDS)
+        raise HTTPException(status_code=504, detail="Request timed out")
+    except ClientDisconnected:
+        raise HTTPException(status_code=499, detail="Client disconnected")
     except Exception as e:
         logging.exception("❌ Exception in /suggest endpoint")
         raise HTTPException(status_code=500, detail=f"Internal Error: {str(e)}")
+
+# Prometheus scrape endpoint: request/stage latency histograms, LLM calls, tokens and cost per stage
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# Liveness plus vectorstore readout (index size, load time, last reload); never loads anything itself
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "ready": startup["ready"],
+        "vectorstore": vectorstore_manager.stats(),
+        "query_embedding_cache": vectorstore_manager.embedding_cache_stats(),
+        "answer_cache": answer_cache.stats(),
+        "coalescing": answer_flights.stats(),
+        "suggestions": suggestion_stats(),
+        "sessions": session_store.stats(),
+    }
+
+# Readiness: 503 until this worker's warmup has finished (route traffic on this, restart on /health)
+@app.get("/ready")
+async def ready():
+    status = "ready" if startup["ready"] else "warmup_failed" if startup["error"] else "warming_up"
+    return JSONResponse({"status": status, **startup}, status_code=200 if startup["ready"] else 503)
+
+startup["import_seconds"] = time.perf_counter() - _import_started
+STARTUP_SECONDS.set(startup["import_seconds"], phase="import")
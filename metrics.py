@@ -0,0 +1,257 @@
+# metrics.py
+import os
+import inspect
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+from config import LLM_PROMPT_PRICE_PER_1K, LLM_COMPLETION_PRICE_PER_1K, METRICS_TEXTFILE_PATH
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+# --- Prometheus-style metrics (text exposition format 0.0.4) ---
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _labels(self, key: tuple, **extra) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra.items())
+        if not pairs:
+            return ""
+        escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines += self._samples(key, value)
+        return lines
+
+    def _samples(self, key, value) -> List[str]:
+        return [f"{self.name}{self._labels(key)} {value:g}"]
+
+    def value(self, **labels):
+        """Current value for ``labels`` (None if never recorded); histograms give (bucket counts, sum, count)."""
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def _samples(self, key, value) -> List[str]:
+        counts, total, count = value
+        lines = [f"{self.name}_bucket{self._labels(key, le=f'{bound:g}')} {n}" for bound, n in zip(self.buckets, counts)]
+        return lines + [f"{self.name}_bucket{self._labels(key, le='+Inf')} {count}",
+                        f"{self.name}_sum{self._labels(key)} {total:g}",
+                        f"{self.name}_count{self._labels(key)} {count}"]
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+def write_textfile(path: str = METRICS_TEXTFILE_PATH):
+    """Write all metrics for a node_exporter textfile collector (used by the ingest agent, which has no HTTP server)."""
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_metrics())
+    os.replace(tmp_path, path)
+
+
+# --- Metric families ---
+REQUEST_SECONDS = Histogram("irda_request_seconds", "API request wall time", ("endpoint",))
+STAGE_SECONDS = Histogram("irda_stage_seconds", "Wall time of one pipeline stage within a request", ("stage",))
+LLM_CALLS = Counter("irda_llm_calls_total", "LLM calls by pipeline stage", ("stage",))
+LLM_TOKENS = Counter("irda_llm_tokens_total", "LLM tokens by pipeline stage and kind (prompt/completion)",
+                     ("stage", "kind"))
+LLM_COST = Counter("irda_llm_cost_usd_total", "Estimated LLM spend in USD (LLM_*_PRICE_PER_1K)", ("stage",))
+COALESCED_REQUESTS = Counter("irda_coalesced_requests_total",
+                             "Requests that joined an identical computation already in flight", ("flight",))
+STARTUP_SECONDS = Gauge("irda_startup_seconds", "API worker startup time by phase (import, warmup)", ("phase",))
+INGEST_SECONDS = Histogram("irda_ingest_node_seconds", "Wall time of one ingest graph node run", ("node",),
+                           buckets=(1, 5, 15, 60, 300, 900, 3600))
+INGEST_ITEMS = Counter("irda_ingest_items_total", "Items processed by ingest nodes", ("node", "item"))
+INGEST_RATE = Gauge("irda_ingest_items_per_second", "Throughput of the last run of an ingest node", ("node", "item"))
+
+
+# --- Per-request tracing ---
+class RequestTrace:
+    """Stages of one request in the order they finished, each with its wall time and LLM usage."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.stages: List[dict] = []
+
+    def totals(self) -> Dict[str, dict]:
+        """Per stage name: summed seconds, LLM calls and tokens (map batches add up)."""
+        totals = {}
+        for record in self.stages:
+            total = totals.setdefault(record["stage"], {"count": 0, "seconds": 0.0, "llm_calls": 0,
+                                                        "prompt_tokens": 0, "completion_tokens": 0})
+            total["count"] += 1
+            for k in ("seconds", "llm_calls", "prompt_tokens", "completion_tokens"):
+                total[k] += record[k]
+        return totals
+
+    def server_timing(self) -> str:
+        """``Server-Timing`` header value: one entry per stage name, in milliseconds."""
+        entries = [f"{name};dur={t['seconds'] * 1000:.1f}" + (f';desc="x{t["count"]}"' if t["count"] > 1 else "")
+                   for name, t in self.totals().items()]
+        return ", ".join(entries + [f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}"])
+
+
+_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("request_trace", default=None)
+_stage: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("trace_stage", default=None)
+
+
+@contextmanager
+def start_trace(endpoint: str):
+    """Trace the current request; tasks started inside inherit it."""
+    trace = RequestTrace(endpoint)
+    previous = _trace.get()
+    _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.set(previous)
+        REQUEST_SECONDS.observe(time.perf_counter() - trace.started, endpoint=endpoint)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a stage; LLM calls made inside it (see LLMUsageHandler) are attributed to it."""
+    record = {"stage": name, "seconds": 0.0, "llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    # Restored by value, not Token.reset: a streaming generator may be closed from another context
+    previous = _stage.get()
+    _stage.set(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["seconds"] = time.perf_counter() - started
+        _stage.set(previous)
+        STAGE_SECONDS.observe(record["seconds"], stage=name)
+        trace = _trace.get()
+        if trace is not None:
+            trace.stages.append(record)
+
+
+async def traced(name: str, awaitable):
+    """Await ``awaitable`` as stage ``name`` (for stages run side by side with asyncio.gather)."""
+    with stage(name):
+        return await awaitable
+
+
+def record_llm_call(prompt_tokens: int, completion_tokens: int):
+    record = _stage.get()
+    name = record["stage"] if record else "other"
+    if record is not None:
+        record["llm_calls"] += 1
+        record["prompt_tokens"] += prompt_tokens
+        record["completion_tokens"] += completion_tokens
+    LLM_CALLS.inc(stage=name)
+    LLM_TOKENS.inc(prompt_tokens, stage=name, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, stage=name, kind="completion")
+    LLM_COST.inc((prompt_tokens * LLM_PROMPT_PRICE_PER_1K + completion_tokens * LLM_COMPLETION_PRICE_PER_1K) / 1000,
+                 stage=name)
+
+
+class LLMUsageHandler(BaseCallbackHandler):
+    """Counts every LLM call and the token usage the provider reports, against the current stage."""
+
+    run_inline = True  # in the caller's context, so the current stage is visible
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+        if not usage and response.generations and response.generations[0]:
+            # Streaming responses carry usage on the message instead
+            metadata = getattr(getattr(response.generations[0][0], "message", None), "usage_metadata", None) or {}
+            prompt, completion = metadata.get("input_tokens", 0), metadata.get("output_tokens", 0)
+        record_llm_call(prompt, completion)
+
+
+llm_usage_handler = LLMUsageHandler()
+
+
+# --- Ingest graph nodes ---
+def traced_node(name: str, fn: Callable, counts: Callable[[dict], Dict[str, float]]):
+    """Wrap a LangGraph node: time it, count the items ``counts(result)`` reports and export the
+    throughput (printed, and written to METRICS_TEXTFILE_PATH when set)."""
+
+    def record(started: float, result: dict) -> dict:
+        seconds = time.perf_counter() - started
+        INGEST_SECONDS.observe(seconds, node=name)
+        items = {item: n for item, n in counts(result or {}).items() if n}
+        for item, n in items.items():
+            INGEST_ITEMS.inc(n, node=name, item=item)
+            INGEST_RATE.set(n / seconds if seconds else 0.0, node=name, item=item)
+        rates = ", ".join(f"{n:g} {item} ({n / seconds:.1f}/s)" for item, n in items.items()) if seconds else ""
+        print(f"📈 {name}: {seconds:.1f}s" + (f", {rates}" if rates else ""))
+        write_textfile()
+        return result
+
+    if inspect.iscoroutinefunction(fn):
+        @wraps(fn)
+        async def async_node(state):
+            started = time.perf_counter()
+            return record(started, await fn(state))
+        return async_node
+
+    @wraps(fn)
+    def node(state):
+        started = time.perf_counter()
+        return record(started, fn(state))
+    return node
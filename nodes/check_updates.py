@@ -1,10 +1,19 @@
 import os
 from config import RAW_DIR
+from nodes.crawl_state import CrawlState
 
 def check_node(state):
     print("✅ Checking for update...")
-    if not os.listdir(RAW_DIR):  # First run or reset
-        return {}
+    if state.get("skip_scrape"):
+        return {"skip_scrape": True}
 
-    # You could also check if files are older than X days, or scrape new file list
-    return {"skip_scrape": False}
+    has_files = os.path.isdir(RAW_DIR) and bool(os.listdir(RAW_DIR))
+    if not has_files or not CrawlState.exists():  # First run or reset: full crawl
+        return {"incremental": False, "skip_scrape": False}
+
+    # We have a previous crawl to compare against: only walk listing pages until we
+    # reach ones we've already seen, and revalidate documents with conditional GETs.
+    return {"incremental": state.get("incremental", True), "skip_scrape": False}
+
+def route_after_check(state) -> str:
+    return "parse" if state.get("skip_scrape") else "scrape"
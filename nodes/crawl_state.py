@@ -0,0 +1,77 @@
+import os
+import json
+import time
+import hashlib
+from typing import Dict, Iterable, Optional
+from config import CRAWL_STATE_PATH
+from search_filters import listing_metadata
+
+
+def listing_fingerprint(urls: Iterable[str]) -> str:
+    """Order-independent hash of the document links on a listing page."""
+    return hashlib.sha256("\n".join(sorted(set(urls))).encode("utf-8")).hexdigest()
+
+
+def load_document_metadata(path: str = CRAWL_STATE_PATH) -> Dict[str, dict]:
+    """Chunk metadata (title, date, category, URLs) per downloaded file, from the crawls' listing rows."""
+    if not CrawlState.exists(path):
+        return {}
+    return {filename: listing_metadata(details)
+            for filename, details in CrawlState.load(path).details_by_filename().items()}
+
+
+class CrawlState:
+    """What previous crawls saw, persisted as JSON between runs.
+
+    ``documents``: url -> {filename, etag, last_modified, sha256, checked_at}
+    ``listings``:  "<start url>#page=<n>" -> fingerprint of that page's document links
+    ``details``:   url -> {filename, title, date, category, listing_url} from the listing row
+    """
+
+    def __init__(self, path: str = CRAWL_STATE_PATH, data: Optional[dict] = None):
+        self.path = path
+        self.data = data or {"documents": {}, "listings": {}}
+        self.data.setdefault("details", {})
+
+    @classmethod
+    def load(cls, path: str = CRAWL_STATE_PATH) -> "CrawlState":
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path, encoding="utf-8") as f:
+            return cls(path, json.load(f))
+
+    @staticmethod
+    def exists(path: str = CRAWL_STATE_PATH) -> bool:
+        return os.path.exists(path)
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
+
+    def document(self, url: str) -> Optional[dict]:
+        return self.data["documents"].get(url)
+
+    def knows(self, url: str) -> bool:
+        return url in self.data["documents"]
+
+    def record_document(self, url: str, **fields) -> None:
+        record = self.data["documents"].setdefault(url, {})
+        record.update({k: v for k, v in fields.items() if v is not None})
+        record["checked_at"] = time.time()
+
+    def record_details(self, url: str, **fields) -> None:
+        self.data["details"][url] = {k: v for k, v in fields.items() if v}
+
+    def details_by_filename(self) -> Dict[str, dict]:
+        """Listing details keyed by the downloaded file's name, for chunk metadata."""
+        return {details["filename"]: {"url": url, **{k: v for k, v in details.items() if k != "filename"}}
+                for url, details in self.data["details"].items() if details.get("filename")}
+
+    def listing(self, key: str) -> Optional[str]:
+        return self.data["listings"].get(key)
+
+    def record_listing(self, key: str, fingerprint: str) -> None:
+        self.data["listings"][key] = fingerprint
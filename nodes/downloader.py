@@ -0,0 +1,190 @@
+import os
+import random
+import hashlib
+import asyncio
+from dataclasses import dataclass
+from urllib.parse import urlparse
+import httpx
+from config import (
+    DOWNLOAD_WORKERS,
+    DOWNLOAD_PER_HOST_CONCURRENCY,
+    DOWNLOAD_RETRIES,
+    DOWNLOAD_BACKOFF_SECONDS,
+    DOWNLOAD_TIMEOUT_SECONDS,
+)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class DownloadJob:
+    url: str
+    filename: str
+    source_url: str
+
+
+class RetryableHTTPError(Exception):
+    pass
+
+
+class AsyncDownloader:
+    """Background download workers fed from a bounded queue.
+
+    Uses one pooled HTTP client, caps concurrent requests per host, retries transient
+    failures with exponential backoff, resumes ``.part`` files with Range requests and
+    only renames a file into place once it is complete.
+
+    With a ``crawl_state``, each completed download records its ETag, Last-Modified and
+    content hash; with ``revalidate=True`` files already on disk are re-checked with a
+    conditional GET instead of being skipped outright.
+    """
+
+    def __init__(self, dest_dir: str, workers: int = DOWNLOAD_WORKERS,
+                 per_host: int = DOWNLOAD_PER_HOST_CONCURRENCY, retries: int = DOWNLOAD_RETRIES,
+                 backoff: float = DOWNLOAD_BACKOFF_SECONDS, timeout: float = DOWNLOAD_TIMEOUT_SECONDS,
+                 crawl_state=None, revalidate: bool = False):
+        self.dest_dir = dest_dir
+        self.workers = workers
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.crawl_state = crawl_state
+        self.revalidate = revalidate
+        self._queue = asyncio.Queue(maxsize=workers * 50)
+        self._host_limits = {}
+        self._tasks = []
+        self._submitted = set()
+        self._client = None
+        self.stats = {"downloaded": 0, "skipped_existing": 0, "failed": 0, "resumed": 0,
+                      "not_modified": 0, "bytes": 0}
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(max_connections=self.workers, max_keepalive_connections=self.workers),
+        )
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                await self._queue.join()
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            await self._client.aclose()
+
+    async def submit(self, job: DownloadJob):
+        """Queue a download; waits when the queue is full so the crawler can't run far ahead."""
+        if job.filename in self._submitted:
+            return  # same document linked twice; two workers must not share a .part file
+        self._submitted.add(job.filename)
+        await self._queue.put(job)
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self._host_limits[host]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self.download(job)
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"❌ Failed to download {job.url}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def download(self, job: DownloadJob) -> bool:
+        """Returns True when the file ended up on disk."""
+        filepath = os.path.join(self.dest_dir, job.filename)
+        validators = self._validators(job) if os.path.exists(filepath) else {}
+        if os.path.exists(filepath) and not validators:
+            self.stats["skipped_existing"] += 1
+            print(f"ℹ️ Skipping existing file: {job.filename}")
+            return True
+
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._host_limit(job.url):
+                    outcome = await self._fetch(job, filepath, validators)
+                if outcome == "downloaded":
+                    self.stats["downloaded"] += 1
+                    print(f"⬇️ Downloaded: {job.filename}")
+                elif outcome == "not_modified":
+                    self.stats["not_modified"] += 1
+                    print(f"✔️ Not modified: {job.filename}")
+                return True
+            except (httpx.TransportError, RetryableHTTPError) as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                print(f"🔁 Retrying {job.filename} in {delay:.1f}s ({e})")
+                await asyncio.sleep(delay)
+        return False
+
+    def _validators(self, job: DownloadJob) -> dict:
+        """Conditional-request headers for a file we already have, if revalidation is on."""
+        record = self.crawl_state.document(job.url) if self.crawl_state and self.revalidate else None
+        if not record or record.get("filename") != job.filename:
+            return {}
+        headers = {}
+        if record.get("etag"):
+            headers["If-None-Match"] = record["etag"]
+        if record.get("last_modified"):
+            headers["If-Modified-Since"] = record["last_modified"]
+        return headers
+
+    async def _fetch(self, job: DownloadJob, filepath: str, validators: dict) -> str:
+        """Returns "downloaded" or "not_modified"."""
+        part_path = f"{filepath}.part"
+        offset = 0 if validators or not os.path.exists(part_path) else os.path.getsize(part_path)
+        headers = dict(validators) or ({"Range": f"bytes={offset}-"} if offset else {})
+
+        async with self._client.stream("GET", job.url, headers=headers) as r:
+            if r.status_code == 304:
+                self.crawl_state.record_document(job.url, filename=job.filename)
+                return "not_modified"
+            if r.status_code == 416:
+                os.remove(part_path)  # stale partial file; start over on the next attempt
+                raise RetryableHTTPError("range not satisfiable")
+            if r.status_code in RETRYABLE_STATUS:
+                raise RetryableHTTPError(f"HTTP {r.status_code}")
+            r.raise_for_status()
+
+            if offset and r.status_code == 206:
+                self.stats["resumed"] += 1
+            else:
+                offset = 0  # server ignored the Range header
+
+            digest = hashlib.sha256()
+            if offset:
+                with open(part_path, "rb") as f:
+                    for block in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(block)
+
+            with open(part_path, "ab" if offset else "wb") as f:
+                async for chunk in r.aiter_bytes(65536):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    self.stats["bytes"] += len(chunk)
+
+        os.replace(part_path, filepath)
+        if self.crawl_state is not None:
+            self.crawl_state.record_document(
+                job.url,
+                filename=job.filename,
+                etag=r.headers.get("ETag"),
+                last_modified=r.headers.get("Last-Modified"),
+                sha256=digest.hexdigest(),
+            )
+        return "downloaded"
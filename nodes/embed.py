@@ -1,28 +1,40 @@
 import os
-from langchain.vectorstores import Chroma
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.document_loaders import TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from config import PARSED_DIR, VECTOR_DB_DIR
+from langchain_chroma import Chroma
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from config import RAW_DIR, VECTORSTORE_DIR
+from vectorstore_manager import publish_vectorstore
+from embeddings import get_embedding_backend
+from indexer import load_manifest, stream_index
+from extraction import iter_document_chunks
+from text_cleanup import normalizer
+from nodes.crawl_state import load_document_metadata
 
 def embed_node(state):
     print("🧠 Embedding documents...")
     try:
-        docs = []
-        for filename in os.listdir(PARSED_DIR):
-            if filename.endswith(".txt"):
-                loader = TextLoader(os.path.join(PARSED_DIR, filename), encoding="utf-8")
-                docs.extend(loader.load())
-
+        files = {
+            filename: os.path.join(RAW_DIR, filename)
+            for filename in os.listdir(RAW_DIR)
+            if filename.endswith(".pdf")
+        }
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-        chunks = text_splitter.split_documents(docs)
 
-        vectorstore = Chroma.from_documents(
-            documents=chunks,
-            embedding=OpenAIEmbeddings(),
-            persist_directory=VECTOR_DB_DIR
+        # Only new/changed files are re-chunked and only new chunks embedded; removed files are deleted.
+        # Page text and language come from the parse step's caches, are cleaned of page markers and
+        # repeated headers/footers, and stream straight into bounded embedding batches.
+        manifest = load_manifest(VECTORSTORE_DIR)
+        run = stream_index(
+            files,
+            manifest,
+            VECTORSTORE_DIR,
+            open_store=lambda: Chroma(embedding_function=get_embedding_backend(), persist_directory=VECTORSTORE_DIR),
+            iter_documents=lambda changed: iter_document_chunks(changed, text_splitter),
+            text_version=normalizer.signature,
+            document_metadata=state.get("document_metadata") or load_document_metadata(),
         )
-        vectorstore.persist()
-        return {"embed_done": True}
+        print(f"📚 Index run: {run.summary()}")
+        if run.files_updated or run.files_removed:
+            publish_vectorstore(VECTORSTORE_DIR)
+        return {"embed_done": True, "embed_stats": run.summary()}
     except Exception as e:
         return {"error": f"Embedding failed: {e}"}
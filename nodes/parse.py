@@ -1,25 +1,38 @@
 import os
-import pdfplumber
+from collections import Counter
 from config import RAW_DIR, PARSED_DIR
+from extraction import iter_extract_files
+from language import document_language, load_language_cache, save_language_cache
+from nodes.crawl_state import load_document_metadata
 
 def parse_node(state):
     print("📄 Parsing documents...")
     os.makedirs(PARSED_DIR, exist_ok=True)
 
     try:
-        for filename in os.listdir(RAW_DIR):
-            if not filename.endswith(".pdf"):
-                continue
-            input_path = os.path.join(RAW_DIR, filename)
-            output_path = os.path.join(PARSED_DIR, filename.replace(".pdf", ".txt"))
-            if os.path.exists(output_path):
-                continue
-
-            with pdfplumber.open(input_path) as pdf:
-                text = "\n".join([page.extract_text() or "" for page in pdf.pages])
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(text)
-
-        return {"parse_done": True}
+        files = {
+            filename: os.path.join(RAW_DIR, filename)
+            for filename in os.listdir(RAW_DIR)
+            if filename.endswith(".pdf")
+        }
+        # Parsed in parallel; per-page text is cached in PARSED_DIR for the embed step. Each document's
+        # language is detected as its pages arrive (cached per file hash), so only verdicts are kept
+        languages = Counter()
+        cache = load_language_cache()
+        try:
+            for source, pages in iter_extract_files(files):
+                languages[document_language(files[source], pages, cache)["language"]] += 1
+        finally:
+            save_language_cache(cache)
+        # Listing title/date/category recorded by the scraper, attached to the chunks at embed time
+        metadata = load_document_metadata()
+        document_metadata = {source: metadata[source] for source in files if source in metadata}
+        print(f"🏷️ Listing details for {len(document_metadata)} of {len(files)} documents")
+        return {
+            "parse_done": True,
+            "parsed_files": sum(languages.values()),
+            "languages": dict(languages),
+            "document_metadata": document_metadata,
+        }
     except Exception as e:
         return {"error": f"Parsing failed: {e}"}
@@ -3,30 +3,38 @@ import re
 import time
 import asyncio
 import hashlib
-import requests
-import langid
+import httpx
+from contextlib import aclosing
+from datetime import datetime
+from typing import Optional
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright
-from config import RAW_DIR
+from config import RAW_DIR, SCRAPE_STATIC_FAST_PATH, SCRAPE_NAV_TIMEOUT_SECONDS
+from nodes.downloader import AsyncDownloader, DownloadJob, USER_AGENT
+from nodes.crawl_state import CrawlState, listing_fingerprint
 
 IRDA_BASE_URL = "https://irdai.gov.in"
 DOWNLOADABLE_EXTENSIONS = [".pdf", ".doc", ".docx"]
+NEXT_LABELS = ["Next", ">", "›", "»"]
+
+try:
+    from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+except ImportError:  # server-rendered listings are crawled over plain HTTP and never need a browser
+    async_playwright = None
+    PlaywrightTimeoutError = asyncio.TimeoutError
+
+# The document links currently in the DOM, as one string. Cheap to poll from wait_for_function,
+# so a page change is detected when this changes rather than by diffing the whole HTML.
+LINK_SIGNATURE_JS = """() => Array.from(document.querySelectorAll('a[href]'))
+    .map(a => a.getAttribute('href').trim())
+    .filter(href => /\\.(pdf|doc)/i.test(href))
+    .join('\\n')"""
 
 def sanitize_filename(name: str) -> str:
     name = re.sub(r'^[a-f0-9]{6}_', '', name)
     name = re.sub(r'[<>:"/\\|?*\n]', "_", name.strip())
     return name
 
-def is_english_content(text: str, threshold: float = 0.8) -> bool:
-    if not text.strip():
-        return False
-    try:
-        lang, confidence = langid.classify(text)
-        return lang == 'en' and confidence >= threshold
-    except:
-        return True
-
 def get_title_from_link_tag(tag):
     try:
         parent = tag.find_parent(["tr", "div"])
@@ -36,6 +44,42 @@ def get_title_from_link_tag(tag):
     except:
         return ""
 
+DATE_FORMATS = ["%d-%m-%Y", "%d/%m/%Y", "%d.%m.%Y", "%Y-%m-%d", "%d %b %Y", "%d %B %Y", "%b %d %Y", "%B %d %Y"]
+_DATE_RE = re.compile(
+    r"\b(\d{1,2}[-/.]\d{1,2}[-/.]\d{4}|\d{4}-\d{2}-\d{2}|\d{1,2}(?:st|nd|rd|th)? [A-Za-z]{3,9},? \d{4}"
+    r"|[A-Za-z]{3,9} \d{1,2},? \d{4})\b"
+)
+_ORDINAL_RE = re.compile(r"(?<=\d)(st|nd|rd|th)\b")
+
+def parse_listing_date(text: str) -> Optional[str]:
+    """First date in ``text`` ("01-04-2024", "1st April, 2024", ...) as ISO "YYYY-MM-DD"."""
+    for match in _DATE_RE.finditer(text):
+        candidate = _ORDINAL_RE.sub("", match.group(1)).replace(",", "")
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(candidate, fmt).date().isoformat()
+            except ValueError:
+                continue
+    return None
+
+def listing_category(source_url: str) -> str:
+    """The listing's own name, e.g. ".../document-category/circulars/" -> "circulars"."""
+    segments = [s for s in urlparse(source_url).path.split("/") if s]
+    return segments[-1].replace("-", " ").replace("_", " ").lower() if segments else ""
+
+def listing_details(tag, page_url: str, source_url: str) -> dict:
+    """Title, date, category and listing page of a document link's table row (or enclosing div)."""
+    parent = tag.find_parent(["tr", "div"])
+    cells = [c.get_text(" ", strip=True) for c in parent.find_all(["td", "th"])] if parent else []
+    if not cells and parent is not None:
+        cells = [t.strip() for t in parent.stripped_strings]
+    date = next((d for d in map(parse_listing_date, cells) if d), None)
+    texts = [c for c in cells if c and not parse_listing_date(c) and not c.isdigit()
+             and c != tag.get_text(strip=True)]
+    # The subject is the wordiest cell; reference numbers and serials are single tokens
+    title = max(texts, key=lambda c: (len(c.split()), len(c))) if texts else (tag.get("title") or tag.get_text(" ", strip=True))
+    return {"title": title[:300], "date": date, "category": listing_category(source_url), "listing_url": page_url}
+
 def strip_query_params(url):
     parsed = urlparse(url)
     return parsed.path
@@ -67,117 +111,193 @@ def unique_filename_from_title(title, url):
 
     return f"{safe_title}{ext}"
 
+def parse_listing(html: str, page_url: str, source_url: str):
+    """Document links on a listing page as (url, filename, source_url, listing details), plus the
+    next-page href if any."""
+    soup = BeautifulSoup(html, "html.parser")
+    links = []
+    next_href = None
+    for a in soup.find_all("a", href=True):
+        href = a['href'].strip()
+        if any(ext in href.lower() for ext in DOWNLOADABLE_EXTENSIONS):
+            full_url = urljoin(page_url, href)
+            title = get_title_from_link_tag(a)
+            filename = unique_filename_from_title(title, full_url)
+            links.append((full_url, filename, source_url, listing_details(a, page_url, source_url)))
+        elif next_href is None and a.get_text(strip=True) in NEXT_LABELS \
+                and not href.startswith(("#", "javascript:")):
+            next_href = href
+    return links, next_href
+
+async def fetch_listing(client: httpx.AsyncClient, url: str) -> Optional[str]:
+    try:
+        r = await client.get(url)
+        r.raise_for_status()
+        return r.text
+    except httpx.HTTPError as e:
+        print(f"ℹ️ Plain HTTP fetch failed for {url}: {e}")
+        return None
+
+async def iter_static_listing(client: httpx.AsyncClient, url: str, first_page, page_limit: int):
+    """Follow next-page hrefs over plain HTTP; yields (page number, links)."""
+    links, next_href = first_page
+    page_url, visited = url, {url}
+    for page_count in range(1, page_limit + 1):
+        yield page_count, links
+        next_url = urljoin(page_url, next_href) if next_href else None
+        if not next_url or next_url in visited:
+            print("✅ No next page link. Pagination ended.")
+            return
+        html = await fetch_listing(client, next_url)
+        if html is None:
+            return
+        visited.add(next_url)
+        page_url = next_url
+        links, next_href = parse_listing(html, page_url, url)
+    print("📌 Reached max page limit — stopping.")
+
+async def wait_for_listing(page):
+    # Rows may be lazy-loaded after a scroll; wait for the network to settle instead of sleeping
+    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+    try:
+        await page.wait_for_load_state("networkidle", timeout=SCRAPE_NAV_TIMEOUT_SECONDS * 1000)
+    except PlaywrightTimeoutError:
+        pass  # pages with long-polling never go idle; parse what has rendered
+
+async def click_next(page) -> bool:
+    """Click the first pagination control that actually changes the set of document links."""
+    old_signature = await page.evaluate(LINK_SIGNATURE_JS)
+    for label in NEXT_LABELS:
+        next_buttons = page.locator(f'a:has-text("{label}")')
+        for i in range(await next_buttons.count()):
+            next_button = next_buttons.nth(i)
+            if not await next_button.is_visible():
+                continue
+            await next_button.scroll_into_view_if_needed()
+            await next_button.click()
+            try:
+                await page.wait_for_function(
+                    f"old => ({LINK_SIGNATURE_JS})() !== old",
+                    arg=old_signature,
+                    timeout=SCRAPE_NAV_TIMEOUT_SECONDS * 1000,
+                )
+                return True
+            except PlaywrightTimeoutError:
+                continue  # this control didn't change the listing; try the next candidate
+    return False
+
+async def iter_browser_listing(page, url: str, page_limit: int):
+    """Click through a JavaScript-paginated listing; yields (page number, links)."""
+    await page.goto(url, wait_until="domcontentloaded")
+    for page_count in range(1, page_limit + 1):
+        await wait_for_listing(page)
+        links, _ = parse_listing(await page.content(), page.url, url)
+        yield page_count, links
+        try:
+            if not await click_next(page):
+                print("✅ No next button found. Pagination ended.")
+                return
+        except Exception as e:
+            print(f"❌ Pagination error: {e}")
+            return
+    print("📌 Reached max page limit — stopping.")
+
+class LazyBrowser:
+    """Starts Chromium on first use, so crawls that stay on the plain-HTTP path never launch it."""
+
+    def __init__(self):
+        self._playwright = None
+        self._browser = None
+        self._page = None
+
+    async def page(self):
+        if self._page is None:
+            if async_playwright is None:
+                raise RuntimeError("playwright is required to crawl JavaScript-rendered listing pages")
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            context = await self._browser.new_context(user_agent=USER_AGENT)
+            self._page = await context.new_page()
+        return self._page
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
 async def scrape_irda_circulars(state: dict) -> dict:
     start_urls = state.get("start_urls", [])
-    filter_non_english = state.get("filter_non_english", False)
+    incremental = state.get("incremental", False)
+    static_fast_path = state.get("static_fast_path", SCRAPE_STATIC_FAST_PATH)
     if not start_urls:
         return {"error_msg": "No start_urls provided"}
 
     os.makedirs(RAW_DIR, exist_ok=True)
-    total_skipped = 0
-    total_downloaded = 0
     page_limit = 1000
-
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64)")
-        page = await context.new_page()
-
-        for url in start_urls:
-            print(f"\n🚀 Starting scrape for: {url}")
-            await page.goto(url)
-            page_count = 1
-
-            while True:
-                if page_count > page_limit:
-                    print("📌 Reached max page limit — stopping.")
-                    break
-
-                print(f"\n🔄 Page {page_count} of {url}")
-                await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                await page.wait_for_timeout(2000)
-
-                soup = BeautifulSoup(await page.content(), "html.parser")
-                anchors = soup.find_all("a", href=True)
-                print(f"🔗 Found {len(anchors)} anchor tags")
-
-                links = []
-                for a in anchors:
-                    href = a['href'].strip()
-                    if any(ext in href.lower() for ext in DOWNLOADABLE_EXTENSIONS):
-                        full_url = urljoin(IRDA_BASE_URL, href)
-                        title = get_title_from_link_tag(a)
-                        filename = unique_filename_from_title(title, full_url)
-                        links.append((full_url, filename, url))
-
-                print(f"📄 Found {len(links)} document links")
-
-                for link, filename, source_url in links:
-                    filepath = os.path.join(RAW_DIR, filename)
-                    if os.path.exists(filepath):
-                        print(f"ℹ️ Skipping existing file: {filename}")
-                        continue
-
-                    try:
-                        with requests.get(link, timeout=30, stream=True) as r:
-                            r.raise_for_status()
-
-                            if filter_non_english and link.lower().endswith(".pdf"):
-                                content_sample = b''.join([chunk for _, chunk in zip(range(2), r.iter_content(2048))])
-                                text_sample = content_sample.decode('utf-8', errors='ignore')
-                                if not is_english_content(text_sample):
-                                    total_skipped += 1
-                                    print(f"🚫 Skipped non-English: {filename}")
-                                    continue
-
-                            with open(filepath, "wb") as f:
-                                for chunk in r.iter_content(8192):
-                                    f.write(chunk)
-
-                        print(f"⬇️ Downloaded: {filename}")
-                        total_downloaded += 1
-
-                    except Exception as e:
-                        print(f"❌ Failed to download {link}: {e}")
-
-                # Pagination
-                try:
-                    old_html = await page.content()
-                    patterns = ["Next", ">", "›", "»"]
-                    next_found = False
-
-                    for label in patterns:
-                        # Try exact match and case-insensitive match
-                        next_buttons = page.locator(f'a:has-text("{label}")')
-                        count = await next_buttons.count()
-                        for i in range(count):
-                            next_button = next_buttons.nth(i)
-                            if await next_button.is_visible():
-                                await next_button.scroll_into_view_if_needed()
-                                await next_button.click()
-                                await page.wait_for_timeout(2000)
-                                new_html = await page.content()
-                                if new_html != old_html:
-                                    next_found = True
-                                    page_count += 1
-                                    break
-                        if next_found:
+    crawl_state = CrawlState.load()
+    pages_crawled = 0
+
+    def already_seen(links):
+        return bool(links) and all(crawl_state.knows(link) or os.path.exists(os.path.join(RAW_DIR, filename))
+                                   for link, filename, _, _ in links)
+
+    # Downloads run in the background while we keep paginating.
+    # In incremental mode, documents we already have are revalidated with conditional GETs.
+    # Language is detected after extraction (parse step), not from raw download bytes.
+    downloader = AsyncDownloader(RAW_DIR, crawl_state=crawl_state, revalidate=incremental)
+    client = httpx.AsyncClient(timeout=SCRAPE_NAV_TIMEOUT_SECONDS, follow_redirects=True,
+                               headers={"User-Agent": USER_AGENT})
+    try:
+        async with downloader, client, LazyBrowser() as browser:
+            for url in start_urls:
+                print(f"\n🚀 Starting scrape for: {url}")
+
+                # Fast path: if the listing is server-rendered, page through it without a browser
+                first_html = await fetch_listing(client, url) if static_fast_path else None
+                first_page = parse_listing(first_html, url, url) if first_html else ([], None)
+                if first_page[0]:
+                    print("⚡ Listing is server-rendered — crawling over plain HTTP")
+                    pages = iter_static_listing(client, url, first_page, page_limit)
+                else:
+                    pages = iter_browser_listing(await browser.page(), url, page_limit)
+
+                async with aclosing(pages):
+                    async for page_count, links in pages:
+                        print(f"\n🔄 Page {page_count} of {url}: {len(links)} document links")
+                        pages_crawled += 1
+
+                        listing_key = f"{url}#page={page_count}"
+                        fingerprint = listing_fingerprint(link for link, _, _, _ in links)
+                        unchanged = crawl_state.listing(listing_key) == fingerprint
+                        seen = already_seen(links)
+                        crawl_state.record_listing(listing_key, fingerprint)
+
+                        for link, filename, source_url, details in links:
+                            # Kept for chunk metadata (title, date, category) and search filters
+                            crawl_state.record_details(link, filename=filename, **details)
+                            await downloader.submit(DownloadJob(link, filename, source_url))
+
+                        if incremental and (unchanged or seen):
+                            reason = "listing unchanged" if unchanged else "all documents already seen"
+                            print(f"⏹️ Reached previously crawled page ({reason}) — stopping.")
                             break
 
-                    if not next_found:
-                        print("✅ No next button found. Pagination ended.")
-                        break
-
-                except Exception as e:
-                    print(f"❌ Pagination error: {e}")
-                    break
-
-        await browser.close()
+            print("⏳ Waiting for remaining downloads...")
+    finally:
+        crawl_state.save()
 
+    stats = downloader.stats
+    print(f"📦 Download stats: {stats}")
     return {
         "is_scrape_done": True,
-        "skipped_non_english": total_skipped if filter_non_english else 0,
-        "total_downloaded": total_downloaded,
+        "total_downloaded": stats["downloaded"],
+        "not_modified": stats["not_modified"],
+        "pages_crawled": pages_crawled,
+        "failed_downloads": stats["failed"],
         "start_urls_count": len(start_urls)
     }
 
@@ -1,27 +1,72 @@
 import os
-import tiktoken
-import asyncio
 import re
-from typing import List, Dict
-from langchain.schema import Document
-from llm_provider import llm, model_name
-from langchain.chains.question_answering import load_qa_chain
-from langchain.vectorstores import Chroma
-from langchain.embeddings import OpenAIEmbeddings
-from config import VECTORSTORE_DIR
-
-# In-memory session history
-session_histories: Dict[str, List[Dict[str, str]]] = {}
-
-# --- Token-safe batch splitter ---
+import asyncio
+import logging
+from typing import List, Optional
+from langchain_core.documents import Document
+from llm_provider import get_llm, model_name
+from vectorstore_manager import vectorstore_manager
+from answer_cache import answer_cache
+from tokens import count_tokens as count_model_tokens, document_tokens
+from lexical_index import identifier_terms, fuse_documents
+from search_filters import build_where, filter_scope
+from reranker import rerank, get_scorer
+from suggest_agent import FUSED_SUGGESTIONS_INSTRUCTION, split_answer_suggestions, remember_suggestions, generate_suggestions
+from session_store import get_session_store, make_turn, turn_text
+from single_flight import SingleFlight
+from embeddings import normalize_query
+from metrics import stage, traced
+from config import (
+    SESSION_HISTORY_TOKEN_BUDGET,
+    SINGLE_PASS_TOKEN_BUDGET,
+    QUERY_LANGUAGE,
+    RETRIEVAL_K,
+    RETRIEVAL_FETCH_K,
+    HYBRID_RETRIEVAL,
+    HYBRID_VECTOR_WEIGHT,
+    HYBRID_LEXICAL_WEIGHT,
+    HYBRID_RRF_K,
+    LEXICAL_ONLY_FOR_IDENTIFIERS,
+    RERANKER,
+    RERANK_CANDIDATES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Answers cached across sessions were built on the old index; drop them when it is reloaded
+vectorstore_manager.add_reload_listener(answer_cache.clear)
+
+# Bounded session history (in-process or SQLite, see SESSION_BACKEND)
+session_store = get_session_store()
+
+# Identical questions asked at the same time (same filters) share one retrieval + LLM answer
+answer_flights = SingleFlight("ask")
+
+def count_tokens(text: str) -> int:
+    return count_model_tokens(text, model_name)
+
+# --- Session history (the store blocks, and counting tokens is CPU work: both run in a thread) ---
+async def load_history(session_id: str) -> List[dict]:
+    """The session's most recent turns that fit SESSION_HISTORY_TOKEN_BUDGET, oldest first."""
+    return await asyncio.to_thread(session_store.history_window, session_id, SESSION_HISTORY_TOKEN_BUDGET, count_tokens)
+
+def record_turn(session_id: str, query: str, result: dict):
+    """Blocking; the turn's tokens are counted here, once, rather than on every later request."""
+    turn = make_turn(query, result["answer"], result["sources"])
+    turn["tokens"] = count_tokens(turn_text(turn))
+    session_store.append_turn(session_id, turn)
+
+def history_section(history: List[dict]) -> str:
+    history_prompt = "\n".join(turn_text(turn) for turn in history)
+    return f"Earlier in this conversation:\n{history_prompt}" if history_prompt else ""
+
+# --- Token-safe batch splitter (uses the token counts stored with each chunk at ingest) ---
 def split_chunks_by_tokens(docs: List[Document], max_tokens=90000):
-    enc = tiktoken.encoding_for_model(model_name)
     batches = []
     current_batch = []
     token_count = 0
 
-    for doc in docs:
-        tokens = len(enc.encode(doc.page_content))
+    for doc, tokens in zip(docs, document_tokens(docs)):
         if token_count + tokens > max_tokens:
             batches.append(current_batch)
             current_batch = [doc]
@@ -37,107 +82,371 @@ def split_chunks_by_tokens(docs: List[Document], max_tokens=90000):
 
 # --- Async call for a single batch ---
 async def ask_batch_async(llm, chain, batch, query):
-    loop = asyncio.get_event_loop()
-
-    def run_chain():
-        try:
-            result = chain.run({"input_documents": batch, "question": query})
-            if isinstance(result, dict):
-                return result.get("output_text", "")
-            return str(result)
-        except Exception as e:
-            print(f"⚠️ Error in batch QA: {e}")
-            return ""
-
-    return await loop.run_in_executor(None, run_chain)
+    try:
+        with stage("map_batch"):
+            result = await chain.ainvoke({"input_documents": batch, "question": query})
+        if isinstance(result, dict):
+            return result.get("output_text", "")
+        return str(result)
+    except Exception as e:
+        logger.warning("⚠️ Error in batch QA: %s", e)
+        return ""
 
 # --- Run all batches in parallel ---
 async def ask_all_batches(query: str, docs: List[Document]):
-    
+    """Returns the non-empty batch answers and the number of LLM calls spent on them."""
+    from langchain.chains.question_answering import load_qa_chain  # only map_reduce answers need it
     chain_type = "stuff" if len(docs) <= 3 else "map_reduce"
+    llm = get_llm()
     chain = load_qa_chain(llm, chain_type=chain_type)  # Improved QA method
     batches = split_chunks_by_tokens(docs)
 
-    print(f"🧩 Split into {len(batches)} batches. Processing asynchronously...")
+    logger.info("🧩 Split into %d batches. Processing asynchronously...", len(batches))
     tasks = [ask_batch_async(llm, chain, batch, query) for batch in batches]
     results = await asyncio.gather(*tasks)
 
-    return [res for res in results if isinstance(res, str) and res.strip()]
+    # stuff: one call per batch; map_reduce: one map call per doc plus the combine call
+    llm_calls = sum(1 if chain_type == "stuff" else len(batch) + 1 for batch in batches)
+    return [res for res in results if isinstance(res, str) and res.strip()], llm_calls
 
 # --- Final summarization of all answers + chat history ---
-def summarize_answers(session_id: str, query: str, answers: List[str]):
-    if not answers:
-        return "<p>No relevant information found.</p>"
-
-    history = session_histories.get(session_id, [])
-    history_prompt = "\n".join([f"Q: {h['q']}\nA: {h['a']}" for h in history])
+NO_ANSWER_HTML = "<p>No relevant information found.</p>"
 
-    summary_prompt = f"""
+def build_summary_prompt(query: str, answers: List[str], history: List[dict], suggest: bool = False) -> str:
+    return f"""
     You are an expert assistant on IRDA regulations. Your goal is to write a clear, concise, and helpful answer in HTML format.
 
     User has asked: "{query}"
+    {history_section(history)}
 
     Below are answers from various document excerpts:
     {''.join(f'<p>{a}</p>' for a in answers)}
 
     Based on these, summarize into one final detailed answer in valid HTML. Avoid repeating sentences. Use <ul>/<li> for lists, and bold key points.
+    {FUSED_SUGGESTIONS_INSTRUCTION if suggest else ""}
     """
-    raw_output = llm.predict(summary_prompt)
-    html_answer = raw_output.replace("```html", "").replace("```", "").strip()
-    
-    return html_answer
 
-# --- Entry point ---
-async def ask_irda_question_long(session_id: str, query: str):
-    # ✅ Check session history to return cached result
-    history = session_histories.get(session_id, [])
-    for record in history:
-        if record["q"].strip().lower() == query.strip().lower():
-            print("⚡ Returning cached answer")
-            return {
-                "answer": record["a"],
-                "sources": record.get("sources", []),
-                "partials": record.get("partials", []),
-                "source_previews": record.get("source_previews", [])
-            }
-    print(f"🔍 Processing new query: {query}")
-    
-    vectordb = Chroma(
-        persist_directory=VECTORSTORE_DIR,
-        embedding_function=OpenAIEmbeddings()
+def clean_html_output(raw_output: str) -> str:
+    return raw_output.replace("```html", "").replace("```", "").strip()
+
+_OPENING_FENCE_RE = re.compile(r"\s*(```[A-Za-z]*\s*)?")
+_PARTIAL_FENCE_RE = re.compile(r"`{1,3}(h(t(ml?)?)?)?$")  # a fence whose rest may still arrive
+
+def answer_start(raw_output: str, final: bool = False) -> Optional[int]:
+    """Where the answer starts in ``raw_output``, past leading space and an opening code fence with
+    its language tag; None while more output could still change that."""
+    match = _OPENING_FENCE_RE.match(raw_output)
+    if final:
+        return match.end()
+    if match.end() == len(raw_output) or _PARTIAL_FENCE_RE.match(raw_output, match.end()):
+        return None  # the fence, its tag or the space after it may continue
+    return match.end()
+
+async def stream_html(prompt: str, stage_name: str = "single_pass"):
+    """Yields the cleaned HTML answer for ``prompt`` as the LLM produces it.
+
+    Positions are tracked in the raw output: nothing is sent until the opening fence is resolved,
+    and a trailing backtick run that may still become a fence is held back until it is."""
+    raw_output = ""
+    sent = None  # raw position up to which output has been sent
+    with stage(stage_name):
+        async for chunk in get_llm().astream(prompt):
+            raw_output += chunk.content
+            if sent is None:
+                sent = answer_start(raw_output)
+                if sent is None:
+                    continue
+            partial = _PARTIAL_FENCE_RE.search(raw_output, sent)
+            safe = partial.start() if partial else len(raw_output)
+            text = raw_output[sent:safe].replace("```html", "").replace("```", "")
+            if text:
+                yield text
+            sent = max(sent, safe)
+    if sent is None:
+        sent = answer_start(raw_output, final=True)
+    tail = raw_output[sent:].replace("```html", "").replace("```", "").rstrip()
+    if tail:
+        yield tail
+
+async def stream_summary(query: str, answers: List[str], history: List[dict]):
+    """The map_reduce summary of ``answers`` as cleaned HTML, yielded as the LLM produces it."""
+    if not answers:
+        yield NO_ANSWER_HTML
+        return
+
+    async for text in stream_html(build_summary_prompt(query, answers, history), "summarize"):
+        yield text
+
+# --- Single pass: excerpts go straight into the HTML answer prompt ---
+def build_single_pass_prompt(query: str, docs: List[Document], history: List[dict], suggest: bool = False) -> str:
+    excerpts = "\n\n".join(
+        f"[{doc.metadata.get('source', 'unknown')} (page {doc.metadata.get('page', 'n/a')})]\n{doc.page_content}"
+        for doc in docs
     )
-    docs = vectordb.max_marginal_relevance_search(query, k=10, fetch_k=30)
-    print(f"📄 Retrieved {len(docs)} documents.")
 
-    # Filter out unhelpful results
-    for doc in docs:
-        doc.page_content = re.sub(r"(Page \d+ of \d+|IRDAI|IRDA)", "", doc.page_content, flags=re.IGNORECASE)
+    return f"""
+    You are an expert assistant on IRDA regulations. Your goal is to write a clear, concise, and helpful answer in HTML format.
+
+    User has asked: "{query}"
+    {history_section(history)}
 
-    print(f"✅ {len(docs)} documents after filtering.")
-    for i, doc in enumerate(docs):
-        print(f"\n--- Document {i+1} Preview ---\n{doc.page_content[:300]}")
+    Answer only from the following document excerpts. If they do not contain the answer, say so.
+    {excerpts}
 
-    if not docs:
+    Write one final detailed answer in valid HTML. Avoid repeating sentences. Use <ul>/<li> for lists, and bold key points.
+    {FUSED_SUGGESTIONS_INSTRUCTION if suggest else ""}
+    """
+
+def plan_answer(docs: List[Document]) -> str:
+    """"single_pass" when the retrieved context fits SINGLE_PASS_TOKEN_BUDGET, else "map_reduce"."""
+    context_tokens = sum(document_tokens(docs))
+    plan = "single_pass" if context_tokens <= SINGLE_PASS_TOKEN_BUDGET else "map_reduce"
+    logger.info("🧭 Plan: %s (%d context tokens, budget %d)", plan, context_tokens, SINGLE_PASS_TOKEN_BUDGET)
+    return plan
+
+async def answer_question(query: str, docs: List[Document], history: List[dict], suggest: bool = False):
+    """Returns (html answer, partial answers, LLM calls made, follow-up suggestions).
+
+    ``history`` is the asking session's window (see load_history). With ``suggest`` the final answer
+    call also writes the follow-up suggestions, so they cost no extra round-trip; otherwise the
+    suggestions are empty."""
+    if plan_answer(docs) == "single_pass":
+        prompt, batch_answers, llm_calls = build_single_pass_prompt(query, docs, history, suggest), [], 0
+    else:
+        batch_answers, llm_calls = await ask_all_batches(query, docs)
+        if not batch_answers:
+            return NO_ANSWER_HTML, [], llm_calls, []
+        prompt = build_summary_prompt(query, batch_answers, history, suggest)
+
+    # +1 for the single-pass or summarize call
+    with stage("single_pass" if not batch_answers else "summarize"):
+        raw_output = (await get_llm().ainvoke(prompt)).content
+    raw_output, suggestions = split_answer_suggestions(raw_output) if suggest else (raw_output, [])
+    return clean_html_output(raw_output), batch_answers, llm_calls + 1, suggestions
+
+# --- Pipeline stages shared by the JSON and streaming entry points ---
+async def lookup_cached_answer(session_id: str, query: str, scope: str = "", embed_query: bool = True):
+    """Returns (cached result or None, query vector, answer cache generation).
+
+    With ``embed_query=False`` the shared cache is only matched on the exact question and the
+    query vector is None."""
+    # ✅ Check session history to return cached result
+    with stage("cache_lookup"):
+        record = await asyncio.to_thread(session_store.find_turn, session_id, query)
+    if record is not None:
+        logger.info("⚡ Returning cached answer")
         return {
-            "answer": "No meaningful content found to answer your question.",
-            "sources": [],
-            "partials": []
-        }
+            "answer": record["a"],
+            "sources": record["sources"],
+            "partials": [],
+            "source_previews": []
+        }, None, None
 
-    batch_answers = await ask_all_batches(query, docs)
-    final_answer = summarize_answers(session_id, query, batch_answers)
+    # ✅ Then the cross-session answer cache, matched on question similarity
+    cache_generation = answer_cache.generation
+    with stage("embed_query"):
+        query_vector = await vectorstore_manager.embeddings.aembed_query(query) if embed_query else None
+    with stage("cache_lookup"):
+        cached = answer_cache.lookup(query, query_vector, scope)
+    if cached is not None:
+        logger.info("⚡ Returning answer from shared cache")
+        await asyncio.to_thread(record_turn, session_id, query, cached)
+        return dict(cached), query_vector, cache_generation
 
-    session_histories.setdefault(session_id, []).append({
-        "q": query,
-        "a": final_answer,
-        "sources": list({f"{doc.metadata.get('source', 'unknown')} (page {doc.metadata.get('page', 'n/a')})" for doc in docs}),
-        "partials": batch_answers,
-        "source_previews": [doc.page_content[:300] for doc in docs]
-    })
+    return None, query_vector, cache_generation
+
+def resolve_language(language: Optional[str]) -> str:
+    """Language to restrict retrieval to: the request's, else QUERY_LANGUAGE; "" means any."""
+    return QUERY_LANGUAGE if language is None else language
+
+def is_identifier_query(query: str) -> bool:
+    """Questions citing a circular number or section reference are answered from the keyword index."""
+    return LEXICAL_ONLY_FOR_IDENTIFIERS and bool(identifier_terms(query))
+
+def resolve_filter(language: Optional[str], filters: Optional[dict]) -> Optional[dict]:
+    """Metadata filter for retrieval: language plus the request's date/category/document filters."""
+    return build_where(resolve_language(language), **(filters or {}))
 
+async def retrieve_documents(query: str, search_filter: Optional[dict] = None, k: int = RETRIEVAL_K) -> List[Document]:
+    """``search_filter`` is a Chroma ``where`` clause (see search_filters.build_where); the
+    keyword index applies the same clause."""
+    logger.info("🔍 Processing new query: %s", query)
+
+    # Shared, process-wide indexes; the searches are blocking so keep them off the event loop
+    if is_identifier_query(query):
+        hits = await traced("lexical_search", asyncio.to_thread(
+            vectorstore_manager.run_lexical,
+            lambda lexical: lexical.search(query, k, search_filter, required=identifier_terms(query))
+        ))
+        if hits:
+            logger.info("📄 Retrieved %d documents from the keyword index (exact reference).", len(hits))
+            return [doc for doc, _ in hits]
+
+    vector_search = traced("mmr_search", asyncio.to_thread(
+        vectorstore_manager.run,
+        lambda vectordb: vectordb.max_marginal_relevance_search(
+            query, k=k, fetch_k=max(RETRIEVAL_FETCH_K, k), filter=search_filter)
+    ))
+    if HYBRID_RETRIEVAL:
+        vector_docs, hits = await asyncio.gather(vector_search, traced("lexical_search", asyncio.to_thread(
+            vectorstore_manager.run_lexical,
+            lambda lexical: lexical.search(query, max(RETRIEVAL_FETCH_K, k), search_filter)
+        )))
+        docs = fuse_documents([vector_docs, [doc for doc, _ in hits]], [HYBRID_VECTOR_WEIGHT, HYBRID_LEXICAL_WEIGHT],
+                              HYBRID_RRF_K, k)
+    else:
+        docs = await vector_search
+    logger.info("📄 Retrieved %d documents.", len(docs))
+
+    # Page markers and boilerplate were removed at ingest (text_cleanup); documents are used as stored
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, doc in enumerate(docs):
+            logger.debug("--- Document %d Preview ---\n%s", i + 1, doc.page_content[:300])
+
+    return docs
+
+async def select_context(query: str, search_filter: Optional[dict] = None) -> List[Document]:
+    """Retrieval, then reranking: RERANK_CANDIDATES are retrieved and only the best chunks that
+    fit RERANK_TOKEN_BUDGET go to the LLM. With RERANKER="none" the RETRIEVAL_K results are used as is."""
+    reranking = RERANKER not in ("", "none")
+    with stage("retrieve") as retrieval:
+        docs = await retrieve_documents(query, search_filter, RERANK_CANDIDATES if reranking else RETRIEVAL_K)
+    if not docs or not reranking:
+        return docs
+    # Scoring (and loading a cross-encoder on first use) blocks, so it runs in a thread
+    with stage("rerank"):
+        result = await asyncio.to_thread(lambda: rerank(query, docs, get_scorer()))
+    logger.info("🎯 Reranked (%s) %d -> %d chunks, %d -> %d tokens | retrieve %.0f ms, rerank %.0f ms",
+                RERANKER, result.candidates, len(result.docs), result.candidate_tokens, result.tokens,
+                retrieval["seconds"] * 1000, result.seconds * 1000)
+    return result.docs
+
+def describe_sources(docs: List[Document]) -> dict:
     return {
-        "answer": final_answer,
         "sources": list({f"{doc.metadata.get('source', 'unknown')} (page {doc.metadata.get('page', 'n/a')})" for doc in docs}),
         "source_previews": [doc.page_content[:300] for doc in docs],
-        "partials": batch_answers
-    }
\ No newline at end of file
+    }
+
+def share_answer(query: str, query_vector, cache_generation, result: dict, llm_calls: int, scope: str = "",
+                 history: Optional[List[dict]] = None):
+    """Offer the answer to the cross-session cache. Answers written with conversation history are
+    only right for that conversation, so they are not shared."""
+    logger.info("📊 %d LLM call(s) for: %s", llm_calls, query)
+    if result["answer"] != NO_ANSWER_HTML and not history:
+        answer_cache.put(query, query_vector, result, llm_calls, cache_generation, scope)
+
+async def remember_answer(session_id: str, query: str, query_vector, cache_generation, result: dict, llm_calls: int,
+                          scope: str = "", history: Optional[List[dict]] = None):
+    await asyncio.to_thread(record_turn, session_id, query, result)
+    share_answer(query, query_vector, cache_generation, result, llm_calls, scope, history)
+
+NO_DOCUMENTS_RESULT = {
+    "answer": "No meaningful content found to answer your question.",
+    "sources": [],
+    "partials": []
+}
+
+# --- Entry point ---
+async def ask_irda_question_long(session_id: str, query: str, language: Optional[str] = None,
+                                 filters: Optional[dict] = None, suggest: bool = False):
+    """With ``suggest``, the result also carries follow-up "suggestions" written by the answer call."""
+    search_filter = resolve_filter(language, filters)
+    scope = filter_scope(search_filter)
+    cached, query_vector, cache_generation = await lookup_cached_answer(
+        session_id, query, scope, embed_query=not is_identifier_query(query))
+    if cached is not None:
+        if not suggest:
+            cached.pop("suggestions", None)
+        elif not cached.get("suggestions"):
+            # Cached without them (session history, or asked without suggest): served from the suggestion cache when possible
+            cached["suggestions"] = await generate_suggestions(cached["answer"])
+        return cached
+
+    history = await load_history(session_id)
+    if history:
+        # The answer is written for this conversation: computed alone, and not shared
+        result, answered = await compute_answer(query, search_filter, scope, query_vector, cache_generation, suggest,
+                                                history)
+    else:
+        # Requests joining another's computation get its answer (like theirs, written without history)
+        # and still record the turn in their own session
+        (result, answered), shared = await answer_flights.run(
+            (scope, normalize_query(query), suggest),
+            lambda: compute_answer(query, search_filter, scope, query_vector, cache_generation, suggest, history))
+        if shared:
+            logger.info("🤝 Joined an identical question already in flight")
+    if answered:
+        await asyncio.to_thread(record_turn, session_id, query, result)
+    return dict(result)
+
+async def compute_answer(query: str, search_filter: Optional[dict], scope: str, query_vector, cache_generation,
+                         suggest: bool, history: List[dict]):
+    """Retrieval and the LLM answer for a question no cache had. Returns (result, answered);
+    nothing is recorded in the session here, since coalesced requests share this result."""
+    docs = await select_context(query, search_filter)
+    if not docs:
+        return ({**NO_DOCUMENTS_RESULT, "suggestions": []} if suggest else dict(NO_DOCUMENTS_RESULT)), False
+
+    final_answer, partials, llm_calls, suggestions = await answer_question(query, docs, history, suggest)
+
+    result = {"answer": final_answer, **describe_sources(docs), "partials": partials}
+    if suggest:
+        result["suggestions"] = suggestions
+        remember_suggestions(final_answer, suggestions)
+    share_answer(query, query_vector, cache_generation, result, llm_calls, scope, history)
+    return result, True
+
+# --- Streaming entry point: yields (event, data) pairs ---
+async def ask_irda_question_stream(session_id: str, query: str, language: Optional[str] = None,
+                                   filters: Optional[dict] = None):
+    """Sources first, then the answer HTML token by token, then a final "done" event with the partials."""
+    search_filter = resolve_filter(language, filters)
+    scope = filter_scope(search_filter)
+    cached, query_vector, cache_generation = await lookup_cached_answer(
+        session_id, query, scope, embed_query=not is_identifier_query(query))
+    if cached is not None:
+        yield "sources", {"sources": cached["sources"], "source_previews": cached.get("source_previews", [])}
+        yield "token", {"text": cached["answer"]}
+        yield "done", {"partials": cached.get("partials", []), "cached": True}
+        return
+
+    docs = await select_context(query, search_filter)
+    if not docs:
+        yield "sources", {"sources": [], "source_previews": []}
+        yield "token", {"text": NO_DOCUMENTS_RESULT["answer"]}
+        yield "done", {"partials": [], "cached": False}
+        return
+
+    sources = describe_sources(docs)
+    yield "sources", sources
+
+    history = await load_history(session_id)
+    if plan_answer(docs) == "single_pass":
+        batch_answers, llm_calls = [], 1
+        html_stream = stream_html(build_single_pass_prompt(query, docs, history))
+    else:
+        batch_answers, llm_calls = await ask_all_batches(query, docs)
+        llm_calls += 1 if batch_answers else 0  # summarize
+        html_stream = stream_summary(query, batch_answers, history)
+
+    parts = []
+    async for text in html_stream:
+        parts.append(text)
+        yield "token", {"text": text}
+
+    result = {"answer": "".join(parts).strip(), **sources, "partials": batch_answers}
+    await remember_answer(session_id, query, query_vector, cache_generation, result, llm_calls, scope, history)
+    yield "done", {"partials": batch_answers, "cached": False}
+
+# --- Worker warmup (see WARMUP_MODE) ---
+def warmup():
+    """Build what the first /ask would otherwise pay for: the vectorstore and query embedder, the
+    chat model client, the reranker and the tokenizer. Blocking; run it off the event loop."""
+    vectorstore_manager.open()
+    get_llm()
+    get_scorer()
+    from langchain.chains.question_answering import load_qa_chain  # noqa: F401
+    try:
+        count_tokens("warmup")
+    except Exception as e:  # tiktoken fetches its tables on first use; requests will retry
+        logger.warning("⚠️ Tokenizer not loaded during warmup: %s", e)
@@ -0,0 +1,167 @@
+# reranker.py
+import re
+import math
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Sequence
+from langchain_core.documents import Document
+from lexical_index import index_terms, STOPWORDS
+from tokens import document_tokens
+from config import (
+    RERANKER,
+    RERANK_MODEL,
+    RERANK_TOP_N,
+    RERANK_TOKEN_BUDGET,
+    RERANK_BATCH_SIZE,
+    RERANK_RETRIEVAL_WEIGHT,
+    HYBRID_RRF_K,
+)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _query_terms(query: str) -> List[str]:
+    terms = [t for t in index_terms(query) if t not in STOPWORDS]
+    # A whole identifier (IRDAI/HLT/CIR/103/2023) is scored once, not again through its parts
+    parts = {part for t in terms if not t.isalnum() for part in _WORD_RE.findall(t)}
+    return list(dict.fromkeys(t for t in terms if t not in parts))
+
+
+def _scored_text(doc: Document) -> str:
+    # The listing title (see search_filters.LISTING_FIELDS) counts as part of every chunk
+    title = doc.metadata.get("title")
+    return f"{title}\n{doc.page_content}" if title else doc.page_content
+
+
+# --- Scorers: higher is more relevant; only the order within one candidate list matters ---
+class LexicalOverlapScorer:
+    """BM25 over the candidate list itself, plus a bonus for query word pairs found side by side.
+
+    No model and no network; IDF comes from the candidates, so words every candidate shares
+    (the topic that retrieved them all) weigh little and the distinguishing ones decide.
+    """
+
+    name = "lexical"
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, pair_weight: float = 0.5):
+        self.k1 = k1
+        self.b = b
+        self.pair_weight = pair_weight
+
+    def score(self, query: str, docs: Sequence[Document]) -> List[float]:
+        terms = _query_terms(query)
+        if not terms or not docs:
+            return [0.0] * len(docs)
+        words = [w for w in index_terms(query) if w not in STOPWORDS and w.isalnum()]
+        pairs = {(a, b) for a, b in zip(words, words[1:])}
+        tokenized = [index_terms(_scored_text(doc)) for doc in docs]
+        counts = [Counter(tokens) for tokens in tokenized]
+        n = len(docs)
+        avg_len = sum(len(tokens) for tokens in tokenized) / n or 1.0
+        idf = {}
+        for term in terms:
+            df = sum(1 for c in counts if term in c)
+            idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+        scores = []
+        for tokens, c in zip(tokenized, counts):
+            norm = self.k1 * (1 - self.b + self.b * len(tokens) / avg_len)
+            score = sum(idf[t] * c[t] * (self.k1 + 1) / (c[t] + norm) for t in terms if t in c)
+            if pairs:
+                present = pairs.intersection(zip(tokens, tokens[1:]))
+                score += self.pair_weight * sum(idf.get(a, 0.0) + idf.get(b, 0.0) for a, b in present)
+            scores.append(score)
+        return scores
+
+
+class CrossEncoderScorer:
+    """A local sentence-transformers cross-encoder, run on CPU (``pip install sentence-transformers``)."""
+
+    name = "cross-encoder"
+
+    def __init__(self, model_name: str = RERANK_MODEL, batch_size: int = RERANK_BATCH_SIZE):
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name, device="cpu")
+        self.batch_size = batch_size
+
+    def score(self, query: str, docs: Sequence[Document]) -> List[float]:
+        if not docs:
+            return []
+        pairs = [(query, _scored_text(doc)) for doc in docs]
+        return [float(s) for s in self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)]
+
+
+@lru_cache(maxsize=None)
+def get_scorer(backend: str = RERANKER):
+    """The shared scorer for ``backend``; None when reranking is off. Models load once per process."""
+    if backend in ("", "none"):
+        return None
+    if backend == "lexical":
+        return LexicalOverlapScorer()
+    if backend == "cross-encoder":
+        return CrossEncoderScorer()
+    raise ValueError(f"Unknown RERANKER: {backend!r}")
+
+
+# --- Selection under a context budget ---
+@dataclass
+class Reranked:
+    """Kept documents (best first) and what the stage cost."""
+    docs: List[Document]
+    scores: List[float] = field(default_factory=list)
+    candidates: int = 0
+    candidate_tokens: int = 0
+    tokens: int = 0
+    seconds: float = 0.0
+
+    def summary(self) -> dict:
+        return {"candidates": self.candidates, "kept": len(self.docs), "candidate_tokens": self.candidate_tokens,
+                "tokens": self.tokens, "ms": round(self.seconds * 1000, 1)}
+
+
+def select_within_budget(docs: Sequence[Document], scores: Sequence[float], top_n: int,
+                         token_budget: int) -> Reranked:
+    """The best-scoring documents, at most ``top_n`` and ``token_budget`` tokens in total.
+
+    Ties keep retrieval order. A document that would overflow the budget is skipped in favour of
+    smaller ones below it; the best document is always kept, even when it alone exceeds the budget.
+    """
+    tokens = document_tokens(list(docs))
+    order = sorted(range(len(docs)), key=lambda i: -scores[i])
+    kept, used = [], 0
+    for i in order:
+        if len(kept) >= top_n:
+            break
+        if kept and used + tokens[i] > token_budget:
+            continue
+        kept.append(i)
+        used += tokens[i]
+    return Reranked(docs=[docs[i] for i in kept], scores=[scores[i] for i in kept], candidates=len(docs),
+                    candidate_tokens=sum(tokens), tokens=used)
+
+
+def fuse_with_retrieval(scores: Sequence[float], retrieval_weight: float, k: int = HYBRID_RRF_K) -> List[float]:
+    """Reciprocal rank fusion of the scorer's order with the retrieval order (``docs`` as given),
+    so a scorer's confident mistakes are tempered by what retrieval ranked first."""
+    by_score = sorted(range(len(scores)), key=lambda i: -scores[i])
+    fused = {i: 0.0 for i in range(len(scores))}
+    for ranking, weight in ((by_score, 1.0), (range(len(scores)), retrieval_weight)):
+        for rank, i in enumerate(ranking, start=1):
+            fused[i] += weight / (k + rank)
+    return [fused[i] for i in range(len(scores))]
+
+
+def rerank(query: str, docs: Sequence[Document], scorer, top_n: int = RERANK_TOP_N,
+           token_budget: int = RERANK_TOKEN_BUDGET, retrieval_weight: float = RERANK_RETRIEVAL_WEIGHT) -> Reranked:
+    """Score ``docs`` against ``query`` with ``scorer`` (see get_scorer), blend in the retrieval
+    order and keep what fits. Blocking (a model may run); call it off the event loop. With no
+    scorer, retrieval order is kept and only the limits apply."""
+    started = time.perf_counter()
+    scores = scorer.score(query, docs) if scorer else [-float(i) for i in range(len(docs))]
+    if scorer and retrieval_weight:
+        scores = fuse_with_retrieval(scores, retrieval_weight)
+    result = select_within_budget(docs, scores, top_n, token_budget)
+    result.seconds = time.perf_counter() - started
+    return result
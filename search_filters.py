@@ -0,0 +1,54 @@
+# search_filters.py
+import json
+import hashlib
+from datetime import date
+from typing import Dict, List, Optional
+
+# Listing details copied onto every chunk of a document (see CrawlState.record_details)
+LISTING_FIELDS = ("title", "date", "category", "url", "listing_url")
+
+
+def listing_metadata(details: dict) -> dict:
+    """Chunk metadata for a document's listing details. Chroma compares only numbers with
+    $gte/$lte, so the ISO date is also stored as a YYYYMMDD integer (``date_int``)."""
+    metadata = {k: details[k] for k in LISTING_FIELDS if details.get(k)}
+    if "date" in metadata:
+        metadata["date_int"] = date_int(metadata["date"])
+    return metadata
+
+
+def metadata_digest(metadata: dict) -> str:
+    return hashlib.sha256(json.dumps(metadata, sort_keys=True).encode("utf-8")).hexdigest()[:16] if metadata else ""
+
+
+def date_int(value: str) -> int:
+    return int(date.fromisoformat(value).strftime("%Y%m%d"))
+
+
+def build_where(language: str = "", date_from: Optional[str] = None, date_to: Optional[str] = None,
+                category: Optional[str] = None, documents: Optional[List[str]] = None) -> Optional[dict]:
+    """Chroma ``where`` filter for a search; None when nothing narrows it.
+
+    Dates are inclusive ISO dates; ``documents`` are source file names. Documents without a
+    listing date never match a date range. A language also matches pages whose language is
+    "unknown" (too little text to tell).
+    """
+    conditions: List[Dict[str, object]] = []
+    if language:
+        conditions.append({"language": {"$in": sorted({language, "unknown"})}})
+    if date_from:
+        conditions.append({"date_int": {"$gte": date_int(date_from)}})
+    if date_to:
+        conditions.append({"date_int": {"$lte": date_int(date_to)}})
+    if category:
+        conditions.append({"category": category.lower()})
+    if documents:
+        conditions.append({"source": {"$in": list(documents)}} if len(documents) > 1 else {"source": documents[0]})
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def filter_scope(where: Optional[dict]) -> str:
+    """Answer-cache scope for a filter: answers retrieved under different filters never mix."""
+    return json.dumps(where, sort_keys=True) if where else ""
@@ -0,0 +1,241 @@
+# session_store.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Callable, List, Optional
+from config import (
+    SESSION_BACKEND,
+    SESSION_DB_PATH,
+    SESSION_MAX_TURNS,
+    SESSION_IDLE_TTL_SECONDS,
+    SESSION_MEMORY_BUDGET_BYTES,
+)
+
+
+def make_turn(query: str, answer: str, sources: List[str], tokens: Optional[int] = None) -> dict:
+    """Compact history entry: partials and source previews are not kept. ``tokens`` is the size of
+    its ``turn_text``, counted once so history windows need not re-encode it on every request."""
+    return {"q": query, "a": answer, "sources": list(sources), "tokens": tokens}
+
+
+def turn_text(turn: dict) -> str:
+    """How a turn appears in the answer prompt's history."""
+    return f"Q: {turn['q']}\nA: {turn['a']}"
+
+
+def _turn_size(turn: dict) -> int:
+    return len(turn["q"]) + len(turn["a"]) + sum(len(s) for s in turn["sources"])
+
+
+def _same_question(a: str, b: str) -> bool:
+    return a.strip().lower() == b.strip().lower()
+
+
+class SessionStore(ABC):
+    """Per-session Q/A history with a turn cap, idle expiry and a global size budget.
+
+    Methods block (locks, SQLite I/O); async callers run them in a thread."""
+
+    @abstractmethod
+    def get_turns(self, session_id: str) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def append_turn(self, session_id: str, turn: dict) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+    def find_turn(self, session_id: str, query: str) -> Optional[dict]:
+        for turn in reversed(self.get_turns(session_id)):
+            if _same_question(turn["q"], query):
+                return turn
+        return None
+
+    def history_window(self, session_id: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[dict]:
+        """Most recent turns whose Q/A text fits in ``max_tokens``, oldest first."""
+        window = []
+        used = 0
+        for turn in reversed(self.get_turns(session_id)):
+            tokens = turn.get("tokens")
+            if tokens is None:
+                tokens = count_tokens(turn_text(turn))
+            if used + tokens > max_tokens:
+                break
+            window.append(turn)
+            used += tokens
+        window.reverse()
+        return window
+
+
+class InMemorySessionStore(SessionStore):
+    def __init__(self, max_turns: int = SESSION_MAX_TURNS, idle_ttl: float = SESSION_IDLE_TTL_SECONDS,
+                 budget_bytes: int = SESSION_MEMORY_BUDGET_BYTES):
+        self.max_turns = max_turns
+        self.idle_ttl = idle_ttl
+        self.budget_bytes = budget_bytes
+        self._sessions = OrderedDict()  # session_id -> {"turns": deque, "last_seen": float, "bytes": int}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evicted_sessions = 0
+
+    def _drop(self, session_id: str):
+        session = self._sessions.pop(session_id)
+        self._bytes -= session["bytes"]
+        self.evicted_sessions += 1
+
+    def _evict(self, now: float):
+        # Sessions are kept in last-seen order, so idle ones are always at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session["last_seen"] + self.idle_ttl >= now and self._bytes <= self.budget_bytes:
+                break
+            self._drop(session_id)
+
+    def get_turns(self, session_id: str) -> List[dict]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            if session["last_seen"] + self.idle_ttl < time.time():
+                self._drop(session_id)
+                return []
+            return list(session["turns"])
+
+    def append_turn(self, session_id: str, turn: dict) -> None:
+        now = time.time()
+        size = _turn_size(turn)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and session["last_seen"] + self.idle_ttl < now:
+                self._drop(session_id)  # expired: the new turn starts a fresh history
+                session = None
+            if session is None:
+                session = self._sessions[session_id] = {"turns": deque(), "last_seen": now, "bytes": 0}
+            if len(session["turns"]) >= self.max_turns:
+                dropped = session["turns"].popleft()
+                session["bytes"] -= _turn_size(dropped)
+                self._bytes -= _turn_size(dropped)
+            session["turns"].append(turn)
+            session["bytes"] += size
+            session["last_seen"] = now
+            self._bytes += size
+            self._sessions.move_to_end(session_id)
+            self._evict(now)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "budget_bytes": self.budget_bytes,
+            "evicted_sessions": self.evicted_sessions,
+        }
+
+
+class SQLiteSessionStore(SessionStore):
+    """Local SQLite file shared by all uvicorn workers on the host (WAL mode)."""
+
+    MAINTENANCE_EVERY = 50  # appends between idle/budget sweeps
+
+    def __init__(self, path: str = SESSION_DB_PATH, max_turns: int = SESSION_MAX_TURNS,
+                 idle_ttl: float = SESSION_IDLE_TTL_SECONDS, budget_bytes: int = SESSION_MEMORY_BUDGET_BYTES):
+        self.path = path
+        self.max_turns = max_turns
+        self.idle_ttl = idle_ttl
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        self._appends = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY, last_seen REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL,
+                q TEXT NOT NULL, a TEXT NOT NULL, sources TEXT NOT NULL, size INTEGER NOT NULL,
+                tokens INTEGER);
+            CREATE INDEX IF NOT EXISTS turns_session ON turns (session_id, id);
+            CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen);
+        """)
+        if "tokens" not in [row[1] for row in self._conn.execute("PRAGMA table_info(turns)")]:
+            self._conn.execute("ALTER TABLE turns ADD COLUMN tokens INTEGER")  # files from before token counts
+        self._conn.commit()
+
+    def get_turns(self, session_id: str) -> List[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT last_seen FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None or row[0] + self.idle_ttl < time.time():
+                return []
+            rows = self._conn.execute(
+                "SELECT q, a, sources, tokens FROM turns WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+        return [{"q": q, "a": a, "sources": json.loads(sources), "tokens": tokens} for q, a, sources, tokens in rows]
+
+    def append_turn(self, session_id: str, turn: dict) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT last_seen FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is not None and row[0] + self.idle_ttl < now:
+                # Expired but not yet swept: its turns must not come back with the new one
+                self._conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, last_seen) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET last_seen = excluded.last_seen",
+                (session_id, now),
+            )
+            self._conn.execute(
+                "INSERT INTO turns (session_id, q, a, sources, size, tokens) VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, turn["q"], turn["a"], json.dumps(turn["sources"]), _turn_size(turn), turn.get("tokens")),
+            )
+            self._conn.execute(
+                "DELETE FROM turns WHERE session_id = ? AND id NOT IN "
+                "(SELECT id FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                (session_id, session_id, self.max_turns),
+            )
+            self._appends += 1
+            if self._appends % self.MAINTENANCE_EVERY == 0:
+                self._evict(now)
+
+    def _evict(self, now: float):
+        self._conn.execute(
+            "DELETE FROM turns WHERE session_id IN (SELECT session_id FROM sessions WHERE last_seen < ?)",
+            (now - self.idle_ttl,),
+        )
+        self._conn.execute("DELETE FROM sessions WHERE last_seen < ?", (now - self.idle_ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM turns").fetchone()[0]
+        if total <= self.budget_bytes:
+            return
+        # Over budget: drop least recently seen sessions until back under it
+        rows = self._conn.execute(
+            "SELECT s.session_id, COALESCE(SUM(t.size), 0) FROM sessions s "
+            "LEFT JOIN turns t ON t.session_id = s.session_id GROUP BY s.session_id ORDER BY s.last_seen"
+        ).fetchall()
+        for session_id, size in rows:
+            if total <= self.budget_bytes:
+                break
+            self._conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            total -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM turns").fetchone()[0]
+        return {"backend": "sqlite", "path": self.path, "sessions": sessions, "bytes": size,
+                "budget_bytes": self.budget_bytes}
+
+
+def get_session_store(backend: str = SESSION_BACKEND) -> SessionStore:
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend!r}")
@@ -0,0 +1,55 @@
+# single_flight.py
+import asyncio
+from typing import Awaitable, Callable, Hashable, Tuple
+from metrics import COALESCED_REQUESTS
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight computation and all get its result.
+
+    The computation runs as its own task, so a caller that goes away (deadline, client disconnect)
+    does not cancel it for the others; it is cancelled only once every caller has gone. Finished
+    flights are forgotten at once: later calls are meant to hit a cache the computation filled.
+    Not thread-safe; use it from one event loop.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights = {}  # key -> {"task": asyncio.Task, "waiters": int}
+        self.started = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    def _forget(self, key: Hashable, flight: dict):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable]) -> Tuple[object, bool]:
+        """Returns (result, shared); ``shared`` is True when this call joined a computation
+        another caller started. Exceptions from the computation reach every caller."""
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if shared:
+            self.coalesced += 1
+            COALESCED_REQUESTS.inc(flight=self.name)
+        else:
+            flight = self._flights[key] = {"task": asyncio.ensure_future(factory()), "waiters": 0}
+            flight["task"].add_done_callback(lambda _: self._forget(key, flight))
+            self.started += 1
+        flight["waiters"] += 1
+        try:
+            return await asyncio.shield(flight["task"]), shared
+        finally:
+            flight["waiters"] -= 1
+            if not flight["waiters"] and not flight["task"].done():
+                self._forget(key, flight)  # a new caller starts afresh rather than joining a cancelled task
+                flight["task"].cancel()
+                self.abandoned += 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+        }
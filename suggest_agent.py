@@ -1,8 +1,14 @@
 # suggest_agent.py
 import re
-from llm_provider import llm
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
+import hashlib
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from llm_provider import get_llm
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from embeddings import LRUTTLCache
+from metrics import stage
+from config import SUGGESTION_CACHE_SIZE, SUGGESTION_CACHE_TTL_SECONDS
 
 # Load your model (adjust if needed)
 template = """You are an assistant helping users interact with IRDA insurance regulations.
@@ -14,13 +20,110 @@ Answer:
 Suggested Questions:"""
 
 suggest_prompt = PromptTemplate.from_template(template)
-suggest_chain = LLMChain(llm=llm, prompt=suggest_prompt)
 
-def generate_suggestions(answer: str) -> list[str]:
-    output = suggest_chain.run(answer=answer)
 
-    return [
-        re.sub(r"^[\d\.\-\•\s]+", "", q).strip()
-        for q in output.strip().split("\n")
-        if q.strip()
-    ]
+def suggest_chain():
+    # Composed per call: the shared model is only built on first use
+    return suggest_prompt | get_llm() | StrOutputParser()
+
+
+# Several answers in one call: one "### <n>" block of questions per numbered answer
+batch_template = """You are an assistant helping users interact with IRDA insurance regulations.
+For each numbered answer below, suggest 3 to 5 follow-up questions in 4-5 words which the user might ask next.
+
+{answers}
+
+For every answer, write a line "### <number>" followed by its suggested questions, one per line."""
+
+_BLOCK_RE = re.compile(r"^#+\s*(\d+)\s*$", re.MULTILINE)
+_LETTER_RE = re.compile(r"[^\W\d_]")
+
+# Appended to the answer prompt when suggestions come back in the same LLM call
+SUGGESTIONS_MARKER = "<!-- suggestions -->"
+FUSED_SUGGESTIONS_INSTRUCTION = (
+    f"After the HTML answer, write the line {SUGGESTIONS_MARKER} followed by 3 to 5 follow-up questions "
+    "in 4-5 words which the user might ask next, one per line."
+)
+
+suggestion_cache = LRUTTLCache(SUGGESTION_CACHE_SIZE, SUGGESTION_CACHE_TTL_SECONDS)
+suggestion_stats = {"hits": 0, "misses": 0, "llm_calls": 0}
+
+
+def answer_key(answer: str) -> str:
+    return hashlib.sha256(answer.strip().encode("utf-8")).hexdigest()
+
+
+def parse_suggestions(output: str) -> List[str]:
+    """One question per line, without list markers. Code fence lines (e.g. the closing ``` after a
+    fused answer) and lines with no letters at all are dropped."""
+    questions = (re.sub(r"^[\d\.\-\•\s]+", "", q).strip() for q in output.strip().split("\n"))
+    return [q for q in questions if _LETTER_RE.search(q) and not q.startswith("```")]
+
+
+def split_answer_suggestions(raw_output: str) -> Tuple[str, List[str]]:
+    """(answer, suggestions) from an answer written with FUSED_SUGGESTIONS_INSTRUCTION."""
+    answer, marker, tail = raw_output.partition(SUGGESTIONS_MARKER)
+    return answer.strip(), parse_suggestions(tail) if marker else []
+
+
+def remember_suggestions(answer: str, suggestions: List[str]):
+    """Cache suggestions produced elsewhere (e.g. with the answer), so /suggest for that answer is free."""
+    if suggestions:
+        suggestion_cache.put(answer_key(answer), list(suggestions))
+
+
+def cached_suggestions(answer: str) -> Optional[List[str]]:
+    suggestions = suggestion_cache.get(answer_key(answer))
+    suggestion_stats["hits" if suggestions is not None else "misses"] += 1
+    return suggestions
+
+
+async def _generate(answer: str) -> List[str]:
+    suggestion_stats["llm_calls"] += 1
+    with stage("suggest"):
+        output = await suggest_chain().ainvoke({"answer": answer})
+    suggestions = parse_suggestions(output)
+    remember_suggestions(answer, suggestions)
+    return suggestions
+
+
+async def generate_suggestions(answer: str) -> list[str]:
+    cached = cached_suggestions(answer)
+    return list(cached) if cached is not None else await _generate(answer)
+
+
+async def generate_suggestions_batch(answers: List[str]) -> List[List[str]]:
+    """Suggestions for each answer, in order. Cached and repeated answers cost nothing; the rest
+    share one LLM call, and any answer the reply misses falls back to its own call."""
+    results: Dict[str, Optional[List[str]]] = {}
+    for answer in answers:
+        key = answer_key(answer)
+        if key not in results:
+            results[key] = cached_suggestions(answer)
+    missing = {answer_key(a): a for a in answers if results[answer_key(a)] is None}
+
+    if len(missing) == 1:
+        (key, answer), = missing.items()
+        results[key] = await _generate(answer)
+    elif missing:
+        keys = list(missing)
+        numbered = "\n\n".join(f"Answer {i}:\n{missing[key]}" for i, key in enumerate(keys, start=1))
+        suggestion_stats["llm_calls"] += 1
+        with stage("suggest"):
+            output = (await get_llm().ainvoke(batch_template.format(answers=numbered))).content
+        parts = _BLOCK_RE.split(output)
+        for number, block in zip(parts[1::2], parts[2::2]):
+            index = int(number) - 1
+            if 0 <= index < len(keys) and parse_suggestions(block):
+                results[keys[index]] = parse_suggestions(block)
+                remember_suggestions(missing[keys[index]], results[keys[index]])
+        unanswered = [key for key in keys if results[key] is None]
+        for key, suggestions in zip(unanswered, await asyncio.gather(
+                *(_generate(missing[key]) for key in unanswered))):
+            results[key] = suggestions
+
+    return [list(results[answer_key(answer)]) for answer in answers]
+
+
+def stats() -> dict:
+    return {**suggestion_stats, "size": len(suggestion_cache)}
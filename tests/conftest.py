@@ -0,0 +1,20 @@
+# tests/conftest.py
+import os
+import sys
+import pytest
+
+# The modules live at the repo root (flat layout), which holds an __init__.py of its own
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def data_dir(tmp_path_factory):
+    """Points the data paths at a temporary directory; request it before importing the API modules,
+    which bind the paths with ``from config import``."""
+    import config
+    data_dir = tmp_path_factory.mktemp("data")
+    config.DATA_DIR = str(data_dir)
+    config.VECTORSTORE_DIR = str(data_dir / "vectordb")
+    config.SESSION_DB_PATH = str(data_dir / "sessions.sqlite3")
+    config.WARMUP_MODE = "off"
+    return data_dir
@@ -0,0 +1,38 @@
+# tests/test_answer_cache.py
+"""Cached answers are kept apart by scope and dropped when the vectorstore changes."""
+from answer_cache import SemanticAnswerCache
+
+QUESTION = "What is the claim settlement timeline?"
+VECTOR = [1.0, 0.0, 0.0]
+NEAR = [0.99, 0.1, 0.0]
+
+
+def test_answers_only_match_within_their_scope():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.put(QUESTION, VECTOR, {"answer": "30 days"}, llm_calls=2, generation=cache.generation, scope="en")
+    assert cache.lookup(QUESTION, VECTOR, scope="en") == {"answer": "30 days"}
+    assert cache.lookup("How long do claims take to settle?", NEAR, scope="en") == {"answer": "30 days"}
+    assert cache.lookup(QUESTION, VECTOR, scope="hi") is None
+    assert cache.lookup(QUESTION, NEAR, scope="") is None
+    assert cache.stats()["llm_calls_saved"] == 4
+
+
+def test_answers_without_a_vector_match_only_exactly():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.put("What does IRDAI/HLT/CIR/103/2023 say?", None, {"answer": "A"}, llm_calls=1,
+              generation=cache.generation)
+    assert cache.lookup("what does irdai/hlt/cir/103/2023 say?", None) == {"answer": "A"}
+    assert cache.lookup("What does IRDAI/HLT/CIR/104/2023 say?", VECTOR) is None
+
+
+def test_clear_drops_entries_and_answers_from_the_old_generation():
+    cache = SemanticAnswerCache(threshold=0.9)
+    started = cache.generation
+    cache.put(QUESTION, VECTOR, {"answer": "30 days"}, llm_calls=2, generation=started)
+    cache.clear()
+    assert cache.lookup(QUESTION, VECTOR) is None
+    # An answer computed before the rebuild finishes after it: not stored
+    cache.put(QUESTION, VECTOR, {"answer": "stale"}, llm_calls=2, generation=started)
+    assert cache.lookup(QUESTION, VECTOR) is None and cache.stats()["entries"] == 0
+    cache.put(QUESTION, VECTOR, {"answer": "15 days"}, llm_calls=2, generation=cache.generation)
+    assert cache.lookup(QUESTION, VECTOR) == {"answer": "15 days"}
@@ -0,0 +1,59 @@
+# tests/test_api.py
+"""The API under a real uvicorn server: middleware must not get in the way of disconnect handling."""
+import socket
+import asyncio
+import threading
+import httpx
+import pytest
+import uvicorn
+
+
+@pytest.fixture(scope="module")
+def main_module(data_dir):
+    import main
+    return main
+
+
+@pytest.fixture
+def server(main_module):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(main_module.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        thread.join(0.05)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(10)
+
+
+def test_client_disconnect_cancels_ask(main_module, server, monkeypatch):
+    cancelled = threading.Event()
+
+    async def slow_answer(*args, **kwargs):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return {"answer": "too late", "sources": []}
+
+    monkeypatch.setattr(main_module, "ask_irda_question_long", slow_answer)
+    with pytest.raises(httpx.ReadTimeout):
+        httpx.post(f"{server}/ask", json={"question": "q", "session_id": "s"}, timeout=0.5)
+    assert cancelled.wait(3), "/ask kept running after the client went away"
+
+
+def test_server_timing_header(main_module, server, monkeypatch):
+    async def answer(*args, **kwargs):
+        return {"answer": "a", "sources": []}
+
+    monkeypatch.setattr(main_module, "ask_irda_question_long", answer)
+    payload = {"question": "q", "session_id": "s"}
+    plain = httpx.post(f"{server}/ask", json=payload)
+    timed = httpx.post(f"{server}/ask", json=payload, headers={"X-Request-Timing": "1"})
+    assert plain.status_code == timed.status_code == 200
+    assert "server-timing" not in plain.headers
+    assert "total;dur=" in timed.headers["server-timing"]
@@ -0,0 +1,153 @@
+# tests/test_indexer.py
+"""Streaming index runs against a local Chroma store with the offline hashing embedder."""
+import time
+import threading
+import pytest
+from contextlib import closing
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from embeddings import LocalHashEmbeddings
+from embedding_scheduler import EmbeddingScheduler, RateLimiter
+from indexer import stream_index
+from lexical_index import LexicalIndex
+
+
+class SlowEmbeddings(LocalHashEmbeddings):
+    """Takes a while per request and records how many requests overlapped."""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(dim=16)
+        self.latency = latency
+        self.active = self.peak = self.requests = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.active += 1
+            self.requests += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.latency)
+            return super().embed_documents(texts)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def make_files(tmp_path, n_files):
+    files = {}
+    for i in range(n_files):
+        path = tmp_path / f"doc_{i}.txt"
+        path.write_text(f"document {i}")
+        files[path.name] = str(path)
+    return files
+
+
+def iter_documents(chunks_per_file):
+    def generate(changed):
+        for source in changed:
+            yield source, [Document(page_content=f"{source} part {j}: claims are settled within thirty days",
+                                    metadata={"source": source, "page": j}) for j in range(chunks_per_file)]
+    return generate
+
+
+def read_lines(changed):
+    # One chunk per line of the file, so editing a line changes exactly one chunk
+    for source, path in changed.items():
+        with open(path, encoding="utf-8") as f:
+            yield source, [Document(page_content=line, metadata={"source": source, "page": j})
+                           for j, line in enumerate(f.read().splitlines())]
+
+
+@pytest.fixture
+def index(tmp_path):
+    def run(files, manifest, embeddings, chunks_per_file=10, in_flight=4, documents=None, **kwargs):
+        store = Chroma(embedding_function=embeddings, persist_directory=str(tmp_path / "vectordb"))
+        scheduler = EmbeddingScheduler(embeddings, max_in_flight=in_flight, limiter=RateLimiter(0, 0))
+        try:
+            return stream_index(files, manifest, str(tmp_path / "vectordb"), open_store=lambda: store,
+                                iter_documents=documents or iter_documents(chunks_per_file),
+                                count_tokens=lambda texts: [len(t) // 4 for t in texts],
+                                scheduler=scheduler, **kwargs), store
+        finally:
+            scheduler.close()
+    return run
+
+
+def test_small_batches_are_grouped_into_fewer_writes(tmp_path, index):
+    # 24 files x 10 chunks, one batch per file; groups of 80 chunks -> 3 writes
+    run, store = index(make_files(tmp_path, 24), {"files": {}}, SlowEmbeddings(), max_batch_chunks=10,
+                       write_group_chunks=80, max_held_chunks=200)
+    assert (run.batches, run.writes, run.chunks_embedded) == (24, 3, 240)
+    assert store._collection.count() == 240
+
+
+def test_max_in_flight_is_used_within_the_held_bound(tmp_path, index):
+    embeddings = SlowEmbeddings(latency=0.1)
+    run, _ = index(make_files(tmp_path, 16), {"files": {}}, embeddings, max_batch_chunks=10, in_flight=4,
+                   write_group_chunks=40, max_held_chunks=80, queue_batches=2)
+    assert embeddings.peak == 4
+    assert run.chunks_embedded == 160 and run.writes >= 4
+
+
+def test_held_bound_forces_early_writes(tmp_path, index):
+    # Only 20 chunks may be held: groups of 80 are never reached, every other batch is written
+    run, _ = index(make_files(tmp_path, 8), {"files": {}}, SlowEmbeddings(), max_batch_chunks=10,
+                   write_group_chunks=80, max_held_chunks=20)
+    assert run.chunks_embedded == 80 and run.writes >= 4
+
+
+def counts(tmp_path, store):
+    """(Chroma chunks, keyword index chunks); the indexer keeps the two in step."""
+    with closing(LexicalIndex.for_store(str(tmp_path / "vectordb"))) as lexical:
+        return store._collection.count(), lexical.count()
+
+
+def write_lines(tmp_path, name, lines):
+    path = tmp_path / name
+    path.write_text("\n".join(lines))
+    return str(path)
+
+
+def test_only_changed_chunks_are_embedded_and_stale_ones_deleted(tmp_path, index):
+    files = {name: write_lines(tmp_path, name, [f"{name} clause {j}" for j in range(5)])
+             for name in ("a.txt", "b.txt")}
+    manifest = {"files": {}}
+    run, store = index(files, manifest, SlowEmbeddings(), documents=read_lines)
+    assert (run.files_updated, run.chunks_embedded) == (2, 10)
+    assert counts(tmp_path, store) == (10, 10)
+
+    run, store = index(files, manifest, SlowEmbeddings(), documents=read_lines)
+    assert (run.files_unchanged, run.files_updated, run.chunks_embedded) == (2, 0, 0)
+
+    # One line edited, one dropped: one new chunk embedded, two old ones deleted
+    write_lines(tmp_path, "a.txt", ["a.txt clause 0", "a.txt clause 1 amended", "a.txt clause 2", "a.txt clause 3"])
+    run, store = index(files, manifest, SlowEmbeddings(), documents=read_lines)
+    assert (run.files_unchanged, run.files_updated, run.chunks_embedded, run.chunks_deleted) == (1, 1, 1, 2)
+    assert counts(tmp_path, store) == (9, 9)
+
+
+def test_retag_and_delete_are_idempotent(tmp_path, index):
+    files = {name: write_lines(tmp_path, name, [f"{name} clause {j}" for j in range(3)])
+             for name in ("a.txt", "b.txt")}
+    manifest = {"files": {}}
+    index(files, manifest, SlowEmbeddings(), documents=read_lines)
+
+    titles = {"a.txt": {"title": "Health claims"}}
+    run, store = index(files, manifest, SlowEmbeddings(), documents=read_lines, document_metadata=titles)
+    assert (run.files_updated, run.chunks_retagged, run.chunks_embedded) == (1, 3, 0)
+    run, store = index(files, manifest, SlowEmbeddings(), documents=read_lines, document_metadata=titles)
+    assert (run.files_unchanged, run.chunks_retagged, run.chunks_embedded) == (2, 0, 0)
+    assert counts(tmp_path, store) == (6, 6)
+    assert store._collection.get(where={"title": "Health claims"})["ids"] == manifest["files"]["a.txt"]["chunk_ids"]
+    with closing(LexicalIndex.for_store(str(tmp_path / "vectordb"))) as lexical:
+        hits = lexical.search("clause", filter={"title": "Health claims"})
+    assert sorted(doc.metadata["chunk_id"] for doc, _ in hits) == sorted(manifest["files"]["a.txt"]["chunk_ids"])
+
+    del files["b.txt"]
+    run, store = index(files, manifest, SlowEmbeddings(), documents=read_lines, document_metadata=titles)
+    assert (run.files_removed, run.chunks_deleted) == (1, 3)
+    run, store = index(files, manifest, SlowEmbeddings(), documents=read_lines, document_metadata=titles)
+    assert (run.files_removed, run.chunks_deleted) == (0, 0)
+    assert counts(tmp_path, store) == (3, 3)
+    assert set(manifest["files"]) == {"a.txt"}
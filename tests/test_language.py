@@ -0,0 +1,20 @@
+# tests/test_language.py
+"""Language is tagged per page, and a language filter keeps pages too short to classify."""
+from language import classify_pages
+from search_filters import build_where
+
+ENGLISH = ("All insurers shall settle health insurance claims within thirty days of receiving the last "
+           "necessary document, and shall pay interest to the policyholder for any delay beyond that period.")
+HINDI = ("सभी बीमाकर्ता अंतिम आवश्यक दस्तावेज प्राप्त होने के तीस दिनों के भीतर स्वास्थ्य बीमा दावों का निपटान "
+         "करेंगे और उस अवधि से अधिक किसी भी देरी के लिए पॉलिसीधारक को ब्याज का भुगतान करेंगे।")
+
+
+def test_bilingual_document_is_tagged_per_page():
+    verdict = classify_pages([HINDI * 2, HINDI * 2, ENGLISH * 2, "Page 4"])
+    assert verdict["language"] == "hi"
+    assert verdict["pages"] == ["hi", "hi", "en", "unknown"]
+
+
+def test_language_filter_keeps_unknown_pages():
+    assert build_where("en") == {"language": {"$in": ["en", "unknown"]}}
+    assert build_where("") is None
@@ -0,0 +1,48 @@
+# tests/test_lexical_index.py
+"""The keyword index: FTS rows follow upserts and deletes, and only circular numbers and numbered
+section/regulation/clause references bypass vector search."""
+from contextlib import closing
+import pytest
+from lexical_index import LexicalIndex, identifier_terms
+
+
+@pytest.fixture
+def lexical(tmp_path):
+    with closing(LexicalIndex(str(tmp_path / "lexical.sqlite3"))) as index:
+        yield index
+
+
+def found(lexical, query, **kwargs):
+    return [doc.metadata["chunk_id"] for doc, _ in lexical.search(query, **kwargs)]
+
+
+def test_upsert_replaces_the_terms_of_an_existing_chunk(lexical):
+    lexical.upsert(["c1", "c2"], ["Claims are settled within thirty days", "Grievances go to the ombudsman"],
+                   [{"source": "a.pdf"}, {"source": "b.pdf"}])
+    lexical.upsert(["c1"], ["Claims are settled within fifteen days"], [{"source": "a.pdf"}])
+    assert lexical.count() == 2
+    assert found(lexical, "thirty") == []
+    assert found(lexical, "fifteen") == ["c1"]
+
+
+def test_delete_removes_chunks_from_search_and_is_idempotent(lexical):
+    lexical.upsert(["c1", "c2"], ["Refer IRDAI/HLT/CIR/MISC/103/2023 for claims", "Claims under section 45"],
+                   [{"source": "a.pdf"}, {"source": "b.pdf"}])
+    assert found(lexical, "claims", required=["irdai/hlt/cir/misc/103/2023"]) == ["c1"]
+    for _ in range(2):
+        lexical.delete(["c1", "missing"])
+        assert lexical.count() == 1
+        assert found(lexical, "claims") == ["c2"]
+        assert found(lexical, "claims", required=["irdai/hlt/cir/misc/103/2023"]) == []
+
+
+def test_circular_and_section_references_are_identifiers():
+    assert identifier_terms("What does IRDAI/HLT/CIR/MISC/103/2023 require?") == ["irdai/hlt/cir/misc/103/2023"]
+    assert identifier_terms("Explain Section 64VB and regulation 7") == ["section 64vb", "regulation 7"]
+    assert identifier_terms("What does clause 3.2.1 say?") == ["clause 3.2.1"]
+
+
+def test_other_words_with_digits_are_not_identifiers():
+    for query in ("What changed in the 2nd amendment?", "Q1 solvency returns", "COVID-19 claim rules",
+                  "Circulars issued after 01.04.2024", "Claims for FY 2022/23", "Is cover available 24/7?"):
+        assert identifier_terms(query) == [], query
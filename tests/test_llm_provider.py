@@ -0,0 +1,46 @@
+# tests/test_llm_provider.py
+"""The LLM concurrency cap is taken per model call, whichever chain makes the call."""
+import asyncio
+from langchain_core.documents import Document
+import llm_provider
+from benchmarks.stubs import StubChatModel
+
+active = {"now": 0, "peak": 0}
+
+
+class CountingChatModel(StubChatModel):
+    async def _agenerate(self, *args, **kwargs):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        try:
+            return await super()._agenerate(*args, **kwargs)
+        finally:
+            active["now"] -= 1
+
+
+def test_map_reduce_calls_share_the_cap(monkeypatch):
+    from langchain.chains.question_answering import load_qa_chain
+    monkeypatch.setattr(llm_provider, "llm_semaphore", asyncio.Semaphore(2))
+    monkeypatch.setattr(llm_provider, "llm", CountingChatModel(latency=0.05))
+    active.update(now=0, peak=0)
+    chain = load_qa_chain(llm_provider.get_llm(), chain_type="map_reduce")
+    docs = [Document(page_content=f"Excerpt {i}") for i in range(6)]
+
+    async def ask_twice():
+        await asyncio.gather(*(chain.ainvoke({"input_documents": docs, "question": "Why?"}) for _ in range(2)))
+
+    asyncio.run(ask_twice())
+    assert llm_provider.llm.calls == 2 * (len(docs) + 1)
+    assert active["peak"] == 2
+
+
+def test_stand_in_is_limited_once_and_still_streams(monkeypatch):
+    monkeypatch.setattr(llm_provider, "llm", StubChatModel(latency=0))
+    model = llm_provider.get_llm()
+    stream = model._astream
+    assert llm_provider.get_llm() is model and model._astream is stream
+
+    async def collect():
+        return "".join([chunk.content async for chunk in model.astream("Hi")])
+
+    assert asyncio.run(collect()) == model.reply + " "
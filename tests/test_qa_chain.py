@@ -0,0 +1,98 @@
+# tests/test_qa_chain.py
+"""Answers written for one conversation stay in it: not coalesced with, nor cached for, other sessions."""
+import asyncio
+import pytest
+from langchain_core.documents import Document
+from benchmarks.stubs import StubChatModel
+from embeddings import LocalHashEmbeddings
+
+QUESTION = "What are the claim settlement timelines?"
+
+
+@pytest.fixture
+def qa(data_dir, monkeypatch):
+    import llm_provider
+    import qa_chain_async as qa
+    from answer_cache import SemanticAnswerCache
+    from session_store import InMemorySessionStore
+    from single_flight import SingleFlight
+
+    docs = [Document(page_content="Insurers shall settle claims within 30 days.",
+                     metadata={"source": "circular.pdf", "page": 1, "token_count": 10})]
+
+    async def select_context(query, search_filter=None):
+        return docs
+
+    monkeypatch.setattr(llm_provider, "llm", StubChatModel(latency=0.2))
+    monkeypatch.setattr(qa.vectorstore_manager, "_embeddings", LocalHashEmbeddings())
+    monkeypatch.setattr(qa, "select_context", select_context)
+    monkeypatch.setattr(qa, "count_tokens", lambda text: len(text) // 4)  # tiktoken needs a download
+    monkeypatch.setattr(qa, "answer_cache", SemanticAnswerCache())
+    monkeypatch.setattr(qa, "session_store", InMemorySessionStore())
+    monkeypatch.setattr(qa, "answer_flights", SingleFlight("ask"))
+    return qa
+
+
+def ask_together(qa, *session_ids):
+    async def ask():
+        return await asyncio.gather(*(qa.ask_irda_question_long(s, QUESTION) for s in session_ids))
+    return asyncio.run(ask())
+
+
+def test_fresh_sessions_share_one_answer(qa):
+    import llm_provider
+    ask_together(qa, "a", "b")
+    assert llm_provider.llm.calls == 1
+    assert qa.answer_flights.stats()["coalesced"] == 1
+    assert qa.answer_cache.stats()["entries"] == 1
+    assert [turn["q"] for turn in qa.session_store.get_turns("b")] == [QUESTION]
+
+
+def test_answers_with_history_are_not_shared(qa):
+    qa.record_turn("a", "Which circular covers health claims?", {"answer": "<p>Circular 12</p>", "sources": []})
+    import llm_provider
+    ask_together(qa, "a", "b")
+    assert llm_provider.llm.calls == 2
+    assert qa.answer_flights.stats()["coalesced"] == 0
+    # Only b's answer, written without history, reaches the cross-session cache
+    assert qa.answer_cache.stats()["entries"] == 1
+
+
+@pytest.mark.parametrize("chunks", [
+    ["```", "h", "tml\n", "<p>Hello world</p>"],
+    ["``", "`html", "\n<p>Hello", " world</p>\n`", "``"],
+    ["  ```html\n<p>Hello world</p>", "\n```\n"],
+    ["<p>Hello", " world</p>"],
+    ["<p>Hello world</p>", "`", "`", "`"],
+])
+def test_stream_html_strips_fences_split_across_chunks(qa, monkeypatch, chunks):
+    import llm_provider
+
+    class ChunkedModel(StubChatModel):
+        def _tokens(self):
+            return chunks
+
+    monkeypatch.setattr(llm_provider, "llm", ChunkedModel(latency=0))
+
+    async def collect():
+        return [text async for text in qa.stream_html("prompt")]
+
+    parts = asyncio.run(collect())
+    assert parts[0].startswith("<p>")
+    assert "".join(parts).strip() == "<p>Hello world</p>"
+    assert not any("`" in part for part in parts)
+
+
+def test_stream_html_keeps_inline_backticks(qa, monkeypatch):
+    import llm_provider
+
+    class ChunkedModel(StubChatModel):
+        def _tokens(self):
+            return ["<p>Use `", "code` here</p>"]
+
+    monkeypatch.setattr(llm_provider, "llm", ChunkedModel(latency=0))
+
+    async def collect():
+        return "".join([text async for text in qa.stream_html("prompt")])
+
+    assert asyncio.run(collect()) == "<p>Use `code` here</p>"
@@ -0,0 +1,63 @@
+# tests/test_session_store.py
+"""Both session backends keep, cap and expire history the same way."""
+import pytest
+import session_store
+from session_store import InMemorySessionStore, SQLiteSessionStore, make_turn
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemorySessionStore(max_turns=3, idle_ttl=60)
+    return SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), max_turns=3, idle_ttl=60)
+
+
+def questions(store, session_id="s"):
+    return [turn["q"] for turn in store.get_turns(session_id)]
+
+
+def test_turns_are_capped_and_found(store, clock):
+    for i in range(5):
+        store.append_turn("s", make_turn(f"q{i}", f"a{i}", []))
+    assert questions(store) == ["q2", "q3", "q4"]
+    assert store.find_turn("s", "  Q3 ")["a"] == "a3"
+    assert store.find_turn("s", "q0") is None
+
+
+@pytest.mark.parametrize("read_after_expiry", [True, False])
+def test_expired_history_does_not_come_back(store, clock, read_after_expiry):
+    store.append_turn("s", make_turn("old q", "old a", []))
+    clock.now += 61
+    if read_after_expiry:
+        assert questions(store) == []
+    store.append_turn("s", make_turn("new q", "new a", []))
+    assert questions(store) == ["new q"]
+
+
+def test_history_window_uses_stored_token_counts(store, clock):
+    store.append_turn("s", make_turn("q0", "a0", [], tokens=5))
+    store.append_turn("s", make_turn("q1", "a1", [], tokens=5))
+    store.append_turn("s", make_turn("q2", "a2", []))  # no count stored: counted on read
+
+    counted = []
+    def count_tokens(text):
+        counted.append(text)
+        return 5
+
+    assert [turn["q"] for turn in store.history_window("s", 10, count_tokens)] == ["q1", "q2"]
+    assert counted == ["Q: q2\nA: a2"]
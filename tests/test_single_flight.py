@@ -0,0 +1,56 @@
+# tests/test_single_flight.py
+"""A computation shared by several callers survives any one of them going away."""
+import asyncio
+import pytest
+from single_flight import SingleFlight
+
+
+def test_followers_get_the_result_when_the_leader_is_cancelled():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flights.run("q", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.run("q", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == ("answer", True)
+    assert calls == [1]
+    assert flights.stats() == {"in_flight": 0, "started": 1, "coalesced": 1, "abandoned": 0}
+
+
+def test_computation_is_cancelled_once_every_caller_has_gone():
+    flights = SingleFlight("test")
+
+    async def scenario():
+        state = {"cancelled": False}
+
+        async def compute():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+
+        leader = asyncio.ensure_future(flights.run("q", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        await asyncio.sleep(0)
+        # The abandoned flight is forgotten: the next caller starts afresh instead of joining it
+        result = await flights.run("q", lambda: asyncio.sleep(0, result="fresh"))
+        return state["cancelled"], result
+
+    assert asyncio.run(scenario()) == (True, ("fresh", False))
+    assert flights.stats() == {"in_flight": 0, "started": 2, "coalesced": 0, "abandoned": 1}
@@ -0,0 +1,14 @@
+# tests/test_suggest_agent.py
+"""Suggestions parsed from model output hold questions only."""
+from suggest_agent import SUGGESTIONS_MARKER, parse_suggestions, split_answer_suggestions
+
+
+def test_fused_answer_drops_closing_code_fence():
+    raw = f"```html\n<p>Answer</p>\n{SUGGESTIONS_MARKER}\n1. What is the deadline?\n- Who must comply?\n```"
+    answer, suggestions = split_answer_suggestions(raw)
+    assert answer == "```html\n<p>Answer</p>"
+    assert suggestions == ["What is the deadline?", "Who must comply?"]
+
+
+def test_lines_without_letters_are_dropped():
+    assert parse_suggestions("```text\nPenalty for late filing?\n---\n\n2.\n```") == ["Penalty for late filing?"]
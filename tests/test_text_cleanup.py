@@ -0,0 +1,20 @@
+# tests/test_text_cleanup.py
+"""Page markers are dropped; table cells and years that look like them are kept."""
+from text_cleanup import TextNormalizer
+
+
+def normalize(page):
+    return TextNormalizer(repeated_line_ratio=0).normalize_pages([page])[0].splitlines()
+
+
+def test_explicit_page_markers_are_dropped_anywhere():
+    assert normalize("Claims\nPage 3 of 10\nmust be settled\npage 4") == ["Claims", "must be settled"]
+
+
+def test_bare_markers_only_at_page_edges():
+    page = "3 / 10\nPremium by year\n2022/23\n2023/24\n3 of 5\n- 2 -\nrenewals rose\n- 3 -"
+    assert normalize(page) == ["Premium by year", "2022/23", "2023/24", "3 of 5", "- 2 -", "renewals rose"]
+
+
+def test_years_at_page_edges_are_kept():
+    assert normalize("2023/24\nGross premium\n2022/23") == ["2023/24", "Gross premium", "2022/23"]
@@ -0,0 +1,90 @@
+# text_cleanup.py
+import re
+import json
+import hashlib
+from collections import Counter
+from typing import List, Sequence
+from config import CLEANUP_PAGE_MARKERS, CLEANUP_REPEATED_LINE_RATIO, CLEANUP_BOILERPLATE_PATTERNS
+
+# Whole lines dropped wherever they appear on a page
+PAGE_MARKER_PATTERNS = [
+    r"page\s*\d+(\s*(of|/)\s*\d+)?",
+]
+# Bare markers ("3 of 10", "3/10", "- 3 -") look like table cells or years ("2023/24"), so they are only
+# dropped as a page's first or last line, and "N of/ M" only when N <= M
+EDGE_PAGE_MARKER_PATTERNS = [
+    r"(?P<n>\d+)\s*(of|/)\s*(?P<m>\d+)",
+    r"[-–]\s*\d+\s*[-–]",
+]
+EDGE_LINES = 3  # header/footer candidates: this many non-blank lines at the top and bottom of a page
+MIN_PAGES_FOR_REPEATS = 3
+
+_INLINE_SPACE_RE = re.compile(r"[ \t\u00a0\u200b]+")
+_DIGITS_RE = re.compile(r"\d+")
+
+
+class TextNormalizer:
+    """Cleans extracted page text before it is chunked: drops page markers, header/footer lines
+    repeated across most pages of a document (kept once, on the first page) and configured
+    boilerplate lines, and collapses whitespace. ``signature`` changes with the settings, so the index can tell when stored chunks
+    were cleaned differently."""
+
+    def __init__(self, page_markers: bool = CLEANUP_PAGE_MARKERS,
+                 repeated_line_ratio: float = CLEANUP_REPEATED_LINE_RATIO,
+                 boilerplate_patterns: Sequence[str] = CLEANUP_BOILERPLATE_PATTERNS):
+        patterns = (PAGE_MARKER_PATTERNS if page_markers else []) + list(boilerplate_patterns)
+        edge_patterns = EDGE_PAGE_MARKER_PATTERNS if page_markers else []
+        self._drop_re = re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE) if patterns else None
+        self._edge_marker_res = [re.compile(p, re.IGNORECASE) for p in edge_patterns]
+        self.repeated_line_ratio = repeated_line_ratio
+        self.signature = hashlib.sha256(json.dumps(
+            {"patterns": patterns, "edge_patterns": edge_patterns,
+             "repeated_line_ratio": repeated_line_ratio}).encode("utf-8")).hexdigest()[:16]
+
+    def _is_edge_marker(self, line: str) -> bool:
+        for pattern in self._edge_marker_res:
+            match = pattern.fullmatch(line)
+            if match and ("n" not in pattern.groupindex or int(match["n"]) <= int(match["m"])):
+                return True
+        return False
+
+    def _edge_lines(self, lines: List[str]) -> List[str]:
+        content = [line for line in lines if line]
+        return content[:EDGE_LINES] + content[-EDGE_LINES:]
+
+    def _repeated_lines(self, pages: List[List[str]]) -> set:
+        """Edge lines that recur (digits ignored, so running page numbers match) on most pages."""
+        if not self.repeated_line_ratio or len(pages) < MIN_PAGES_FOR_REPEATS:
+            return set()
+        counts = Counter()
+        for lines in pages:
+            counts.update({_DIGITS_RE.sub("#", line) for line in self._edge_lines(lines)})
+        threshold = max(2, self.repeated_line_ratio * len(pages))
+        return {line for line, n in counts.items() if n >= threshold}
+
+    def normalize_pages(self, pages: List[str]) -> List[str]:
+        split = [[_INLINE_SPACE_RE.sub(" ", line).strip() for line in page.splitlines()] for page in pages]
+        repeated = self._repeated_lines(split)
+        cleaned = []
+        for i, lines in enumerate(split):
+            edges = set(self._edge_lines(lines)) if repeated and i else ()
+            content = [j for j, line in enumerate(lines) if line]
+            first_last = {content[0], content[-1]} if content else set()
+            kept = []
+            for j, line in enumerate(lines):
+                if not line:
+                    if kept and kept[-1]:
+                        kept.append("")  # keep paragraph breaks, one blank line at most
+                    continue
+                if self._drop_re is not None and self._drop_re.fullmatch(line):
+                    continue
+                if j in first_last and self._is_edge_marker(line):
+                    continue
+                if line in edges and _DIGITS_RE.sub("#", line) in repeated:
+                    continue
+                kept.append(line)
+            cleaned.append("\n".join(kept).strip())
+        return cleaned
+
+
+normalizer = TextNormalizer()
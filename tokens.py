@@ -0,0 +1,78 @@
+# tokens.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Iterable, List, Optional
+import tiktoken
+from langchain_core.documents import Document
+from config import TOKENIZER_THREADS
+
+# Tokenizer behind the counts stored in chunk metadata (the embedding model's)
+EMBEDDING_MODEL = "text-embedding-ada-002"
+TOKEN_COUNT_KEY = "token_count"
+MIN_TEXTS_PER_THREAD = 64  # below this, handing texts to threads costs more than it saves
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=TOKENIZER_THREADS, thread_name_prefix="tokenizer")
+        return _pool
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model_name: str = EMBEDDING_MODEL) -> tiktoken.Encoding:
+    """Loaded once per model; building an encoder parses its whole BPE table."""
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model_name: str = EMBEDDING_MODEL) -> int:
+    # encode_ordinary: special-token text like "<|endoftext|>" in a document is counted, not rejected
+    return len(get_encoding(model_name).encode_ordinary(text))
+
+
+def count_tokens_batch(texts: Iterable[str], model_name: str = EMBEDDING_MODEL) -> List[int]:
+    """Token counts for many texts in one call.
+
+    tiktoken encodes without holding the GIL, so large batches are split into one slice per
+    tokenizer thread (not one task per text, whose overhead would exceed the encoding itself).
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    encode = get_encoding(model_name).encode_ordinary
+    threads = min(TOKENIZER_THREADS, len(texts) // MIN_TEXTS_PER_THREAD)
+    if threads <= 1:
+        return [len(encode(text)) for text in texts]
+    step = -(-len(texts) // threads)
+    slices = _get_pool().map(lambda part: [len(encode(text)) for text in part],
+                             [texts[i:i + step] for i in range(0, len(texts), step)])
+    return [n for part in slices for n in part]
+
+
+def tag_token_counts(chunks: List[Document], model_name: str = EMBEDDING_MODEL) -> List[int]:
+    """Count every chunk once and store it in ``metadata["token_count"]``; returns the counts."""
+    counts = count_tokens_batch([chunk.page_content for chunk in chunks], model_name)
+    for chunk, n in zip(chunks, counts):
+        chunk.metadata[TOKEN_COUNT_KEY] = n
+    return counts
+
+
+def document_tokens(docs: List[Document], model_name: str = EMBEDDING_MODEL) -> List[int]:
+    """Token counts for retrieved documents, read from the count stored at ingest.
+
+    Only documents indexed before counts were stored are tokenized. The stored counts use the
+    embedding model's tokenizer, which is close enough to the chat model's for prompt budgets.
+    """
+    counts = [doc.metadata.get(TOKEN_COUNT_KEY) for doc in docs]
+    missing = [i for i, n in enumerate(counts) if n is None]
+    for i, n in zip(missing, count_tokens_batch([docs[i].page_content for i in missing], model_name)):
+        counts[i] = n
+    return counts
@@ -0,0 +1,208 @@
+# vectorstore_manager.py
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from embeddings import get_query_embeddings
+from lexical_index import LexicalIndex
+from metrics import stage
+from config import VECTORSTORE_DIR, VECTORSTORE_PUBLISH_MARKER, VECTORSTORE_RELOAD_CHECK_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def publish_vectorstore(persist_directory: str = VECTORSTORE_DIR) -> float:
+    """Tell running API workers that a new index has been written to ``persist_directory``."""
+    os.makedirs(persist_directory, exist_ok=True)
+    marker = os.path.join(persist_directory, VECTORSTORE_PUBLISH_MARKER)
+    published_at = time.time()
+    tmp_path = f"{marker}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(str(published_at))
+    os.replace(tmp_path, marker)
+    return published_at
+
+
+def _read_published_at(persist_directory: str):
+    try:
+        return os.stat(os.path.join(persist_directory, VECTORSTORE_PUBLISH_MARKER)).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+class _ReadWriteLock:
+    """Many concurrent searches, one exclusive reload/close."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            while self._writer:
+                self._cond.wait()
+            self._writer = True
+            while self._readers:
+                self._cond.wait()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class VectorStoreManager:
+    """Owns the single Chroma instance shared by every request in this process.
+
+    The store is opened once (normally from the FastAPI startup hook), searched
+    concurrently under a shared lock, and swapped for a fresh instance when the
+    embed pipeline calls :func:`publish_vectorstore` on the same directory. The BM25
+    keyword index the indexer keeps in the same directory is opened and swapped with it.
+    """
+
+    def __init__(self, persist_directory: str = VECTORSTORE_DIR, embedding_factory=get_query_embeddings,
+                 reload_check_interval: float = VECTORSTORE_RELOAD_CHECK_SECONDS):
+        self.persist_directory = persist_directory
+        self.embedding_factory = embedding_factory
+        self.reload_check_interval = reload_check_interval
+        self._lock = _ReadWriteLock()
+        self._reload_guard = threading.Lock()
+        self._embeddings = None
+        self._store = None
+        self._lexical = None
+        self._published_at = None
+        self._last_check = 0.0
+        self.index_size = 0
+        self.lexical_size = 0
+        self.load_seconds = None
+        self.loaded_at = None
+        self.reload_count = 0
+        self._reload_listeners = []
+
+    @property
+    def embeddings(self):
+        # The embeddings client is process-wide as well; it survives index reloads.
+        if self._embeddings is None:
+            self._embeddings = self.embedding_factory()
+        return self._embeddings
+
+    def _load(self):
+        from langchain_chroma import Chroma  # chromadb is slow to import; the API defers it to warmup
+        started = time.perf_counter()
+        published_at = _read_published_at(self.persist_directory)
+        with stage("vectorstore_open"):
+            store = Chroma(persist_directory=self.persist_directory, embedding_function=self.embeddings)
+            self.index_size = store._collection.count()  # forces the collection to open now, not on first query
+            self._lexical = LexicalIndex.for_store(self.persist_directory)
+            self.lexical_size = self._lexical.count()
+        self._store = store
+        self._published_at = published_at
+        self.load_seconds = time.perf_counter() - started
+        self.loaded_at = time.time()
+        logger.info("Vectorstore loaded from %s: %d vectors, %d keyword-indexed chunks in %.3fs",
+                    self.persist_directory, self.index_size, self.lexical_size, self.load_seconds)
+
+    def _release(self):
+        if self._store is None:
+            return
+        try:
+            # Chroma caches one system per path; drop it so the next open re-reads the index from disk.
+            self._store._client.clear_system_cache()
+        except Exception:
+            logger.warning("Failed to release vectorstore client", exc_info=True)
+        self._store = None
+        if self._lexical is not None:
+            self._lexical.close()
+            self._lexical = None
+
+    def open(self):
+        with self._lock.write():
+            if self._store is None:
+                self._load()
+
+    def add_reload_listener(self, callback):
+        """Call ``callback()`` after every hot reload, e.g. to drop caches built on the old index."""
+        self._reload_listeners.append(callback)
+
+    def reload(self):
+        with self._lock.write():
+            self._release()
+            self._load()
+            self.reload_count += 1
+        for callback in self._reload_listeners:
+            try:
+                callback()
+            except Exception:
+                logger.warning("Vectorstore reload listener failed", exc_info=True)
+
+    def close(self):
+        with self._lock.write():
+            self._release()
+            logger.info("Vectorstore closed")
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < self.reload_check_interval:
+            return
+        if not self._reload_guard.acquire(blocking=False):
+            return  # another request is already checking/reloading
+        try:
+            self._last_check = now
+            published_at = _read_published_at(self.persist_directory)
+            if self._store is not None and published_at is not None and published_at != self._published_at:
+                logger.info("New vectorstore published at %s, reloading", published_at)
+                self.reload()
+        finally:
+            self._reload_guard.release()
+
+    def run(self, fn):
+        """Call ``fn(store)`` while holding a shared lock; blocking, so run it off the event loop."""
+        self._maybe_reload()
+        if self._store is None:
+            self.open()
+        with self._lock.read():
+            if self._store is None:
+                raise RuntimeError("Vectorstore is closed")
+            return fn(self._store)
+
+    def run_lexical(self, fn):
+        """Like :meth:`run`, with the keyword index: ``fn(lexical_index)``. No embedding call."""
+        return self.run(lambda store: fn(self._lexical))
+
+    def embedding_cache_stats(self):
+        """Query-embedding cache stats, or None before the embeddings client exists (no side effects)."""
+        return self._embeddings.cache_stats() if self._embeddings is not None else None
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self._store is not None,
+            "persist_directory": self.persist_directory,
+            "index_size": self.index_size,
+            "lexical_size": self.lexical_size,
+            "load_seconds": self.load_seconds,
+            "loaded_at": self.loaded_at,
+            "published_at": self._published_at,
+            "reload_count": self.reload_count,
+        }
+
+
+# Shared instance used by the API
+vectorstore_manager = VectorStoreManager()